@@ -0,0 +1,157 @@
+"""HTTP API for the summarizer.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+POST /jobs                          submit {"url", "lang_choice", "summary_level", "summary_style"}
+GET  /jobs/{job_id}                 status (and partial text while running)
+GET  /jobs/{job_id}/result          summary and metadata once done
+GET  /jobs/{job_id}/exports/{fmt}   txt, pdf, docx or pptx download
+POST /jobs/{job_id}/questions       ask {"question", "history"} about the summarized document
+GET  /history?q=...&k=10            past summaries most similar to the query
+GET  /metrics                       per-stage timings in the Prometheus text format
+"""
+import os
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import history
+import metrics
+from exports import EXPORT_FORMATS, render_export
+from jobs import JobQueue
+from llm import configure
+from qa import answer_question
+
+
+SUMMARY_LEVELS = ["Brief", "Medium", "Detailed"]
+SUMMARY_STYLES = ["Bullets", "Paragraphs"]
+SEARCH_MODES = ['auto', 'exact', 'quantized', 'ivf']
+MAX_SEARCH_RESULTS = 50
+
+configure(os.getenv("GOOGLE_API_KEY"))
+queue = JobQueue()
+
+
+def _error(message, status_code):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+async def submit_job(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return _error("Request body must be JSON", 400)
+
+    url = body.get('url')
+    if not url:
+        return _error("url is required", 400)
+    # The canonical length: one streamed generation, where other lengths wait for it first
+    summary_level = body.get('summary_level', "Detailed")
+    summary_style = body.get('summary_style', "Bullets")
+    if summary_level not in SUMMARY_LEVELS or summary_style not in SUMMARY_STYLES:
+        return _error("Unsupported summary_level or summary_style", 400)
+
+    job = queue.submit(url, body.get('lang_choice', "Auto (Content Language)"), summary_level, summary_style)
+    return JSONResponse(job, status_code=202)
+
+
+async def job_status(request):
+    job = queue.status(request.path_params['job_id'])
+    if job is None:
+        return _error("Unknown job", 404)
+    return JSONResponse(job)
+
+
+def _finished_job(job_id):
+    job = queue.get(job_id)
+    if job is None:
+        return None, _error("Unknown job", 404)
+    if job['status'] == 'error':
+        return None, _error(job['error'], 422)
+    if job['status'] != 'done':
+        return None, _error(f"Job is {job['status']}", 409)
+    return job, None
+
+
+async def job_result(request):
+    job, error = _finished_job(request.path_params['job_id'])
+    if error:
+        return error
+    return JSONResponse(dict(job['result'], job_id=job['job_id'], url=job['url']))
+
+
+async def job_export(request):
+    fmt = request.path_params['fmt']
+    if fmt not in EXPORT_FORMATS:
+        return _error(f"Unsupported format: {fmt}", 404)
+    job, error = _finished_job(request.path_params['job_id'])
+    if error:
+        return error
+
+    data = await run_in_threadpool(render_export, job['result']['summary'], job['result']['title'], fmt)
+    return Response(data, media_type=EXPORT_FORMATS[fmt]['mime'], headers={
+        'Content-Disposition': f'attachment; filename="summary.{fmt}"'
+    })
+
+
+async def ask_question(request):
+    job, error = _finished_job(request.path_params['job_id'])
+    if error:
+        return error
+    try:
+        body = await request.json()
+    except ValueError:
+        return _error("Request body must be JSON", 400)
+    question = body.get('question')
+    if not question:
+        return _error("question is required", 400)
+
+    try:
+        answer = await run_in_threadpool(
+            answer_question, job['result']['document_id'], question, body.get('history') or []
+        )
+    except ValueError as e:
+        return _error(str(e), 422)
+    return JSONResponse(answer)
+
+
+async def search_history(request):
+    if not history.HISTORY_ENABLED:
+        return _error("History is disabled", 404)
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return _error("q is required", 400)
+    try:
+        k = int(request.query_params.get('k', 10))
+    except ValueError:
+        return _error("k must be a number", 400)
+    if not 1 <= k <= MAX_SEARCH_RESULTS:
+        return _error(f"k must be between 1 and {MAX_SEARCH_RESULTS}", 400)
+    mode = request.query_params.get('mode', history.SEARCH_MODE)
+    if mode not in SEARCH_MODES:
+        return _error(f"mode must be one of: {', '.join(SEARCH_MODES)}", 400)
+
+    results = await run_in_threadpool(history.get_history().search, query, k, mode)
+    return JSONResponse({'results': results})
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'queued': queue.queue_depth()})
+
+
+async def metrics_endpoint(request):
+    return Response(metrics.render_prometheus(), media_type=metrics.CONTENT_TYPE)
+
+
+app = Starlette(routes=[
+    Route('/health', health),
+    Route('/metrics', metrics_endpoint),
+    Route('/jobs', submit_job, methods=['POST']),
+    Route('/jobs/{job_id}', job_status),
+    Route('/jobs/{job_id}/result', job_result),
+    Route('/jobs/{job_id}/exports/{fmt}', job_export),
+    Route('/jobs/{job_id}/questions', ask_question, methods=['POST']),
+    Route('/history', search_history),
+])
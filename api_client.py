@@ -0,0 +1,59 @@
+import os
+
+import requests
+
+
+API_URL = os.getenv('LITENOTE_API_URL', '').rstrip('/')
+API_TIMEOUT = 30
+
+_session = requests.Session()
+
+
+class ApiError(Exception):
+    pass
+
+
+def _request(method, path, **kwargs):
+    try:
+        response = _session.request(method, f"{API_URL}{path}", timeout=API_TIMEOUT, **kwargs)
+    except requests.RequestException as e:
+        raise ApiError(f"Summarizer API unavailable: {str(e)}")
+    if response.status_code >= 400:
+        try:
+            message = response.json().get('error', response.text)
+        except ValueError:
+            message = response.text
+        raise ApiError(message)
+    return response
+
+
+def submit_job(url, lang_choice, summary_level, summary_style):
+    return _request('POST', '/jobs', json={
+        'url': url,
+        'lang_choice': lang_choice,
+        'summary_level': summary_level,
+        'summary_style': summary_style,
+    }).json()
+
+
+def get_job(job_id):
+    return _request('GET', f'/jobs/{job_id}').json()
+
+
+def get_result(job_id):
+    return _request('GET', f'/jobs/{job_id}/result').json()
+
+
+def get_export(job_id, fmt):
+    return _request('GET', f'/jobs/{job_id}/exports/{fmt}').content
+
+
+def ask(job_id, question, history=()):
+    return _request('POST', f'/jobs/{job_id}/questions', json={
+        'question': question,
+        'history': list(history),
+    }).json()
+
+
+def search_history(query, k=10):
+    return _request('GET', '/history', params={'q': query, 'k': k}).json()['results']
@@ -1,19 +1,20 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi
-from langdetect import detect
-from fpdf import FPDF
-from docx import Document
-from pptx import Presentation
-from pptx.util import Inches
 from streamlit_extras.colored_header import colored_header
 from streamlit_extras.add_vertical_space import add_vertical_space
+from functools import partial
+from compaction import compact_content
+from exports import render_export
+from langid import detect_language
+from llm import configure, generate_text
+from transcripts import fetch_transcript
+from summarizer import PROMPT_VERSION, derive_variant, map_reduce
+from summary_cache import get_cache, make_key
 
 # Load environment variables
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+configure(os.getenv("GOOGLE_API_KEY"))
 
 # Page Config
 st.set_page_config(page_title="YT Notes Generator", page_icon="🎬", layout="wide")
@@ -33,6 +34,8 @@ body {background-color: #f9fafc; font-family: 'Segoe UI', sans-serif;}
 </style>
 """, unsafe_allow_html=True)
 
+NOTES_MODEL = "gemini-2.5-flash"
+
 # Indian + global language fallback list
 language_fallbacks = [
     'en', 'hi', 'es', 'fr', 'de', 'ja', 'as', 'bn', 'gu', 'kn', 'ml', 'mr', 'or', 'pa', 'ta', 'te', 'ur'
@@ -43,18 +46,16 @@ language_fallbacks = [
 def extract_transcript_details(youtube_video_url):
     try:
         video_id = youtube_video_url.split("v=")[1].split("&")[0]
-        yt_api = YouTubeTranscriptApi()
-        transcript_list = yt_api.fetch(video_id, languages=language_fallbacks)
-        transcript = " ".join([entry.text for entry in transcript_list])
+        transcript = fetch_transcript(video_id, languages=language_fallbacks).text()
         return transcript, video_id
     except Exception as e:
         raise e
 
-# Generate Gemini content
-def generate_gemini_content(transcript_text, lang_choice, summary_level, summary_style):
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    detected_lang = detect(transcript_text[:500])
+# Language, length and style of the notes every other choice is rewritten from
+CANONICAL_OPTIONS = ("Auto (Transcript Language)", "Detailed", "Bullets")
+
 
+def notes_prompt(detected_lang, lang_choice, summary_level, summary_style):
     # Language instruction
     if lang_choice == "Auto (Transcript Language)":
         lang_instruction = f"The transcript is in **{detected_lang}**. Summarize in the same language."
@@ -113,8 +114,45 @@ def generate_gemini_content(transcript_text, lang_choice, summary_level, summary
 
     Output Format: Markdown only.
     """
-    response = model.generate_content(prompt + transcript_text)
-    return response.text
+    return prompt
+
+
+# Generate Gemini content
+def generate_gemini_content(transcript_text, lang_choice, summary_level, summary_style, on_chunk=None, report=None):
+    """Detailed notes from the transcript once, other languages, lengths and styles rewritten from them"""
+    detected_lang = detect_language(transcript_text)
+    generate = partial(generate_text, model_name=NOTES_MODEL)
+    canonical = (lang_choice, summary_level, summary_style) == CANONICAL_OPTIONS
+
+    def notes_key(language, level, style):
+        return make_key(
+            transcript_text, stage='yt-notes', model=NOTES_MODEL, language=language,
+            summary_level=level, summary_style=style, prompt_version=PROMPT_VERSION
+        )
+
+    def summarize():
+        # Drop caption noise and repeats, then summarize chunk by chunk and merge
+        compacted = compact_content(transcript_text, "youtube", model_name=NOTES_MODEL)
+        if report is not None:
+            report.update(tokens_before=compacted['tokens_before'], tokens_after=compacted['tokens_after'])
+        prompt = notes_prompt(detected_lang, *CANONICAL_OPTIONS)
+        return map_reduce(
+            compacted['content'],
+            build_prompt=lambda text: prompt + text,
+            generate=generate,
+            model_name=NOTES_MODEL,
+            kind="YouTube video transcript",
+            on_chunk=on_chunk if canonical else None
+        )
+
+    notes = get_cache().get_or_compute(notes_key(*CANONICAL_OPTIONS), summarize)
+    if canonical or not notes:
+        return notes
+
+    variant_key = notes_key(lang_choice, summary_level, summary_style)
+    return get_cache().get_or_compute(variant_key, lambda: derive_variant(
+        notes, "YouTube video", detected_lang, lang_choice, summary_level, summary_style, generate, on_chunk
+    ))
 
 # Sidebar
 with st.sidebar:
@@ -146,7 +184,8 @@ if youtube_link:
             ["Auto (Transcript Language)", "English", "Hindi", "Spanish", "French", "German"]
         )
     with col2:
-        summary_level = st.selectbox("Summary Length:", ["Brief", "Medium", "Detailed"])
+        # Detailed streams straight from the source; other lengths are rewritten from it afterwards
+        summary_level = st.selectbox("Summary Length:", ["Brief", "Medium", "Detailed"], index=2)
     summary_style = st.radio("Summary Style:", ["Bullets", "Paragraphs"])
 
 # Show thumbnail
@@ -156,60 +195,48 @@ if youtube_link and "v=" in youtube_link:
 
 # Generate summary
 if st.button("✨ Get Detailed Notes"):
-    with st.spinner("⏳ Extracting transcript & generating summary..."):
-        try:
+    try:
+        with st.spinner("⏳ Extracting transcript..."):
             transcript_text, video_id = extract_transcript_details(youtube_link)
 
-            summary = generate_gemini_content(
-                transcript_text, lang_choice, summary_level, summary_style
-            )
-
-            # Show summary
-            colored_header("📑 Detailed Notes", description=None, color_name="violet-70")
-            st.markdown(f"<div class='summary-box'>{summary}</div>", unsafe_allow_html=True)
+        # Show summary as it streams in
+        colored_header("📑 Detailed Notes", description=None, color_name="violet-70")
+        summary_box = st.empty()
+        streamed = []
 
-            # Downloads in one column
-            st.markdown("### 📥 Download Summary")
+        def render_chunk(text):
+            streamed.append(text)
+            summary_box.markdown(f"<div class='summary-box'>{''.join(streamed)}</div>", unsafe_allow_html=True)
 
-            # Create files first
-            # PDF
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.multi_cell(0, 10, summary)
-            pdf_file = "YT_Summary.pdf"
-            pdf.output(pdf_file)
-
-            # Word
-            doc = Document()
-            doc.add_heading("YouTube Summary", 0)
-            doc.add_paragraph(summary)
-            docx_file = "YT_Summary.docx"
-            doc.save(docx_file)
-
-            # PPT
-            prs = Presentation()
-            slide = prs.slides.add_slide(prs.slide_layouts[1])
-            slide.shapes.title.text = "YouTube Summary"
-            slide.placeholders[1].text = summary
-            pptx_file = "YT_Summary.pptx"
-            prs.save(pptx_file)
+        report = {}
+        with st.spinner("⏳ Generating summary..."):
+            summary = generate_gemini_content(
+                transcript_text, lang_choice, summary_level, summary_style, on_chunk=render_chunk, report=report
+            )
+        summary_box.markdown(f"<div class='summary-box'>{summary}</div>", unsafe_allow_html=True)
+        if report:
+            st.caption(f"🔢 Input tokens: {report['tokens_before']:,} → {report['tokens_after']:,} after compaction")
 
-            # Display buttons in one line
-            col1, col2, col3, col4 = st.columns(4)
+        # Downloads in one column
+        st.markdown("### 📥 Download Summary")
 
-            with col1:
-                st.download_button("TXT", summary, file_name="YT_Summary.txt")
+        # Files are rendered only when their button is clicked
+        col1, col2, col3, col4 = st.columns(4)
 
-            with col2:
-                st.download_button("PDF", data=open(pdf_file, "rb"), file_name=pdf_file)
+        with col1:
+            st.download_button("TXT", summary, file_name="YT_Summary.txt", on_click="ignore")
 
-            with col3:
-                st.download_button("Word", data=open(docx_file, "rb"), file_name=docx_file)
+        with col2:
+            st.download_button("PDF", data=partial(render_export, summary, "YouTube Summary", "pdf"),
+                               file_name="YT_Summary.pdf", on_click="ignore")
 
-            with col4:
-                st.download_button("PPT", data=open(pptx_file, "rb"), file_name=pptx_file)
+        with col3:
+            st.download_button("Word", data=partial(render_export, summary, "YouTube Summary", "docx"),
+                               file_name="YT_Summary.docx", on_click="ignore")
 
+        with col4:
+            st.download_button("PPT", data=partial(render_export, summary, "YouTube Summary", "pptx"),
+                               file_name="YT_Summary.pptx", on_click="ignore")
 
-        except Exception as e:
-            st.error(f"❌ Error: {e}")
+    except Exception as e:
+        st.error(f"❌ Error: {e}")
@@ -0,0 +1,272 @@
+"""Headless batch summarizer.
+
+Reads URLs (one per line) from a file or stdin, extracts and summarizes them
+concurrently and appends one JSON object per URL to the output file. The
+output doubles as the checkpoint: rerunning with the same output file skips
+URLs that already finished.
+
+    python batch.py urls.txt -o results.jsonl --summarize-concurrency 4 --summarize-rate 60/min
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import history
+import metrics
+from llm import DEFAULT_MODEL, configure, generate_text
+from exports import render_export
+from pipeline import canonical_url, extract_content, is_valid_url
+from playlists import collection_notes, is_collection_url, summarize_collection
+from qa import store_document
+from summarizer import summarize_content
+
+
+RATE_UNITS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600}
+
+
+def parse_rate(value):
+    """Requests per second from "5", "5/s", "60/min" or "1000/h"; 0 means unlimited"""
+    if '/' not in value:
+        return float(value)
+    count, unit = value.split('/', 1)
+    if unit not in RATE_UNITS:
+        raise argparse.ArgumentTypeError(f"Unknown rate unit: {unit}")
+    return float(count) / RATE_UNITS[unit]
+
+
+class RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per second"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Stage:
+    """Concurrency and rate limit for one pipeline stage"""
+
+    def __init__(self, concurrency, rate):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate, burst=concurrency)
+
+    async def run(self, func, *args):
+        async with self.semaphore:
+            await self.limiter.acquire()
+            return await asyncio.to_thread(func, *args)
+
+
+def read_urls(source):
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        urls = []
+        seen = set()
+        for line in stream:
+            url = line.strip()
+            if url and not url.startswith('#') and url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def load_checkpoint(output, retry_failed):
+    """URLs already present in the output file"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a half-written last line
+                continue
+            if record.get('status') == 'ok' or not retry_failed:
+                done.add(record['url'])
+    return done
+
+
+def write_exports(export_dir, url, summary, title):
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+    paths = {}
+    for extension in ('pdf', 'docx', 'pptx'):
+        path = os.path.join(export_dir, f"{name}.{extension}")
+        with open(path, 'wb') as f:
+            f.write(render_export(summary, title, extension))
+        paths[extension] = path
+    return paths
+
+
+async def process_url(url, args, stages, writer):
+    record = {'url': url, 'status': 'ok', 'timings': {}}
+    started = time.perf_counter()
+    stage = 'extract'
+    try:
+        if not is_valid_url(url):
+            raise ValueError("Invalid URL")
+
+        generate = partial(generate_text, model_name=args.model)
+        if is_collection_url(url):
+            # Fetching a collection's transcripts happens inside its summarization
+            stage = 'summarize'
+            t = time.perf_counter()
+            result = await stages['summarize'].run(partial(
+                summarize_collection, url, args.lang, args.length, args.style, generate, args.model
+            ))
+            record['timings']['summarize'] = round(time.perf_counter() - t, 3)
+            content = collection_notes(result)
+            record.update({
+                'content_type': result['content_type'],
+                'method': result['method'],
+                'title': result['title'],
+                'content_chars': len(content),
+                'skipped_videos': [{'video_id': v['video_id'], 'error': v['error']}
+                            for v in result['videos'] if v['status'] == 'skipped'],
+            })
+            record.update(result['report'])
+            summary = result['summary']
+        else:
+            t = time.perf_counter()
+            extracted, content_type = await stages['extract'].run(extract_content, url)
+            record['timings']['extract'] = round(time.perf_counter() - t, 3)
+            if not extracted or not extracted.get('content'):
+                raise ValueError("Failed to extract content")
+            content = extracted['content']
+            record.update({
+                'content_type': content_type,
+                'method': extracted.get('method'),
+                'title': extracted.get('title'),
+                'content_chars': len(content),
+            })
+
+            stage = 'summarize'
+            t = time.perf_counter()
+            report = {}
+            summary = await stages['summarize'].run(partial(
+                summarize_content, extracted, args.lang, args.length, args.style, content_type,
+                generate=generate, model_name=args.model, report=report
+            ))
+            record['timings']['summarize'] = round(time.perf_counter() - t, 3)
+            record.update(report)
+        if not summary:
+            raise ValueError("Empty summary")
+        record['summary'] = summary
+        # Stored like the UI's summaries, so one reused from the history can still answer questions
+        record['document_id'] = store_document(record['title'], content, record['content_type'])
+        history.record_async(
+            url, canonical_url(url), [args.lang, args.length, args.style, args.model],
+            {'summary': summary, 'title': record['title'], 'method': record['method'],
+             'content_type': record['content_type'], 'document_id': record['document_id']}, content
+        )
+
+        if args.export_dir:
+            stage = 'export'
+            t = time.perf_counter()
+            record['exports'] = await stages['export'].run(
+                write_exports, args.export_dir, url, summary, record['title'] or 'Summary'
+            )
+            record['timings']['export'] = round(time.perf_counter() - t, 3)
+    except Exception as e:
+        record['status'] = 'error'
+        record['stage'] = stage
+        record['error'] = f"{type(e).__name__}: {e}"
+
+    record['timings']['total'] = round(time.perf_counter() - started, 3)
+    await writer(record)
+    return record
+
+
+async def run(args):
+    urls = read_urls(args.input)
+    done = load_checkpoint(args.output, args.retry_failed)
+    pending = [url for url in urls if url not in done]
+    print(f"{len(urls)} URLs, {len(urls) - len(pending)} already done, {len(pending)} to process", file=sys.stderr)
+    if not pending:
+        return 0
+
+    if args.export_dir:
+        os.makedirs(args.export_dir, exist_ok=True)
+
+    workers = args.extract_concurrency + args.summarize_concurrency + args.export_concurrency
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+    stages = {
+        'extract': Stage(args.extract_concurrency, args.extract_rate),
+        'summarize': Stage(args.summarize_concurrency, args.summarize_rate),
+        'export': Stage(args.export_concurrency, 0),
+    }
+
+    lock = asyncio.Lock()
+    counts = {'ok': 0, 'error': 0}
+    with open(args.output, 'a', encoding='utf-8') as out:
+        async def writer(record):
+            async with lock:
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                counts[record['status']] += 1
+                finished = counts['ok'] + counts['error']
+                print(f"[{finished}/{len(pending)}] {record['status']} {record['url']} "
+                      f"({record['timings']['total']}s)", file=sys.stderr)
+
+        await asyncio.gather(*(process_url(url, args, stages, writer) for url in pending))
+
+    print(f"Done: {counts['ok']} ok, {counts['error']} failed", file=sys.stderr)
+    return 1 if counts['error'] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Summarize many URLs without the Streamlit UI")
+    parser.add_argument('input', help="File with one URL per line, or - for stdin")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="JSONL results file, also used to resume")
+    parser.add_argument('--lang', default="Auto (Content Language)", help="Summary language")
+    # Detailed is the canonical summary; other lengths cost a second Gemini call per URL
+    parser.add_argument('--length', default="Detailed", choices=["Brief", "Medium", "Detailed"])
+    parser.add_argument('--style', default="Bullets", choices=["Bullets", "Paragraphs"])
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--extract-concurrency', type=int, default=8)
+    parser.add_argument('--summarize-concurrency', type=int, default=4)
+    parser.add_argument('--export-concurrency', type=int, default=2)
+    parser.add_argument('--extract-rate', type=parse_rate, default=0, help="e.g. 10/s; 0 for no limit")
+    parser.add_argument('--summarize-rate', type=parse_rate, default=0, help="e.g. 60/min; 0 for no limit")
+    parser.add_argument('--export-dir', help="Also write PDF/DOCX/PPTX files here")
+    parser.add_argument('--retry-failed', action='store_true', help="Reprocess URLs that failed in a previous run")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        print("GOOGLE_API_KEY is not set", file=sys.stderr)
+        return 2
+    configure(api_key)
+    metrics.serve()
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""Offline extraction benchmark over the recorded fixture corpus.
+
+Serves bench/fixtures from a local HTTP server, fetches every page through
+the real fetcher and runs each extraction strategy and the full chain over
+them. Reports pages/sec, peak traced memory and word-overlap F1 against the
+gold text, plus clean_text throughput on large inputs, streaming
+extraction of generated multi-megabyte pages and transcript chaptering. Results are written as sorted JSON so two runs can be diffed.
+
+    python bench/extraction.py                        # writes bench/results/extraction-<rev>.json
+    python bench/extraction.py --compare old.json     # also print the change against an earlier run
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from types import SimpleNamespace
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+import fetcher  # noqa: E402
+from bench.fixture_server import gold_text, page_names, serve_fixtures, transcript_names  # noqa: E402
+from extraction import (  # noqa: E402
+    STRATEGIES, STREAM_MAX_CHARS, StreamingExtractor, clean_text, extract_from_html, parse_html
+)
+from transcripts import TimedTranscript, build_chapters  # noqa: E402
+
+
+CLEAN_TEXT_SIZES_MB = (1, 8)
+# All above fetcher.LARGE_PAGE_BYTES, so every one is streamed
+LARGE_PAGE_SIZES_MB = (8, 16, 64)
+
+
+def _words(text):
+    return Counter(word.lower() for word in (text or '').split())
+
+
+def overlap(extracted, gold):
+    """Word-level precision, recall and F1 of extracted text against gold"""
+    found, expected = _words(extracted), _words(gold)
+    common = sum((found & expected).values())
+    if not common:
+        return {'precision': 0.0, 'recall': 0.0, 'f1': 0.0}
+    precision = common / sum(found.values())
+    recall = common / sum(expected.values())
+    return {'precision': precision, 'recall': recall, 'f1': 2 * precision * recall / (precision + recall)}
+
+
+def _peak_kb(run):
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def load_pages(base_url):
+    pages = []
+    for name in page_names():
+        fetched = fetcher.fetch_url(f"{base_url}/pages/{name}.html")
+        pages.append({
+            'name': name,
+            'url': fetched['final_url'],
+            'content': fetched['content'],
+            'text': fetcher.decode_body(fetched),
+            'gold': gold_text(name),
+        })
+    return pages
+
+
+def bench_extractors(pages, rounds):
+    runners = {strategy.__name__[len('extract_with_'):]: strategy for strategy in STRATEGIES}
+    results = {}
+    per_page = {page['name']: {} for page in pages}
+    trees = {page['name']: parse_html(page['content']) for page in pages}
+
+    for name, strategy in sorted(runners.items()):
+        def run_all():
+            return [strategy(trees[page['name']], page['url'], page['text']) for page in pages]
+
+        outputs = run_all()  # warm-up: lazy imports and first-call setup
+        started = time.perf_counter()
+        for _ in range(rounds):
+            run_all()
+        elapsed = time.perf_counter() - started
+        results[name] = _summarize(pages, outputs, elapsed, rounds, _peak_kb(run_all), per_page, name)
+
+    def run_chain():
+        return [extract_from_html(page['url'], page['content'], page['text']) for page in pages]
+
+    outputs = run_chain()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run_chain()
+    elapsed = time.perf_counter() - started
+    results['chain'] = _summarize(pages, outputs, elapsed, rounds, _peak_kb(run_chain), per_page, 'chain')
+    results['chain']['winners'] = dict(Counter(output['method'] for output in outputs if output))
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            parse_html(page['content'])
+    results['parse'] = {'pages_per_sec': round(len(pages) * rounds / (time.perf_counter() - started), 1)}
+    return results, per_page
+
+
+def _summarize(pages, outputs, elapsed, rounds, peak_kb, per_page, name):
+    scores = []
+    for page, output in zip(pages, outputs):
+        score = overlap(output['content'] if output else '', page['gold'])
+        per_page[page['name']][name] = round(score['f1'], 3)
+        scores.append(score)
+    return {
+        'pages_per_sec': round(len(pages) * rounds / elapsed, 1),
+        'peak_kb': round(peak_kb),
+        'precision': round(sum(s['precision'] for s in scores) / len(scores), 3),
+        'recall': round(sum(s['recall'] for s in scores) / len(scores), 3),
+        'f1': round(sum(s['f1'] for s in scores) / len(scores), 3),
+        'failures': sum(1 for output in outputs if not output),
+    }
+
+
+def bench_clean_text(pages):
+    # Raw page text with the whitespace noise clean_text exists to remove
+    sample = '\n\n   \n'.join(page['gold'].replace(' ', '  \t ') for page in pages)
+    results = {}
+    for size_mb in CLEAN_TEXT_SIZES_MB:
+        text = (sample * (size_mb * 1024 * 1024 // len(sample) + 1))[:size_mb * 1024 * 1024]
+        started = time.perf_counter()
+        clean_text(text)
+        elapsed = time.perf_counter() - started
+        results[f'{size_mb}mb'] = {
+            'mb_per_sec': round(size_mb / elapsed, 1),
+            'peak_kb': round(_peak_kb(lambda: clean_text(text))),
+        }
+    return results
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def bench_large_pages(base_url):
+    """Streamed fetch and extraction of generated pages; RSS should not grow with page size
+
+    The default text cap stops reading early on text-heavy pages, so the
+    largest page is also read in full with no cap; its RSS growth is then
+    mostly the extracted text itself.
+    """
+    results = {}
+    runs = [(size_mb, f'{size_mb}mb', STREAM_MAX_CHARS) for size_mb in LARGE_PAGE_SIZES_MB]
+    runs.append((LARGE_PAGE_SIZES_MB[-1], f'{LARGE_PAGE_SIZES_MB[-1]}mb_uncapped', float('inf')))
+    for size_mb, name, max_chars in runs:
+        url = f"{base_url}/large/{size_mb}mb.html"
+        streaming = StreamingExtractor(url, max_chars=max_chars)
+        before = _rss_mb()
+        started = time.perf_counter()
+        fetched = fetcher.fetch_url(url, stream_parser=streaming)
+        result = streaming.result()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'seconds': round(elapsed, 3),
+            'read_mb': round(fetched['size'] / (1024 * 1024), 1),
+            'chars': len(result['content']) if result else 0,
+            'rss_growth_mb': round(_rss_mb() - before, 1),
+        }
+    return results
+
+
+def bench_transcripts(base_url, rounds):
+    results = {}
+    for name in transcript_names():
+        data = json.loads(fetcher.decode_body(fetcher.fetch_url(f"{base_url}/transcripts/{name}.json")))
+        snippets = [SimpleNamespace(**segment) for segment in data['segments']]
+
+        def run():
+            transcript = TimedTranscript(data['video_id'], data['language_code'], data['is_generated'], snippets)
+            chapters = build_chapters(transcript)
+            clean_text(transcript.text())
+            return transcript, chapters
+
+        transcript, chapters = run()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            run()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'segments': len(snippets),
+            'kept_segments': len(transcript),
+            'chapters': len(chapters),
+            'segments_per_sec': round(len(snippets) * rounds / elapsed),
+            'peak_kb': round(_peak_kb(run)),
+        }
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(old, new, path=()):
+    """Print numeric differences between two result files"""
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, dict) and isinstance(b, dict):
+            compare(a, b, path + (key,))
+        elif isinstance(a, (int, float)) and isinstance(b, (int, float)) and a != b and key != 'revision':
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "new"
+            print(f"  {'.'.join(path + (key,)):<48} {a:>10} -> {b:<10} {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help="timed passes over the corpus")
+    parser.add_argument('-o', '--output', help="result file (default bench/results/extraction-<rev>.json)")
+    parser.add_argument('--compare', metavar='FILE', help="earlier result file to diff against")
+    args = parser.parse_args(argv)
+
+    server, base_url = serve_fixtures()
+    try:
+        pages = load_pages(base_url)
+        extractors, per_page = bench_extractors(pages, args.rounds)
+        results = {
+            'meta': {
+                'revision': _git_revision(),
+                'python': platform.python_version(),
+                'pages': len(pages),
+                'rounds': args.rounds,
+                # tracemalloc only sees Python objects; this includes lxml's C allocations
+                'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+            },
+            'extractors': extractors,
+            'pages': per_page,
+            'clean_text': bench_clean_text(pages),
+            'large_pages': bench_large_pages(base_url),
+            'transcripts': bench_transcripts(base_url, args.rounds),
+        }
+    finally:
+        server.shutdown()
+
+    print(f"{'extractor':<14} {'pages/s':>9} {'peak KB':>9} {'precision':>10} {'recall':>8} {'f1':>6}")
+    for name, row in extractors.items():
+        if 'f1' in row:
+            print(f"{name:<14} {row['pages_per_sec']:>9} {row['peak_kb']:>9} "
+                  f"{row['precision']:>10} {row['recall']:>8} {row['f1']:>6}")
+    print(f"{'parse':<14} {extractors['parse']['pages_per_sec']:>9}")
+    for size, row in results['large_pages'].items():
+        print(f"{'stream ' + size:<14} {row['seconds']:>8}s  read {row['read_mb']} MB, "
+              f"{row['chars']} chars, RSS +{row['rss_growth_mb']} MB")
+
+    output = args.output or os.path.join(BENCH, 'results', f"extraction-{results['meta']['revision']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        print(f"\nchanges since {previous['meta']['revision']}:")
+        compare(previous, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
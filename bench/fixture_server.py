@@ -0,0 +1,109 @@
+"""Local HTTP stand-in that serves the recorded fixture corpus.
+
+    /pages/<name>.html          saved web pages (gold text in <name>.gold.txt)
+    /transcripts/<name>.json    caption tracks as {"video_id", "language_code", "is_generated", "segments"}
+
+    /large/<n>mb.html           a generated forum thread of about n MB, streamed
+
+Pages requested with ?nonce=<value> get the value appended to their longest
+text block, so repeated requests produce distinct content and miss the summary cache.
+"""
+import os
+import re
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+# Text-only elements; the longest one is always part of the main content
+_text_block_re = re.compile(r'<(p|li|div)\b[^>]*>([^<]+)</\1>')
+_large_re = re.compile(r'^/large/(\d+)mb\.html$')
+
+LARGE_PAGE_HEAD = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Long forum thread</title>'
+    '<style>.post { margin: 1em; }</style></head><body>'
+    '<nav><a href="/">Forum</a> <a href="/latest">Latest</a> <a href="/login">Log in</a></nav>'
+    '<main><h1>Long forum thread</h1>'
+)
+LARGE_PAGE_TAIL = '</main><footer>All rights reserved. Privacy policy.</footer></body></html>'
+LARGE_PAGE_POST = (
+    '<div class="post" id="post-{n}"><div class="author">member{user}</div>'
+    '<p>Reply {n}: I tried the approach from the earlier posts on a bigger dataset and the results held up, '
+    'although the setup took longer than expected because the defaults were not documented anywhere.</p>'
+    '<p>For anyone following along, the important part is to change one setting at a time and write down '
+    'what happened, otherwise it is impossible to tell which change made the difference.</p>'
+    '<script>window.__votes = window.__votes || {{}}; window.__votes[{n}] = {user};</script></div>\n'
+)
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        large = _large_re.match(path)
+        if large:
+            return self._send_large(int(large.group(1)) * 1024 * 1024)
+        nonce = parse_qs(query).get('nonce')
+        if not nonce or not path.endswith('.html'):
+            return super().do_GET()
+        try:
+            with open(self.translate_path(path), encoding='utf-8') as f:
+                page = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        block = max(_text_block_re.finditer(page), key=lambda m: len(m.group(2)))
+        page = page[:block.end(2)] + f' Reference {nonce[0]}.' + page[block.end(2):]
+        body = page.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def _send_large(self, size):
+        """Stream a generated page of about `size` bytes without building it in memory"""
+        head, tail = LARGE_PAGE_HEAD.encode('utf-8'), LARGE_PAGE_TAIL.encode('utf-8')
+        post_size = len(LARGE_PAGE_POST.format(n=0, user=0).encode('utf-8'))
+        posts = max(1, (size - len(head) - len(tail)) // post_size)
+        # No Content-Length: the body ends when the connection closes, like many dynamic pages
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        try:
+            self.wfile.write(head)
+            for start in range(0, posts, 200):
+                self.wfile.write(''.join(
+                    LARGE_PAGE_POST.format(n=n, user=n % 97) for n in range(start, min(posts, start + 200))
+                ).encode('utf-8'))
+            self.wfile.write(tail)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. after its byte or text cap
+            pass
+
+
+def serve_fixtures(port=0):
+    """Start the server on a background thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(_QuietHandler, directory=FIXTURES))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def page_names():
+    return sorted(name[:-5] for name in os.listdir(os.path.join(FIXTURES, 'pages')) if name.endswith('.html'))
+
+
+def transcript_names():
+    return sorted(name[:-5] for name in os.listdir(os.path.join(FIXTURES, 'transcripts')) if name.endswith('.json'))
+
+
+def gold_text(name):
+    with open(os.path.join(FIXTURES, 'pages', f'{name}.gold.txt'), encoding='utf-8') as f:
+        return f.read()
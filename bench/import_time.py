@@ -0,0 +1,114 @@
+"""Cold-start import benchmark.
+
+Imports each startup module in a fresh interpreter with ``-X importtime`` and
+reports the median wall time. Exits non-zero when a module pulls in one of
+the libraries that are meant to load lazily, or when it exceeds its budget.
+
+    python bench/import_time.py                   # check the startup modules
+    python bench/import_time.py --profile main    # slowest imports of one module
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only when extraction, transcripts, exports or Gemini calls need them
+LAZY_MODULES = [
+    'trafilatura',
+    'newspaper',
+    'fpdf',
+    'docx',
+    'pptx',
+    'google.generativeai',
+    'youtube_transcript_api',
+]
+
+# Module -> import budget in milliseconds (cold, median of the runs)
+STARTUP_MODULES = {
+    'pipeline': 400,
+    'summarizer': 400,
+    'exports': 50,
+    'llm': 40,
+    'jobs': 400,
+    'batch': 400,
+}
+
+_line_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def import_profile(module):
+    """(self us, cumulative us, depth, name) for every module imported by `module`"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _line_re.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return rows
+
+
+def measure(module, runs):
+    """Median cumulative import time in ms and the set of modules loaded"""
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        rows = import_profile(module)
+        times.append(next(cumulative for _, cumulative, _, name in rows if name == module) / 1000)
+        loaded = {name for _, _, _, name in rows}
+    return statistics.median(times), loaded
+
+
+def check(runs):
+    failures = []
+    for module, budget in STARTUP_MODULES.items():
+        elapsed, loaded = measure(module, runs)
+        eager = [lazy for lazy in LAZY_MODULES if lazy in loaded]
+        status = 'ok'
+        if eager:
+            status = 'EAGER ' + ', '.join(eager)
+            failures.append(module)
+        elif elapsed > budget:
+            status = 'OVER BUDGET'
+            failures.append(module)
+        print(f"{module:<12} {elapsed:8.1f} ms  (budget {budget} ms)  {status}")
+    return failures
+
+
+def profile(module, top):
+    rows = import_profile(module)
+    print(f"{'self ms':>9} {'cumul ms':>9}  module")
+    for self_us, cumulative, depth, name in sorted(rows, key=lambda row: row[0], reverse=True)[:top]:
+        print(f"{self_us / 1000:9.1f} {cumulative / 1000:9.1f}  {name}")
+    top_level = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0)
+    print(f"\ntotal {top_level / 1000:.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument('--profile', metavar='MODULE', help="print the slowest imports of MODULE instead")
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profile(args.profile, args.top)
+        return 0
+    failures = check(args.runs)
+    if failures:
+        print(f"\nregressed: {', '.join(failures)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Incremental re-summarization benchmark.
+
+Summarizes a generated long article against the mock Gemini server, then
+summarizes edited versions of it (one paragraph changed, one added, one
+removed, a new lead paragraph or opening section) the way a page re-fetched the next day would
+be. Reports Gemini requests, prompt characters sent and seconds for each,
+with section reuse on and off.
+
+    python bench/incremental.py --paragraphs 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from functools import partial
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+from bench import mock_gemini  # noqa: E402
+from bench.fixture_server import gold_text, page_names  # noqa: E402
+
+
+def article(paragraphs, seed=0):
+    """Paragraphs of distinct sentences built from the fixture pages' vocabulary"""
+    rng = random.Random(seed)
+    words = sorted({w.strip('.,;:()"').lower() for name in page_names() for w in gold_text(name).split()} - {''})
+    result = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(2, 7)):
+            sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 24)))
+            sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        result.append(' '.join(sentences))
+    return result
+
+
+def edits(paragraphs):
+    """(name, paragraphs) for each edited version of the article"""
+    middle = len(paragraphs) // 2
+    changed = list(paragraphs)
+    changed[middle] += " This figure was corrected on Tuesday after readers pointed out an error."
+    added = paragraphs[:middle] + ["Update: the committee published its full report this morning."] + paragraphs[middle:]
+    return [
+        ('one_paragraph_changed', changed),
+        ('one_paragraph_added', added),
+        ('one_paragraph_removed', paragraphs[:middle] + paragraphs[middle + 1:]),
+        ('new_lead_paragraph', ["Editor's note: this story has been updated with new figures."] + paragraphs),
+        ('new_opening_section', article(4, seed=1) + paragraphs),
+    ]
+
+
+def run(summarizer, generate, mock, paragraphs):
+    before = mock.stats()
+    report = {}
+    started = time.perf_counter()
+    summarizer.summarize_content(
+        {'content': '\n'.join(paragraphs), 'title': 'Bench article'}, "English", "Medium", "Bullets", "website",
+        generate, 'bench-model', report=report
+    )
+    after = mock.stats()
+    return {
+        'seconds': round(time.perf_counter() - started, 2),
+        'requests': after['requests'] - before['requests'],
+        'prompt_chars': after['prompt_chars'] - before['prompt_chars'],
+        'sections': report.get('sections'),
+        'sections_reused': report.get('sections_reused'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=300, help="paragraphs in the generated article")
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    mock_gemini.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    mock, endpoint = mock_gemini.serve(**mock_gemini.mock_options(args))
+    # Configured before the pipeline modules read their settings at import
+    os.environ['LITENOTE_LLM_ENDPOINT'] = endpoint
+    os.environ['LITENOTE_DEDUP'] = '0'
+
+    import llm
+    import summarizer
+    import summary_cache
+    llm.configure('bench')
+    generate = partial(llm.generate_text, model_name='bench-model')
+
+    paragraphs = article(args.paragraphs)
+    results = {}
+    try:
+        for incremental in (False, True):
+            summarizer.INCREMENTAL = incremental
+            summary_cache._cache = summary_cache.SummaryCache(
+                os.path.join(tempfile.mkdtemp(prefix='litenote-incremental-'), 'cache.sqlite3')
+            )
+            mode = 'sections' if incremental else 'full'
+            results[mode] = {'first_summary': run(summarizer, generate, mock, paragraphs)}
+            for name, edited in edits(paragraphs):
+                results[mode][name] = run(summarizer, generate, mock, edited)
+    finally:
+        mock.shutdown()
+
+    print(f"{args.paragraphs} paragraphs")
+    print(f"{'mode':<9} {'version':<24} {'requests':>9} {'prompt chars':>13} {'seconds':>8}  sections reused")
+    for mode, rows in results.items():
+        for name, row in rows.items():
+            reused = f"{row['sections_reused']}/{row['sections']}" if row['sections'] else '-'
+            print(f"{mode:<9} {name:<24} {row['requests']:>9} {row['prompt_chars']:>13} {row['seconds']:>8}  {reused}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nwrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
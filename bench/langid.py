@@ -0,0 +1,110 @@
+"""Language identification benchmark.
+
+Compares langid.detect_language with the old langdetect.detect(text[:500])
+over the fixture corpus, plus documents that open with an English cookie
+banner or intro in front of the real content. Reports profile load time,
+documents/sec with and without the content-hash cache, accuracy, and whether
+repeated runs agree.
+
+    python bench/langid.py --rounds 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+import langid  # noqa: E402
+from bench.fixture_server import FIXTURES, gold_text, page_names, transcript_names  # noqa: E402
+
+
+EXPECTED_PAGES = {'spanish_article': 'es'}
+COOKIE_BANNER = ("We use cookies and similar technologies to improve your experience, measure traffic and show "
+                 "relevant offers. By clicking accept you agree to our cookie policy and privacy terms. ")
+ENGLISH_INTRO = ("Hi everyone and welcome back to the channel. Today we're going to talk about the history of the "
+                 "region, so make sure you subscribe and hit the bell icon before we get started. ")
+HINDI_BODY = ("यह वीडियो भारत के इतिहास के बारे में है और इसमें कई महत्वपूर्ण घटनाओं का वर्णन किया गया है। "
+              "हम देखेंगे कि व्यापार, खेती और शहरों ने समय के साथ कैसे बदलाव किया। ")
+
+
+def corpus():
+    """(name, text, expected language) for every benchmark document"""
+    docs = []
+    for name in page_names():
+        text = gold_text(name)
+        expected = EXPECTED_PAGES.get(name, 'en')
+        docs.append((name, text, expected))
+        if expected != 'en':
+            docs.append((f'{name}+cookie_banner', COOKIE_BANNER * 3 + text, expected))
+    for name in transcript_names():
+        with open(os.path.join(FIXTURES, 'transcripts', f'{name}.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        docs.append((name, ' '.join(segment['text'] for segment in data['segments']), data['language_code']))
+    docs.append(('hindi_video+english_intro', ENGLISH_INTRO * 2 + HINDI_BODY * 20, 'hi'))
+    return docs
+
+
+def baseline(text):
+    from langdetect import detect
+    try:
+        return detect(text[:500])
+    except Exception:
+        return 'unknown'
+
+
+def measure(detect, docs, rounds, clear=None):
+    answers = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        if clear:
+            clear()
+        answers.append([detect(text) for _, text, _ in docs])
+    elapsed = time.perf_counter() - started
+    first = answers[0]
+    return {
+        'docs_per_sec': round(len(docs) * rounds / elapsed, 1),
+        'accuracy': round(sum(got == expected for got, (_, _, expected) in zip(first, docs)) / len(docs), 3),
+        'stable': all(run == first for run in answers),
+        'wrong': {name: got for got, (name, _, expected) in zip(first, docs) if got != expected},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help="passes over the corpus")
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    docs = corpus()
+    started = time.perf_counter()
+    langid.preload()
+    load_seconds = time.perf_counter() - started
+
+    results = {
+        'docs': len(docs),
+        'profile_load_sec': round(load_seconds, 3),
+        'langdetect_first_500': measure(baseline, docs, args.rounds),
+        'langid_uncached': measure(langid.detect_language, docs, args.rounds, clear=langid._cache.clear),
+        'langid_cached': measure(langid.detect_language, docs, args.rounds),
+    }
+
+    print(f"{len(docs)} documents, profiles loaded in {results['profile_load_sec']}s")
+    print(f"{'detector':<22} {'docs/s':>9} {'accuracy':>9} {'stable':>7}  wrong")
+    for name in ('langdetect_first_500', 'langid_uncached', 'langid_cached'):
+        row = results[name]
+        print(f"{name:<22} {row['docs_per_sec']:>9} {row['accuracy']:>9} {str(row['stable']):>7}  {row['wrong']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nwrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
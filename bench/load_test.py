@@ -0,0 +1,259 @@
+"""End-to-end load test against local stand-ins.
+
+Runs simulated sessions through pipeline.summarize_url, the same path the app
+and API use, at one or more concurrency levels. Gemini is replaced by the
+mock in bench/mock_gemini.py (through LITENOTE_LLM_ENDPOINT), web pages are
+served by the fixture server, and YouTube transcripts are loaded from the
+fixture corpus instead of youtube.com. Each session's content is made unique
+so every session does the full work, unless --cache is given.
+
+Per level it reports throughput, p50/p99 end-to-end latency and time to
+first token, memory per session, and where time and queues build up: the
+busiest pipeline stages, the extraction pool backlog and requests in flight
+at the mock.
+
+    python bench/load_test.py --concurrency 1,4,16 --sessions 40 --latency 0.8 --error-rate 0.02
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+from bench import mock_gemini  # noqa: E402
+from bench.fixture_server import page_names, serve_fixtures, transcript_names  # noqa: E402
+
+
+SAMPLE_INTERVAL = 0.05
+
+_nonces = itertools.count(1)
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def patch_youtube(base_url):
+    """Serve transcripts from the fixture corpus; video ids look like <fixture id>-<nonce>"""
+    import fetcher
+    import transcripts
+
+    tracks = {}
+    for name in transcript_names():
+        data = json.loads(fetcher.decode_body(fetcher.fetch_url(f"{base_url}/transcripts/{name}.json")))
+        tracks[data['video_id']] = data
+
+    def fetch_transcript(video_id, languages=None):
+        fixture_id, _, nonce = video_id.partition('-')
+        data = tracks[fixture_id]
+        snippets = [SimpleNamespace(**segment) for segment in data['segments']]
+        if nonce:
+            end = snippets[-1].start + snippets[-1].duration
+            snippets.append(SimpleNamespace(text=f"reference {nonce}", start=end, duration=1.0))
+        with transcripts.metrics.span('transcript'):
+            return transcripts.TimedTranscript(video_id, data['language_code'], data['is_generated'], snippets)
+
+    def fetch_video_details(video_id):
+        return {'title': f"Fixture video {video_id}", 'description': ''}
+
+    transcripts.fetch_transcript = fetch_transcript
+    transcripts.fetch_video_details = fetch_video_details
+    return sorted(tracks)
+
+
+class Sampler(threading.Thread):
+    """Samples RSS, sessions in flight, extraction backlog and mock in-flight requests"""
+
+    def __init__(self, mock, active):
+        super().__init__(daemon=True)
+        self.mock = mock
+        self.active = active
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        import extraction
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            executor = extraction._executor
+            self.samples.append({
+                'rss_mb': _rss_mb(),
+                'sessions': self.active[0],
+                'extract_backlog': executor._work_queue.qsize() if executor else 0,
+                'llm_in_flight': self.mock.in_flight,
+            })
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_level(concurrency, session_urls, args, mock):
+    import metrics
+    from pipeline import summarize_url
+
+    metrics.reset()
+    mock_before = mock.stats()
+    active = [0]
+    lock = threading.Lock()
+    rng = random.Random(concurrency)
+
+    def session(url):
+        if not args.cache:
+            nonce = next(_nonces)
+            url = f"{url}-{nonce}" if 'youtube.com' in url else f"{url}?nonce={nonce}"
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time))
+        with lock:
+            active[0] += 1
+        started = time.perf_counter()
+        first_token = []
+
+        def on_chunk(text):
+            if not first_token:
+                first_token.append(time.perf_counter() - started)
+
+        try:
+            summarize_url(url, "Auto (Content Language)", args.summary_level, "Bullets", on_chunk=on_chunk)
+            status = 'ok'
+        except Exception as e:
+            status = type(e).__name__
+        finally:
+            with lock:
+                active[0] -= 1
+        elapsed = time.perf_counter() - started
+        return {'status': status, 'latency': elapsed, 'ttft': first_token[0] if first_token else None}
+
+    baseline_rss = _rss_mb()
+    sampler = Sampler(mock, active)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        records = list(pool.map(session, session_urls))
+    wall = time.perf_counter() - started
+    sampler.stop()
+
+    ok = [r for r in records if r['status'] == 'ok']
+    latencies = [r['latency'] for r in ok]
+    ttfts = [r['ttft'] for r in ok if r['ttft'] is not None]
+    samples = sampler.samples or [{'rss_mb': baseline_rss, 'sessions': 0, 'extract_backlog': 0, 'llm_in_flight': 0}]
+    peak_rss = max(s['rss_mb'] for s in samples)
+    mock_after = mock.stats()
+    stages = metrics.stage_summary()
+    busiest = sorted(stages.items(), key=lambda item: item[1]['mean'] * item[1]['count'], reverse=True)
+
+    return {
+        'concurrency': concurrency,
+        'sessions': len(session_urls),
+        'ok': len(ok),
+        'errors': {status: sum(1 for r in records if r['status'] == status)
+                   for status in sorted({r['status'] for r in records} - {'ok'})},
+        'throughput_per_sec': round(len(ok) / wall, 3),
+        'latency_p50': round(_percentile(latencies, 0.5), 3),
+        'latency_p99': round(_percentile(latencies, 0.99), 3),
+        'ttft_p50': round(_percentile(ttfts, 0.5), 3),
+        'ttft_p99': round(_percentile(ttfts, 0.99), 3),
+        'rss_baseline_mb': round(baseline_rss, 1),
+        'rss_peak_mb': round(peak_rss, 1),
+        'mb_per_session': round(max(0.0, peak_rss - baseline_rss) / concurrency, 2),
+        'queues': {
+            'sessions_mean': round(statistics.mean(s['sessions'] for s in samples), 2),
+            'extract_backlog_max': max(s['extract_backlog'] for s in samples),
+            'extract_backlog_mean': round(statistics.mean(s['extract_backlog'] for s in samples), 2),
+            'llm_in_flight_max': max(s['llm_in_flight'] for s in samples),
+            'llm_in_flight_mean': round(statistics.mean(s['llm_in_flight'] for s in samples), 2),
+            'llm_requests': mock_after['requests'] - mock_before['requests'],
+        },
+        'stages': {
+            stage: {key: round(value, 4) for key, value in values.items()} for stage, values in busiest
+        },
+    }
+
+
+def print_level(result):
+    failed = f", failed {result['errors']}" if result['errors'] else ""
+    print(f"\nconcurrency {result['concurrency']}: {result['ok']}/{result['sessions']} ok{failed}")
+    print(f"  throughput {result['throughput_per_sec']}/s   latency p50 {result['latency_p50']}s "
+          f"p99 {result['latency_p99']}s   first token p50 {result['ttft_p50']}s p99 {result['ttft_p99']}s")
+    print(f"  memory {result['rss_baseline_mb']} -> {result['rss_peak_mb']} MB "
+          f"(~{result['mb_per_session']} MB per concurrent session)")
+    queues = result['queues']
+    print(f"  queues: extraction backlog max {queues['extract_backlog_max']} mean {queues['extract_backlog_mean']}, "
+          f"LLM in flight max {queues['llm_in_flight_max']} mean {queues['llm_in_flight_mean']}")
+    print(f"  {'stage':<18} {'count':>6} {'mean s':>8} {'p50 s':>8} {'p99 s':>8}")
+    for stage, values in list(result['stages'].items())[:8]:
+        print(f"  {stage:<18} {values['count']:>6} {values['mean']:>8} {values['p50']:>8} {values['p99']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated concurrent session counts")
+    parser.add_argument('--sessions', type=int, default=20, help="sessions per concurrency level")
+    parser.add_argument('--youtube-share', type=float, default=0.3, help="share of sessions that are videos")
+    parser.add_argument('--summary-level', default="Medium", choices=["Brief", "Medium", "Detailed"])
+    parser.add_argument('--think-time', type=float, default=0.0, help="max random delay before each session")
+    parser.add_argument('--cache', action='store_true', help="allow summary cache hits between sessions")
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    mock_gemini.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    mock, endpoint = mock_gemini.serve(**mock_gemini.mock_options(args))
+    fixtures, base_url = serve_fixtures()
+    # Configured before the pipeline modules read their settings at import
+    os.environ['LITENOTE_LLM_ENDPOINT'] = endpoint
+    os.environ['LITENOTE_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='litenote-load-'), 'cache.sqlite3')
+    if not args.cache:
+        os.environ['LITENOTE_DEDUP'] = '0'
+
+    import llm
+    llm.configure('load-test')
+    video_ids = patch_youtube(base_url)
+
+    # Weight pages and videos so roughly youtube_share of sessions are videos
+    web_urls = [f"{base_url}/pages/{name}.html" for name in page_names()]
+    youtube_urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in video_ids]
+    video_weight = round(args.youtube_share / max(1e-9, 1 - args.youtube_share) * len(web_urls) / len(youtube_urls))
+    urls = web_urls + youtube_urls * video_weight
+
+    results = []
+    try:
+        # One untimed pass so lazy imports and first-call setup don't count as load
+        warmup = argparse.Namespace(**dict(vars(args), think_time=0))
+        run_level(len(set(urls)), sorted(set(urls)), warmup, mock)
+        rng = random.Random(0)
+        for level in (int(value) for value in args.concurrency.split(',')):
+            result = run_level(level, [rng.choice(urls) for _ in range(args.sessions)], args, mock)
+            print_level(result)
+            results.append(result)
+    finally:
+        mock.shutdown()
+        fixtures.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'mock': mock_gemini.mock_options(args), 'levels': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nwrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Local stand-in for the Gemini REST API.
+
+Answers generateContent and streamGenerateContent (a streamed JSON array, or
+server-sent events with alt=sse) with a canned Markdown summary after a configurable delay, streams it at a fixed
+token rate and fails a configurable share of requests. embedContent returns a
+bag-of-words vector, so texts sharing words embed close together. Point the app at it
+with LITENOTE_LLM_ENDPOINT:
+
+    python bench/mock_gemini.py --port 8765 --latency 0.8 --tokens-per-sec 120 --error-rate 0.02
+    LITENOTE_LLM_ENDPOINT=http://127.0.0.1:8765 GOOGLE_API_KEY=test streamlit run main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SUMMARY = """## Executive Summary
+The source describes a concrete change, the reasons given for it and the main objections raised.
+
+## Main Points
+- **What changed:** the decision and who made it
+- **Why:** the costs and benefits cited by supporters
+- **Concerns:** the risks raised by critics and what they asked for instead
+- **Next steps:** the timeline and the open questions that remain
+
+## Key Takeaways
+| Section | Key Insight |
+|---------|-------------|
+| Decision | A clear majority backed the proposal |
+| Impact | Effects depend on follow-up work |
+
+## Actionable Insights
+1. Track the follow-up study before drawing conclusions
+2. Compare the stated timeline with similar past projects
+"""
+
+_path_re = re.compile(r'^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent|embedContent)')
+EMBEDDING_DIM = 768
+
+
+class MockGemini(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, jitter=0.2, tokens_per_sec=150, chunk_tokens=20, error_rate=0.0,
+                 output_tokens=None, seed=None):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.chunk_tokens = chunk_tokens
+        self.error_rate = error_rate
+        self.output_tokens = output_tokens
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.prompt_chars = 0
+
+    def enter(self, prompt_chars):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.requests += 1
+            self.prompt_chars += prompt_chars
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        return fail, delay
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'max_in_flight': self.max_in_flight,
+                'prompt_chars': self.prompt_chars,
+            }
+
+
+def _embedding(request):
+    """Deterministic bag-of-words vector, so similar texts get similar embeddings"""
+    values = [0.0] * EMBEDDING_DIM
+    text = ' '.join(part.get('text', '') for part in request.get('content', {}).get('parts', []))
+    for word in re.findall(r'\w+', text.lower()):
+        h = int(hashlib.md5(word.encode('utf-8')).hexdigest()[:8], 16)
+        values[h % EMBEDDING_DIM] += 1.0 if h & (1 << 31) else -1.0
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+
+def _response_body(text, prompt_chars, output_chars=None):
+    """One response (or stream piece); the last one carries finishReason and usage"""
+    body = {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'index': 0}]}
+    if output_chars is not None:
+        body['candidates'][0]['finishReason'] = 'STOP'
+        output_tokens = max(1, output_chars // 4)
+        body['usageMetadata'] = {
+            'promptTokenCount': prompt_chars // 4,
+            'candidatesTokenCount': output_tokens,
+            'totalTokenCount': prompt_chars // 4 + output_tokens,
+        }
+    return json.dumps(body).encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """Model metadata, as used for key validation"""
+        match = re.match(r'^/v1beta/models/([^/:?]+)', self.path)
+        if not match:
+            self._send_json(404, b'{"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}}')
+            return
+        self._send_json(200, json.dumps({
+            'name': f"models/{match.group(1)}",
+            'displayName': f"{match.group(1)} (mock)",
+            'inputTokenLimit': 1048576,
+            'outputTokenLimit': 8192,
+            'supportedGenerationMethods': ['generateContent', 'countTokens'],
+        }).encode('utf-8'))
+
+    def do_POST(self):
+        match = _path_re.match(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not match:
+            self._send_json(404, b'{"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}}')
+            return
+
+        prompt_chars = sum(
+            len(part.get('text', '')) for content in request.get('contents', []) for part in content.get('parts', [])
+        )
+        server = self.server
+        fail, delay = server.enter(prompt_chars)
+        try:
+            time.sleep(delay)
+            if fail:
+                self._send_json(429, json.dumps({'error': {
+                    'code': 429, 'message': 'Resource has been exhausted (mock)', 'status': 'RESOURCE_EXHAUSTED'
+                }}).encode('utf-8'))
+                return
+
+            if match.group(2) == 'embedContent':
+                self._send_json(200, json.dumps({'embedding': {'values': _embedding(request)}}).encode('utf-8'))
+                return
+            text = SUMMARY
+            if server.output_tokens:
+                text = (SUMMARY * (server.output_tokens * 4 // len(SUMMARY) + 1))[:server.output_tokens * 4]
+            if match.group(2) == 'generateContent':
+                time.sleep(len(text) / 4 / server.tokens_per_sec)
+                self._send_json(200, _response_body(text, prompt_chars, len(text)))
+                return
+            self._stream(text, prompt_chars, sse='alt=sse' in self.path)
+        finally:
+            server.leave()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def _stream(self, text, prompt_chars, sse):
+        """Server-sent events with alt=sse, otherwise a JSON array written piece by piece"""
+        server = self.server
+        step = server.chunk_tokens * 4
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if sse else 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        if not sse:
+            self._write_chunk(b'[')
+        for n, piece in enumerate(pieces):
+            if n:
+                time.sleep(server.chunk_tokens / server.tokens_per_sec)
+            body = _response_body(piece, prompt_chars, len(text) if n == len(pieces) - 1 else None)
+            if sse:
+                self._write_chunk(b'data: ' + body + b'\r\n\r\n')
+            else:
+                self._write_chunk((b',\r\n' if n else b'') + body)
+        if not sse:
+            self._write_chunk(b']')
+        self.wfile.write(b'0\r\n\r\n')
+
+
+def serve(port=0, **options):
+    """Start the mock on a background thread; returns (server, endpoint URL)"""
+    server = MockGemini(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument('--jitter', type=float, default=0.2, help="+/- seconds added to the latency")
+    parser.add_argument('--tokens-per-sec', type=float, default=150, help="streaming rate")
+    parser.add_argument('--chunk-tokens', type=int, default=20, help="tokens per streamed event")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument('--output-tokens', type=int, help="length of each response (default: canned summary)")
+
+
+def mock_options(args):
+    return {
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'tokens_per_sec': args.tokens_per_sec,
+        'chunk_tokens': args.chunk_tokens,
+        'error_rate': args.error_rate,
+        'output_tokens': args.output_tokens,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    server = MockGemini(('127.0.0.1', args.port), **mock_options(args))
+    print(f"mock Gemini on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Summary history search benchmark.
+
+Writes synthetic clustered embeddings (standing in for summaries of related
+pages) to a temporary vector index, then measures query latency and
+recall@k against exact search for each search mode, plus the time to build
+the IVF lists and the size of each file. A second part embeds the fixture
+pages with the local hashing embedder and checks that searching for a
+page's own summary text finds that page first.
+
+    python bench/vector_index.py --rows 200000 --dim 768
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+import history  # noqa: E402
+from bench.fixture_server import gold_text, page_names  # noqa: E402
+
+
+MODES = ('exact', 'quantized', 'ivf')
+
+
+def synthetic(rows, dim, clusters, seed=0):
+    """Unit vectors scattered around random topic centres, written in blocks"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    for start in range(0, rows, history.SCAN_ROWS):
+        count = min(history.SCAN_ROWS, rows - start)
+        block = centres[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+        yield start, block / np.linalg.norm(block, axis=1, keepdims=True)
+
+
+def bench_modes(args):
+    directory = tempfile.mkdtemp(prefix='litenote-vectors-')
+    index = history.VectorIndex(directory, args.dim)
+    started = time.perf_counter()
+    for start, block in synthetic(args.rows, args.dim, args.clusters):
+        index.write(start, block)
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index.build_lists()
+    build_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(1)
+    vectors = index.vectors()
+    queries = vectors[np.sort(rng.choice(args.rows, args.queries, replace=False))]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    truth = [set(index.search(q, args.k, 'exact')[0].tolist()) for q in queries]
+    results = {
+        'rows': args.rows,
+        'dim': args.dim,
+        'write_sec': round(write_seconds, 2),
+        'ivf_build_sec': round(build_seconds, 2),
+        'file_mb': {
+            name: round(os.path.getsize(path) / 2 ** 20, 1)
+            for name, path in (('float32', index.vectors_path), ('int8', index.quantized_path),
+                               ('ivf', index.lists_path))
+        },
+        'modes': {},
+    }
+    for mode in MODES:
+        latencies, recalls = [], []
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            rows, _ = index.search(q, args.k, mode)
+            latencies.append(time.perf_counter() - started)
+            recalls.append(len(expected & set(rows.tolist())) / args.k)
+        latencies.sort()
+        results['modes'][mode] = {
+            'p50_ms': round(1000 * statistics.median(latencies), 2),
+            'p95_ms': round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+            f'recall_at_{args.k}': round(statistics.mean(recalls), 3),
+        }
+    return results
+
+
+def bench_hashing():
+    """Rank of each fixture page when searching with its own text"""
+    store = history.History(tempfile.mkdtemp(prefix='litenote-history-'), embedder='hashing')
+    names = page_names()
+    for name in names:
+        text = gold_text(name)
+        store.record(f"https://example.com/{name}", name, [], {'title': name, 'summary': text}, text)
+    ranks = {}
+    for name in names:
+        # The opening sentences, as someone remembering the page might type them
+        query = ' '.join(gold_text(name).split()[:30])
+        found = [result['title'] for result in store.search(query, k=len(names), mode='exact')]
+        ranks[name] = found.index(name) + 1 if name in found else None
+    return ranks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help="vectors in the synthetic history")
+    parser.add_argument('--dim', type=int, default=768, help="embedding width")
+    parser.add_argument('--clusters', type=int, default=500, help="topics the synthetic vectors gather around")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = bench_modes(args)
+    results['hashing_ranks'] = bench_hashing()
+
+    print(f"{results['rows']} x {results['dim']} rows written in {results['write_sec']}s, "
+          f"IVF lists built in {results['ivf_build_sec']}s, files (MB): {results['file_mb']}")
+    print(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>10}")
+    for mode, row in results['modes'].items():
+        print(f"{mode:<10} {row['p50_ms']:>8} {row['p95_ms']:>8} {row[f'recall_at_{args.k}']:>10}")
+    print(f"hashing embedder, rank of each page for its own opening: {results['hashing_ranks']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nwrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
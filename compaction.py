@@ -0,0 +1,203 @@
+import math
+import os
+import re
+from collections import Counter
+
+from extraction import is_chrome_line
+
+
+TOKEN_BUDGET = int(os.getenv('LITENOTE_TOKEN_BUDGET', 100000))
+# Ask the Gemini API for exact counts instead of the local estimate (one extra round trip)
+EXACT_TOKEN_COUNT = os.getenv('LITENOTE_EXACT_TOKEN_COUNT', '0') == '1'
+
+NEAR_DUPLICATE_SIMILARITY = 0.85
+LEAD_BONUS = 1.25
+# Short lines appearing this often on one page are navigation or teaser chrome
+REPEATED_LINE_COUNT = 3
+REPEATED_LINE_WORDS = 8
+# Unpunctuated text (auto-generated captions, some scraped pages) would otherwise be one
+# sentence too long to fit any budget; it is cut into pieces of this many words instead
+MAX_SENTENCE_WORDS = 60
+
+_token_re = re.compile(r'[A-Za-z0-9]+|[^\x00-\x7f]+|[^\sA-Za-z0-9]')
+_sentence_re = re.compile(r'(?<=[.!?।。！？])\s+')
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+CAPTION_ARTIFACT_RE = re.compile(
+    r'\[\s*(music|applause|laughter|laughs|laughing|cheering|inaudible|silence|foreign|noise|__)\s*\]|'
+    r'\(\s*(music|applause|laughter|laughs|inaudible)\s*\)|♪+|^\s*>>\s*|\s>>\s',
+    re.I | re.M
+)
+FILLER_RE = re.compile(r'\b(?:u+m+|u+h+|e+r+m+|hm+)\b[,.]?\s*', re.I)
+# An immediately repeated phrase of up to six words, as rolling captions produce
+REPEATED_PHRASE_RE = re.compile(r'\b(\w+(?:\s+\w+){0,5})(?:\s+\1\b)+', re.I)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its of on or our she so that the
+their them then there these they this to was we were what when which who will with you your not do does did
+just also can about more all one would there's it's i'm we're they're you're
+""".split())
+
+
+def estimate_tokens(text):
+    """Local token estimate close to Gemini's SentencePiece counts
+
+    ASCII words cost about one token per four characters, other scripts about
+    one token per two characters, and each punctuation mark one token.
+    """
+    tokens = 0
+    for piece in _token_re.findall(text):
+        if not piece.isascii():
+            tokens += math.ceil(len(piece) / 2)
+        elif piece.isalnum():
+            tokens += math.ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+
+def count_tokens(text, model_name=None):
+    """Tokens for the target model: exact via the API when enabled, else estimated"""
+    if EXACT_TOKEN_COUNT and model_name:
+        try:
+            from llm import get_model
+            return get_model(model_name).count_tokens(text).total_tokens
+        except Exception:
+            pass
+    return estimate_tokens(text)
+
+
+def strip_artifacts(text, content_type):
+    """Caption markers and filler for transcripts, page chrome lines for web pages
+
+    A web line is dropped only when it is chrome on its own (see
+    extraction.is_chrome_line) or a short line repeated across the page,
+    like a "Read more" link under every teaser.
+    """
+    if content_type == "youtube":
+        text = CAPTION_ARTIFACT_RE.sub(' ', text)
+        text = FILLER_RE.sub('', text)
+        text = REPEATED_PHRASE_RE.sub(r'\1', text)
+        return re.sub(r' +', ' ', text).strip()
+
+    lines = text.split('\n')
+    counts = Counter(' '.join(line.split()).lower() for line in lines)
+    kept = []
+    for line in lines:
+        normalized = ' '.join(line.split()).lower()
+        repeated = counts[normalized] >= REPEATED_LINE_COUNT and len(normalized.split()) <= REPEATED_LINE_WORDS
+        if normalized and (repeated or is_chrome_line(line)):
+            continue
+        kept.append(line)
+    return '\n'.join(kept)
+
+
+def _split_sentences(text):
+    """(paragraph index, sentence) pairs; sentences over MAX_SENTENCE_WORDS are split on words"""
+    sentences = []
+    for index, paragraph in enumerate(text.split('\n')):
+        for sentence in _sentence_re.split(paragraph.strip()):
+            if not sentence:
+                continue
+            words = sentence.split()
+            if len(words) <= MAX_SENTENCE_WORDS:
+                sentences.append((index, sentence))
+                continue
+            for start in range(0, len(words), MAX_SENTENCE_WORDS):
+                sentences.append((index, ' '.join(words[start:start + MAX_SENTENCE_WORDS])))
+    return sentences
+
+
+def _signature(words):
+    """Three longest distinct words; near-duplicates almost always share them"""
+    return tuple(sorted(sorted(set(words), key=lambda w: (-len(w), w))[:3]))
+
+
+def dedupe_sentences(sentences):
+    """Drop exact and near-duplicate sentences, keeping the first occurrence"""
+    kept = []
+    seen_exact = set()
+    by_signature = {}
+    for paragraph, sentence in sentences:
+        words = [w.lower() for w in _word_re.findall(sentence)]
+        if not words:
+            continue
+        exact = ' '.join(words)
+        if exact in seen_exact:
+            continue
+        seen_exact.add(exact)
+
+        word_set = set(words)
+        signature = _signature(words)
+        candidates = by_signature.setdefault(signature, [])
+        if any(len(word_set & other) / len(word_set | other) >= NEAR_DUPLICATE_SIMILARITY for other in candidates):
+            continue
+        candidates.append(word_set)
+        kept.append((paragraph, sentence))
+    return kept
+
+
+def select_salient(sentences, budget):
+    """Keep the highest-salience sentences that fit the budget, in original order"""
+    tokenized = [[w.lower() for w in _word_re.findall(s)] for _, s in sentences]
+    frequencies = Counter(w for words in tokenized for w in words if w not in STOPWORDS and len(w) > 2)
+    lead = max(1, len(sentences) // 10)
+
+    scored = []
+    for i, words in enumerate(tokenized):
+        content_words = [w for w in words if w in frequencies]
+        if not content_words:
+            continue
+        score = sum(frequencies[w] for w in content_words) / math.sqrt(len(words))
+        if i < lead:
+            score *= LEAD_BONUS
+        scored.append((score, i))
+
+    chosen = []
+    used = 0
+    for score, i in sorted(scored, reverse=True):
+        cost = estimate_tokens(sentences[i][1]) + 1
+        if used + cost > budget:
+            continue
+        chosen.append(i)
+        used += cost
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def _join(sentences):
+    paragraphs = []
+    current_index = None
+    for index, sentence in sentences:
+        if index != current_index:
+            paragraphs.append([])
+            current_index = index
+        paragraphs[-1].append(sentence)
+    return '\n'.join(' '.join(p) for p in paragraphs)
+
+
+def _truncate(text, budget):
+    """The longest run of leading words that fits the budget"""
+    kept, used = [], 0
+    for word in text.split():
+        used += estimate_tokens(word) + 1
+        if used > budget:
+            break
+        kept.append(word)
+    return ' '.join(kept)
+
+
+def compact_content(content, content_type, budget=TOKEN_BUDGET, model_name=None):
+    """Remove artifacts and repetition, then trim to the token budget by salience"""
+    tokens_before = count_tokens(content, model_name)
+    sentences = dedupe_sentences(_split_sentences(strip_artifacts(content, content_type)))
+    compacted = _join(sentences)
+    if estimate_tokens(compacted) > budget:
+        selected = _join(select_salient(sentences, budget))
+        # A budget smaller than any single piece still keeps the opening rather than nothing
+        compacted = selected if selected.strip() else _truncate(compacted, budget)
+
+    return {
+        'content': compacted,
+        'tokens_before': tokens_before,
+        'tokens_after': count_tokens(compacted, model_name),
+    }
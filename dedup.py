@@ -0,0 +1,178 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from summary_cache import CACHE_PATH, SCHEMA as CACHE_SCHEMA
+
+
+DEDUP_ENABLED = os.getenv('LITENOTE_DEDUP', '1') != '0'
+# Hamming distance between 64-bit SimHashes; up to 3 is found exactly by the 4-band index
+DEDUP_MAX_DISTANCE = int(os.getenv('LITENOTE_DEDUP_MAX_DISTANCE', 3))
+MIN_WORDS = 50
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id INTEGER PRIMARY KEY,
+    options_key TEXT NOT NULL,
+    simhash INTEGER NOT NULL,
+    summary_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (options_key, summary_key)
+);
+CREATE TABLE IF NOT EXISTS fingerprint_bands (
+    options_key TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    fingerprint_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprint_bands_lookup ON fingerprint_bands (options_key, band, value);
+CREATE INDEX IF NOT EXISTS fingerprint_bands_owner ON fingerprint_bands (fingerprint_id);
+CREATE INDEX IF NOT EXISTS fingerprints_summary ON fingerprints (summary_key);
+-- Fingerprints go when the summary cache evicts or expires their summary
+CREATE TRIGGER IF NOT EXISTS fingerprints_prune AFTER DELETE ON summaries BEGIN
+    DELETE FROM fingerprints WHERE summary_key = old.key;
+END;
+CREATE TRIGGER IF NOT EXISTS fingerprint_bands_prune AFTER DELETE ON fingerprints BEGIN
+    DELETE FROM fingerprint_bands WHERE fingerprint_id = old.id;
+END;
+"""
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+@lru_cache(maxsize=16)
+def simhash(text):
+    """64-bit SimHash over word shingles, or None when the text is too short to fingerprint
+
+    Memoized, since one request looks up and stores the same content for
+    several summaries.
+    """
+    import numpy as np
+
+    words = _word_re.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = Counter(
+        ' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+
+    values = np.fromiter((_hash64(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    counts = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    bits = (values[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    # Each shingle adds its count to the weight of every bit it sets and subtracts it from the rest
+    weights = counts @ (2 * bits.astype(np.int64) - 1)
+
+    fingerprint = 0
+    for bit in np.flatnonzero(weights > 0):
+        fingerprint |= 1 << int(bit)
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [(band, fingerprint >> (band * BAND_BITS) & mask) for band in range(BANDS)]
+
+
+class FingerprintIndex:
+    """SimHash index of summarized content, stored next to the summary cache"""
+
+    def __init__(self, path=CACHE_PATH, max_distance=DEDUP_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        # The prune triggers hang off the cache's table, which lives in the same database
+        conn.executescript(CACHE_SCHEMA)
+        conn.executescript(SCHEMA)
+        # Fingerprints of summaries evicted before the triggers existed
+        conn.execute('DELETE FROM fingerprints WHERE summary_key NOT IN (SELECT key FROM summaries)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def find(self, content, options_key):
+        """Summary keys of indexed documents within max_distance, closest first"""
+        fingerprint = simhash(content)
+        if fingerprint is None:
+            return []
+
+        conditions = ' OR '.join(['(b.band = ? AND b.value = ?)'] * BANDS)
+        params = [options_key]
+        for band, value in _bands(fingerprint):
+            params.extend([band, value])
+        rows = self._connect().execute(
+            'SELECT DISTINCT f.simhash, f.summary_key FROM fingerprint_bands b '
+            'JOIN fingerprints f ON f.id = b.fingerprint_id '
+            f'WHERE b.options_key = ? AND ({conditions})',
+            params
+        ).fetchall()
+
+        matches = []
+        for stored, summary_key in rows:
+            distance = hamming_distance(fingerprint, stored % (1 << 64))
+            if distance <= self.max_distance:
+                matches.append((distance, summary_key))
+        return [summary_key for _, summary_key in sorted(matches)]
+
+    def add(self, content, options_key, summary_key):
+        fingerprint = simhash(content)
+        if fingerprint is None:
+            return
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO fingerprints (options_key, simhash, summary_key, created_at) VALUES (?, ?, ?, ?)',
+                (options_key, _to_signed(fingerprint), summary_key, time.time())
+            )
+            if cursor.rowcount:
+                conn.executemany(
+                    'INSERT INTO fingerprint_bands (options_key, band, value, fingerprint_id) VALUES (?, ?, ?, ?)',
+                    [(options_key, band, value, cursor.lastrowid) for band, value in _bands(fingerprint)]
+                )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FingerprintIndex()
+    return _index
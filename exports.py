@@ -0,0 +1,249 @@
+import hashlib
+import io
+import re
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+EXPORT_FORMATS = OrderedDict([
+    ('txt', {'label': "📄 TXT", 'mime': 'text/plain'}),
+    ('pdf', {'label': "📕 PDF", 'mime': 'application/pdf'}),
+    ('docx', {'label': "📘 Word", 'mime': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'}),
+    ('pptx', {'label': "📊 PowerPoint", 'mime': 'application/vnd.openxmlformats-officedocument.presentationml.presentation'}),
+])
+
+EXPORT_CACHE_BYTES = 64 * 1024 * 1024
+BULLETS_PER_SLIDE = 8
+
+_heading_re = re.compile(r'^(#{1,6})\s+(.*)$')
+_bullet_re = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+_numbered_re = re.compile(r'^(\s*)\d+[.)]\s+(.*)$')
+_table_separator_re = re.compile(r'^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$')
+_link_re = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+_emphasis_re = re.compile(r'(\*\*|__|\*|_|`)(.+?)\1')
+
+# (digest, fmt) -> rendered bytes, least recently used first
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def parse_markdown(text):
+    """Markdown as (kind, level, content) blocks: heading, bullet, number, table, paragraph"""
+    blocks = []
+    table = []
+    for raw_line in text.splitlines():
+        line = raw_line.rstrip()
+        if line.strip().startswith('|'):
+            if not _table_separator_re.match(line.strip()):
+                table.append([cell.strip() for cell in line.strip().strip('|').split('|')])
+            continue
+        if table:
+            blocks.append(('table', 0, table))
+            table = []
+        if not line.strip() or line.strip() in ('---', '***'):
+            continue
+
+        match = _heading_re.match(line.strip())
+        if match:
+            blocks.append(('heading', len(match.group(1)), match.group(2)))
+            continue
+        match = _bullet_re.match(line)
+        if match:
+            blocks.append(('bullet', len(match.group(1)) // 2, match.group(2)))
+            continue
+        match = _numbered_re.match(line)
+        if match:
+            blocks.append(('number', len(match.group(1)) // 2, match.group(2)))
+            continue
+        blocks.append(('paragraph', 0, line.strip()))
+    if table:
+        blocks.append(('table', 0, table))
+    return blocks
+
+
+def plain(text):
+    """Inline Markdown reduced to plain text; links keep their URL"""
+    text = _link_re.sub(lambda m: m.group(1) if m.group(1) == m.group(2) else f"{m.group(1)} ({m.group(2)})", text)
+    return _emphasis_re.sub(r'\2', text)
+
+
+def _latin1(text):
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+def render_txt(summary, title):
+    return summary.encode('utf-8')
+
+
+# The document libraries are imported by their renderer so that only the
+# formats someone actually downloads pay the import cost
+
+def render_pdf(summary, title):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.multi_cell(0, 9, _latin1(title))
+    pdf.ln(2)
+
+    number = 0
+    for kind, level, content in parse_markdown(summary):
+        number = number + 1 if kind == 'number' else 0
+        if kind == 'heading':
+            pdf.ln(2)
+            pdf.set_font("Arial", 'B', max(11, 16 - 2 * level))
+            pdf.multi_cell(0, 8, _latin1(plain(content)))
+        elif kind in ('bullet', 'number'):
+            pdf.set_font("Arial", size=11)
+            marker = '-' if kind == 'bullet' else f"{number}."
+            pdf.set_x(pdf.l_margin + 5 + 5 * level)
+            pdf.multi_cell(0, 6, _latin1(f"{marker} {plain(content)}"))
+        elif kind == 'table':
+            pdf.set_font("Arial", size=9)
+            width = (pdf.w - pdf.l_margin - pdf.r_margin) / max(len(row) for row in content)
+            for n, row in enumerate(content):
+                pdf.set_font("Arial", 'B' if n == 0 else '', 9)
+                height = 6 * max(1, max(len(cell) for cell in row) // 40 + 1)
+                y = pdf.get_y()
+                if y + height > pdf.h - pdf.b_margin:
+                    pdf.add_page()
+                    y = pdf.get_y()
+                for i, cell in enumerate(row):
+                    pdf.set_xy(pdf.l_margin + i * width, y)
+                    pdf.multi_cell(width, 6, _latin1(plain(cell)), border=1)
+                pdf.set_y(y + height)
+            pdf.ln(2)
+        else:
+            pdf.set_font("Arial", size=11)
+            pdf.multi_cell(0, 6, _latin1(plain(content)))
+        pdf.ln(1)
+
+    output = pdf.output(dest='S')
+    # fpdf returns str, fpdf2 returns bytearray
+    return output.encode('latin-1') if isinstance(output, str) else bytes(output)
+
+
+def _add_runs(paragraph, text):
+    """Add text to a docx paragraph, keeping **bold** spans"""
+    for n, part in enumerate(re.split(r'\*\*(.+?)\*\*', text)):
+        if part:
+            paragraph.add_run(plain(part)).bold = n % 2 == 1
+
+
+def render_docx(summary, title):
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(title, 0)
+    for kind, level, content in parse_markdown(summary):
+        if kind == 'heading':
+            doc.add_heading(plain(content), min(level, 4))
+        elif kind in ('bullet', 'number'):
+            style = 'List Bullet' if kind == 'bullet' else 'List Number'
+            if level:
+                style += f' {min(level + 1, 3)}'
+            _add_runs(doc.add_paragraph(style=style), content)
+        elif kind == 'table':
+            columns = max(len(row) for row in content)
+            table = doc.add_table(rows=len(content), cols=columns)
+            table.style = 'Table Grid'
+            for r, row in enumerate(content):
+                for c, cell in enumerate(row):
+                    table.cell(r, c).text = plain(cell)
+                    if r == 0:
+                        for run in table.cell(r, c).paragraphs[0].runs:
+                            run.bold = True
+        else:
+            _add_runs(doc.add_paragraph(), content)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _slide_sections(summary, title):
+    """(slide title, [(level, text)]) per heading, split so no slide overflows"""
+    sections = [(title, [])]
+    for kind, level, content in parse_markdown(summary):
+        if kind == 'heading':
+            sections.append((plain(content), []))
+        elif kind == 'table':
+            for row in content[1:]:
+                sections[-1][1].append((0, ' - '.join(plain(cell) for cell in row if cell)))
+        else:
+            sections[-1][1].append((level if kind != 'paragraph' else 0, plain(content)))
+
+    slides = []
+    for heading, items in sections:
+        if not items:
+            continue
+        for start in range(0, len(items), BULLETS_PER_SLIDE):
+            suffix = " (cont.)" if start else ""
+            slides.append((heading + suffix, items[start:start + BULLETS_PER_SLIDE]))
+    return slides
+
+
+def render_pptx(summary, title):
+    from pptx import Presentation
+    from pptx.util import Pt
+
+    prs = Presentation()
+    cover = prs.slides.add_slide(prs.slide_layouts[0])
+    cover.shapes.title.text = title
+    cover.placeholders[1].text = "Content Summary"
+
+    for heading, items in _slide_sections(summary, title):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = heading
+        body = slide.placeholders[1].text_frame
+        body.clear()
+        for n, (level, text) in enumerate(items):
+            paragraph = body.paragraphs[0] if n == 0 else body.add_paragraph()
+            paragraph.text = text
+            paragraph.level = min(level, 4)
+            paragraph.font.size = Pt(16 if level == 0 else 14)
+
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'pdf': render_pdf,
+    'docx': render_docx,
+    'pptx': render_pptx,
+}
+
+
+def render_export(summary, title, fmt):
+    """Rendered file bytes for one format, built on first request and cached by content"""
+    global _cache_bytes
+    digest = hashlib.sha256(f"{title}\0{summary}".encode('utf-8')).hexdigest()
+    key = (digest, fmt)
+    with metrics.span('export', format=fmt) as span:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+        span['cache_hit'] = cached is not None
+        if cached is not None:
+            span['bytes'] = len(cached)
+            return cached
+
+        data = RENDERERS[fmt](summary, title)
+        span['bytes'] = len(data)
+
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = data
+            _cache_bytes += len(data)
+            while _cache_bytes > EXPORT_CACHE_BYTES and len(_cache) > 1:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= len(evicted)
+    return data
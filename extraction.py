@@ -0,0 +1,374 @@
+import codecs
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import lxml.etree
+import lxml.html
+
+import metrics
+
+
+EXTRACTION_TIMEOUT = 15
+
+UNKNOWN_METADATA = {
+    'title': 'Unknown Title',
+    'author': 'Unknown Author',
+    'date': 'Unknown Date',
+}
+
+CONTENT_XPATHS = [
+    '//article',
+    '//main',
+    '//*[@role="main"]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " content ")]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " post-content ")]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " entry-content ")]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " article-body ")]',
+    '//*[contains(concat(" ", normalize-space(@class), " "), " post-body ")]',
+]
+
+BLOCK_XPATH = './/*[self::p or self::li or self::h1 or self::h2 or self::h3 or self::h4 or self::pre or self::blockquote]'
+TEXT_XPATH = './/text()[not(ancestor::script or ancestor::style or ancestor::noscript)]'
+
+BOILERPLATE_RE = re.compile(
+    r'cookie|subscribe|sign in|sign up|log in|newsletter|all rights reserved|privacy policy|'
+    r'terms of (use|service)|share (this|on)|follow us|advertisement|skip to (main )?content',
+    re.I
+)
+# Page chrome when it is the whole line: consent banners, account links, share prompts.
+# Lines that merely mention a cookie or a subscribe() call are content and stay.
+CHROME_PHRASE_RE = re.compile(
+    r'\W*(?:'
+    r'(?:we|this (?:site|website)) uses? cookies\b.*|'
+    r'(?:accept|allow|reject|decline)(?: all| necessary)?(?: cookies)?|'
+    r'(?:cookie|privacy) (?:settings|preferences|policy|notice)|manage (?:cookies|preferences|consent)|'
+    r'(?:sign|log) ?(?:in|up|out)|register|create (?:an )?account|my account|'
+    r'subscribe(?: now| today)?|(?:subscribe to|sign up for|join) (?:our|the) newsletter|newsletter|'
+    r'share(?: this(?: article| story| post)?| on \w+)?|follow us(?: on \w+)?|advertisement|'
+    r'skip to (?:main )?content|back to top|'
+    r'(?:(?:©|\(c\)|copyright)\s*[\w ,.-]*\.?\s*)?all rights reserved|privacy|terms of (?:use|service)'
+    r')\W*',
+    re.I
+)
+CHROME_SEPARATOR_RE = re.compile(r'\s+[|·•]\s+')
+CHROME_MAX_WORDS = 40
+
+# Streaming extraction of pages too large to parse whole: text is kept per block
+# element, which is then cleared so the tree only ever holds the open path
+STREAM_BLOCK_TAGS = frozenset([
+    'p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'td', 'th', 'dd', 'dt',
+    'div', 'section', 'article', 'main', 'table', 'ul', 'ol', 'dl', 'body',
+])
+STREAM_DROP_TAGS = frozenset(['script', 'style', 'noscript', 'template', 'svg', 'iframe', 'head'])
+STREAM_BOILERPLATE_TAGS = frozenset(['nav', 'header', 'footer', 'aside', 'form'])
+# Cookie and consent banners, recognised by their container's class or id
+STREAM_CONSENT_RE = re.compile(r'cookie|consent|gdpr', re.I)
+# <meta> name or property -> metadata field, most specific first
+STREAM_META = {
+    'author': ('author', 'article:author', 'og:article:author', 'parsely-author', 'dc.creator'),
+    'date': ('article:published_time', 'og:article:published_time', 'datepublished', 'date', 'pubdate',
+             'parsely-pub-date', 'dc.date'),
+    'title': ('og:title',),
+}
+# About the compaction token budget; reading stops once this much text is collected
+STREAM_MAX_CHARS = 400000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def clean_text(text):
+    """Clean extracted text"""
+    if not text:
+        return ""
+    text = re.sub(r'\n+', '\n', text)
+    text = re.sub(r' +', ' ', text)
+    return text.strip()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix='extract')
+    return _executor
+
+
+def parse_html(html_content):
+    """Parse page bytes into one lxml tree shared by every strategy"""
+    with metrics.span('parse') as span:
+        span['bytes'] = len(html_content)
+        try:
+            return lxml.html.document_fromstring(html_content)
+        except (ValueError, lxml.etree.ParserError):
+            span['outcome'] = 'error'
+            return None
+
+
+def _element_text(element):
+    return ' '.join(element.xpath(TEXT_XPATH))
+
+
+def _page_title(tree):
+    titles = tree.xpath('//title')
+    if titles:
+        title = titles[0].text_content().strip()
+        if title:
+            return title
+    return None
+
+
+def extract_with_trafilatura(tree, url, html_content):
+    """Body and metadata in a single trafilatura pass over the shared tree"""
+    # trafilatura and newspaper take a few hundred ms each to import, so they
+    # are loaded by the first extraction rather than at startup
+    import trafilatura
+
+    try:
+        document = trafilatura.bare_extraction(
+            tree,
+            url=url,
+            include_comments=False,
+            include_tables=True,
+            include_images=False,
+            with_metadata=True
+        )
+        if document is None:
+            return None
+        if not isinstance(document, dict):
+            document = document.as_dict()
+
+        return {
+            'content': clean_text(document.get('text')),
+            'title': document.get('title'),
+            'author': document.get('author'),
+            'date': document.get('date'),
+            'method': 'Trafilatura'
+        }
+    except Exception:
+        return None
+
+
+def extract_with_newspaper(tree, url, html_content):
+    """Newspaper3k on the already-downloaded HTML, no second request"""
+    from newspaper import Article
+
+    try:
+        article = Article(url)
+        article.download(input_html=html_content)
+        article.parse()
+
+        if article.text:
+            return {
+                'content': clean_text(article.text),
+                'title': article.title,
+                'author': ', '.join(article.authors),
+                'date': str(article.publish_date) if article.publish_date else None,
+                'method': 'Newspaper3k'
+            }
+    except Exception:
+        return None
+
+
+def extract_with_selectors(tree, url, html_content):
+    """Common content containers, falling back to every paragraph"""
+    try:
+        container = None
+        for xpath in CONTENT_XPATHS:
+            elements = tree.xpath(xpath)
+            if elements:
+                container = elements
+                break
+
+        if container is None:
+            container = [tree]
+
+        blocks = []
+        for element in container:
+            found = element.xpath(BLOCK_XPATH)
+            if found:
+                blocks.extend(_element_text(block) for block in found)
+            else:
+                blocks.append(_element_text(element))
+
+        content = '\n'.join(block.strip() for block in blocks if block.strip())
+        if content:
+            return {
+                'content': clean_text(content),
+                'title': _page_title(tree),
+                'author': None,
+                'date': None,
+                'method': 'lxml Selectors'
+            }
+    except Exception:
+        return None
+
+
+def is_chrome_line(line):
+    """True for a short line made only of banner, consent or account phrases, e.g. "Log in | Sign up\""""
+    parts = [part for part in CHROME_SEPARATOR_RE.split(line.strip()) if part]
+    return (
+        bool(parts) and len(line.split()) <= CHROME_MAX_WORDS
+        and all(CHROME_PHRASE_RE.fullmatch(part) for part in parts)
+    )
+
+
+def score_result(content):
+    """Quality score in [0, 1] from length, text density and boilerplate ratio"""
+    if not content:
+        return 0.0
+    lines = [line for line in content.split('\n') if line.strip()]
+    words = sum(len(line.split()) for line in lines)
+
+    length_score = min(1.0, words / 300)
+    density_score = min(1.0, (words / len(lines)) / 25)
+    boilerplate = sum(
+        1 for line in lines
+        if len(line.split()) < 4 or BOILERPLATE_RE.search(line)
+    ) / len(lines)
+
+    return round(0.45 * length_score + 0.35 * density_score + 0.2 * (1 - boilerplate), 4)
+
+
+STRATEGIES = [
+    extract_with_trafilatura,
+    extract_with_newspaper,
+    extract_with_selectors,
+]
+
+
+class StreamingExtractor:
+    """Block text from a page fed in pieces, with memory bounded by the open elements
+
+    Used as fetcher.fetch_url's stream_parser for pages too large to hold:
+    start(encoding), then feed(bytes) until it returns False or the body
+    ends, then result().
+    """
+
+    def __init__(self, url, max_chars=STREAM_MAX_CHARS):
+        self.url = url
+        self.max_chars = max_chars
+        self.blocks = []
+        self.chars = 0
+        self.title = None
+        self.meta = {}
+        self._parser = None
+
+    def start(self, encoding):
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            # A charset the server made up or misspelled; UTF-8 reads most such pages
+            encoding = 'utf-8'
+        tags = STREAM_BLOCK_TAGS | STREAM_DROP_TAGS | STREAM_BOILERPLATE_TAGS | {'title', 'meta'}
+        self._parser = lxml.etree.HTMLPullParser(
+            events=('end',), tag=sorted(tags), encoding=encoding, remove_comments=True
+        )
+
+    def feed(self, data):
+        """Parse more of the page; False once enough text has been collected"""
+        self._parser.feed(data)
+        self._drain()
+        return self.chars < self.max_chars
+
+    def _drain(self):
+        for _, element in self._parser.read_events():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            if tag == 'title' and self.title is None:
+                self.title = (element.text or '').strip() or None
+            elif tag == 'meta':
+                name = element.get('property') or element.get('name') or element.get('itemprop') or ''
+                content = (element.get('content') or '').strip()
+                if content:
+                    self.meta.setdefault(name.lower(), content)
+                continue
+            elif tag in STREAM_BLOCK_TAGS:
+                self._keep(element)
+            elif tag not in STREAM_DROP_TAGS and tag not in STREAM_BOILERPLATE_TAGS:
+                continue
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    def _keep(self, element):
+        if self.chars >= self.max_chars:
+            return
+        for ancestor in [element] + list(element.iterancestors()):
+            if ancestor.tag in STREAM_BOILERPLATE_TAGS or STREAM_CONSENT_RE.search(
+                    f"{ancestor.get('class', '')} {ancestor.get('id', '')}"):
+                return
+        # Nested blocks were already collected and cleared, so this is only the element's own text
+        text = ' '.join(''.join(element.itertext()).split())
+        if not text or is_chrome_line(text):
+            return
+        self.blocks.append(text)
+        self.chars += len(text)
+
+    def result(self):
+        """Extraction result in the same shape as the other strategies, or None"""
+        with metrics.span('extract', extractor='streaming') as span:
+            if self._parser is not None:
+                try:
+                    self._parser.close()
+                    self._drain()
+                except lxml.etree.XMLSyntaxError:
+                    pass
+            content = clean_text('\n'.join(self.blocks))
+            if not content:
+                span['outcome'] = 'empty'
+                return None
+            span['chars'] = len(content)
+            result = dict(UNKNOWN_METADATA)
+            for field, names in STREAM_META.items():
+                found = next((self.meta[name] for name in names if self.meta.get(name)), None)
+                if found:
+                    result[field] = found
+            if self.title:
+                result['title'] = self.title
+            result.update(content=content, method='Streaming lxml', score=score_result(content))
+            return result
+
+
+def _run_strategy(strategy, tree, url, html_text):
+    with metrics.span('extract', extractor=strategy.__name__[len('extract_with_'):]) as span:
+        result = strategy(tree, url, html_text)
+        if result and result['content']:
+            span['chars'] = len(result['content'])
+        else:
+            span['outcome'] = 'empty'
+        return result
+
+
+def extract_from_html(url, html_content, html_text):
+    """Run every strategy on one parsed tree and keep the best-scoring result"""
+    tree = parse_html(html_content)
+    if tree is None:
+        return None
+
+    executor = _get_executor()
+    futures = [executor.submit(_run_strategy, strategy, tree, url, html_text) for strategy in STRATEGIES]
+    done, _ = wait(futures, timeout=EXTRACTION_TIMEOUT)
+
+    results = []
+    for future in futures:
+        if future in done and future.exception() is None:
+            result = future.result()
+            if result and result['content']:
+                result['score'] = score_result(result['content'])
+                results.append(result)
+
+    if not results:
+        return None
+
+    best = max(results, key=lambda r: r['score'])
+    # Borrow metadata from the other strategies when the winner has none
+    for key, default in UNKNOWN_METADATA.items():
+        if not best.get(key):
+            best[key] = next((r[key] for r in results if r.get(key)), default)
+    return best
@@ -0,0 +1,239 @@
+import codecs
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# urllib3 only decodes brotli when the brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+FETCH_TIMEOUT = 10
+MAX_BODY_BYTES = 5 * 1024 * 1024
+VALIDATOR_CACHE_SIZE = 256
+# Total body bytes kept for revalidation; least recently used pages are dropped beyond it
+VALIDATOR_CACHE_BYTES = int(os.getenv('LITENOTE_VALIDATOR_CACHE_BYTES', 32 * 1024 * 1024))
+# Bodies larger than this go to a stream parser, when the caller passes one, instead of memory.
+# The same as the parse cap, so ordinary script-heavy pages still get every extractor.
+LARGE_PAGE_BYTES = int(os.getenv('LITENOTE_LARGE_PAGE_BYTES', MAX_BODY_BYTES))
+# Hard cap on what is read from a streamed page
+STREAM_MAX_BYTES = int(os.getenv('LITENOTE_STREAM_MAX_BYTES', 64 * 1024 * 1024))
+
+# Refused from the headers or the first bytes, before the body is downloaded
+UNSUPPORTED_TYPES = ('image/', 'audio/', 'video/', 'font/', 'application/pdf', 'application/zip',
+                     'application/gzip', 'application/octet-stream')
+MAGIC_NUMBERS = (b'%PDF', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'PK\x03\x04', b'\x1f\x8b', b'ID3', b'RIFF')
+BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+_session = None
+_session_lock = threading.Lock()
+
+# url -> response dict, kept so a 304 can reuse the stored body
+_validator_cache = OrderedDict()
+_validator_bytes = 0
+_validator_lock = threading.Lock()
+
+
+_charset_re = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+
+class FetchError(Exception):
+    pass
+
+
+def get_session():
+    """Return the shared keep-alive session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=1)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({
+                    'User-Agent': USER_AGENT,
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                    'Accept-Encoding': ACCEPT_ENCODING,
+                })
+                _session = session
+    return _session
+
+
+def _cached_response(url):
+    with _validator_lock:
+        cached = _validator_cache.get(url)
+        if cached is not None:
+            _validator_cache.move_to_end(url)
+        return cached
+
+
+def _store_response(url, result):
+    """Keep a validated response, within VALIDATOR_CACHE_SIZE entries and VALIDATOR_CACHE_BYTES of bodies"""
+    global _validator_bytes
+    size = len(result['content'])
+    if not (result['etag'] or result['last_modified']) or size > VALIDATOR_CACHE_BYTES:
+        return
+    with _validator_lock:
+        previous = _validator_cache.pop(url, None)
+        if previous is not None:
+            _validator_bytes -= len(previous['content'])
+        _validator_cache[url] = result
+        _validator_bytes += size
+        while len(_validator_cache) > VALIDATOR_CACHE_SIZE or _validator_bytes > VALIDATOR_CACHE_BYTES:
+            _, evicted = _validator_cache.popitem(last=False)
+            _validator_bytes -= len(evicted['content'])
+
+
+def _detect_encoding(content_type, body):
+    """Charset from a byte order mark, the Content-Type header, then a <meta> tag, else utf-8"""
+    for bom, encoding in BOMS:
+        if body.startswith(bom):
+            return encoding
+    match = re.search(r'charset=["\']?([\w-]+)', content_type or '', re.I)
+    if match:
+        return match.group(1)
+    match = _charset_re.search(body[:4096])
+    if match:
+        return match.group(1).decode('ascii', errors='ignore')
+    return 'utf-8'
+
+
+def _check_content_type(url, content_type):
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type.startswith(UNSUPPORTED_TYPES):
+        raise FetchError(f"Failed to fetch {url}: unsupported content type {media_type}")
+
+
+def _sniff_body(url, head):
+    """Catch binary files served with a missing or wrong Content-Type"""
+    if head.startswith(MAGIC_NUMBERS):
+        raise FetchError(f"Failed to fetch {url}: not a web page")
+
+
+def _read_body(response, max_bytes, content_type='', stream_parser=None):
+    """Read a streamed body, stopping at max_bytes
+
+    With a stream_parser the cap is STREAM_MAX_BYTES instead, and a body
+    that grows past LARGE_PAGE_BYTES is handed
+    to it chunk by chunk instead of being kept, up to STREAM_MAX_BYTES or
+    until its feed() returns False. The parser gets start(encoding) first.
+    Returns (body, size, truncated, streamed); body is empty when streamed.
+    """
+    chunks = []
+    size = 0
+    # With a stream parser the body is only held up to LARGE_PAGE_BYTES, so max_bytes doesn't apply
+    limit = STREAM_MAX_BYTES if stream_parser is not None else max_bytes
+    truncated = streamed = False
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        if not chunk:
+            continue
+        if not size:
+            _sniff_body(response.url, chunk)
+        remaining = limit - size
+        last = len(chunk) >= remaining
+        if last:
+            # Reaching the cap exactly also counts: there is no telling whether more was coming
+            truncated = True
+            chunk = chunk[:remaining]
+        size += len(chunk)
+
+        if streamed:
+            if not stream_parser.feed(chunk):
+                truncated = True
+                break
+        else:
+            chunks.append(chunk)
+            if stream_parser is not None and size > LARGE_PAGE_BYTES:
+                head = b''.join(chunks)
+                chunks = []
+                streamed = True
+                stream_parser.start(_detect_encoding(content_type, head))
+                if not stream_parser.feed(head):
+                    truncated = True
+                    break
+        if last:
+            break
+    return b''.join(chunks), size, truncated, streamed
+
+
+def fetch_url(url, timeout=FETCH_TIMEOUT, max_bytes=MAX_BODY_BYTES, stream_parser=None):
+    """Download a page once, revalidating against any cached copy
+
+    Pass a stream_parser (see extraction.StreamingExtractor) to have pages
+    over LARGE_PAGE_BYTES parsed as they arrive; the result then has
+    streamed=True and no content.
+    """
+    with metrics.span('fetch') as span:
+        result = _fetch(url, timeout, max_bytes, stream_parser)
+        span['status'] = result['status']
+        span['cache_hit'] = result['revalidated']
+        if not result['revalidated']:
+            span['bytes'] = result['size']
+        return result
+
+
+def _fetch(url, timeout, max_bytes, stream_parser=None):
+    headers = {}
+    cached = _cached_response(url)
+    if cached is not None:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    try:
+        response = get_session().get(url, headers=headers, timeout=timeout, stream=True)
+    except requests.RequestException as e:
+        raise FetchError(f"Failed to fetch {url}: {str(e)}")
+
+    try:
+        if response.status_code == 304 and cached is not None:
+            return dict(cached, revalidated=True)
+        if response.status_code >= 400:
+            raise FetchError(f"Failed to fetch {url}: HTTP {response.status_code}")
+
+        content_type = response.headers.get('Content-Type', '')
+        _check_content_type(url, content_type)
+        body, size, truncated, streamed = _read_body(response, max_bytes, content_type, stream_parser)
+        result = {
+            'url': url,
+            'final_url': response.url,
+            'status': response.status_code,
+            'content': body,
+            'encoding': _detect_encoding(content_type, body),
+            'content_type': content_type,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': size,
+            'truncated': truncated,
+            'streamed': streamed,
+            'revalidated': False,
+        }
+    finally:
+        response.close()
+
+    # A streamed page's body was never kept, so there is nothing to revalidate against
+    if not streamed:
+        _store_response(url, result)
+    return result
+
+
+def decode_body(fetched):
+    """Decode fetched bytes to text using the response charset"""
+    encoding = fetched.get('encoding') or 'utf-8'
+    try:
+        return fetched['content'].decode(encoding, errors='replace')
+    except LookupError:
+        return fetched['content'].decode('utf-8', errors='replace')
@@ -0,0 +1,454 @@
+"""Searchable history of every summary.
+
+Each summary is stored with its extracted content in SQLite, and its
+embedding is written as one row of a float32 matrix on disk that searches
+read through a memory map. Search is an exact vectorized top-k by default;
+large histories can scan an int8 copy of the matrix and rescore the best
+candidates exactly ('quantized'), or scan only the k-means lists nearest to
+the query ('ivf').
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+import metrics
+
+
+HISTORY_ENABLED = os.getenv('LITENOTE_HISTORY', '1') != '0'
+HISTORY_DIR = os.getenv('LITENOTE_HISTORY_DIR', os.path.join('.litenote_cache', 'history'))
+# 'hashing' is local and needs no key or network; 'gemini' makes one embedding API call per summary
+EMBEDDER = os.getenv('LITENOTE_EMBEDDER', 'hashing')
+# 'exact', 'quantized', 'ivf', or 'auto' for exact up to IVF_MIN_ROWS and ivf beyond
+SEARCH_MODE = os.getenv('LITENOTE_SEARCH_MODE', 'auto')
+# One exact pass is still a few milliseconds below this, and 32 probes keep recall@10 near 0.99 above it
+IVF_MIN_ROWS = 250000
+IVF_PROBES = int(os.getenv('LITENOTE_IVF_PROBES', 32))
+# Rows added after the lists were built are scanned exactly until they are this share of the rest
+IVF_REBUILD_SHARE = 0.2
+IVF_TRAIN_ROWS = 20000
+IVF_ITERATIONS = 10
+# Candidates per result taken from the int8 scan and rescored with the float32 rows
+RESCORE_FACTOR = 4
+# Rows scored per block, so a scan never holds more than one block in memory
+SCAN_ROWS = 65536
+CONVERT_ROWS = 4096
+HASH_DIM = 256
+# A summary of the same URL with the same options this recent is returned without fetching again
+REUSE_SECONDS = int(os.getenv('LITENOTE_HISTORY_REUSE_SECONDS', 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    row INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    options TEXT NOT NULL,
+    title TEXT,
+    summary TEXT NOT NULL,
+    method TEXT,
+    content_type TEXT,
+    content BLOB,
+    document_id TEXT,
+    created_at REAL NOT NULL,
+    current INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS history_canonical ON history (canonical, options, current);
+CREATE INDEX IF NOT EXISTS history_document ON history (document_id);
+CREATE TABLE IF NOT EXISTS history_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+RESULT_FIELDS = ('row', 'url', 'title', 'summary', 'method', 'content_type', 'document_id', 'created_at')
+
+_word_re = re.compile(r'\w+')
+
+logger = logging.getLogger('litenote.history')
+
+
+def hash_embed(text, dim=HASH_DIM):
+    """Signed feature hashing of words and word pairs; deterministic and offline"""
+    import numpy as np
+
+    words = _word_re.findall(text.lower())
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+        vector[h % dim] += 1.0 if h >> 63 else -1.0
+    return vector
+
+
+def embed(text, embedder=EMBEDDER, api_key=None):
+    """Unit-length float32 embedding of the text"""
+    import numpy as np
+
+    if embedder == 'hashing':
+        vector = hash_embed(text)
+    else:
+        from llm import embed_text
+        vector = np.asarray(embed_text(text, api_key=api_key), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _top(scores, k):
+    """Indexes of the k highest scores, best first"""
+    import numpy as np
+
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind='stable')]
+
+
+class VectorIndex:
+    """Fixed-width float32 rows in a flat file, with an int8 copy and optional k-means lists
+
+    Row n lives at byte n * dim * 4, so writers in any process can add rows
+    without coordinating beyond agreeing on n.
+    """
+
+    def __init__(self, directory, dim):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.quantized_path = os.path.join(directory, 'vectors.i8')
+        self.scales_path = os.path.join(directory, 'scales.f32')
+        self.lists_path = os.path.join(directory, 'ivf.npz')
+        self._maps = {}
+        self._lists = None
+        self._lists_mtime = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def write(self, row, vectors):
+        """Write one vector, or a 2-d array of consecutive vectors, starting at row"""
+        import numpy as np
+
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        peaks = np.abs(vectors).max(axis=1, keepdims=True)
+        peaks[peaks == 0] = 1.0
+        quantized = np.round(vectors * (127 / peaks)).astype(np.int8)
+        for path, data, width in (
+            (self.vectors_path, vectors.tobytes(), self.dim * 4),
+            (self.quantized_path, quantized.tobytes(), self.dim),
+            (self.scales_path, (peaks[:, 0] / 127).astype(np.float32).tobytes(), 4),
+        ):
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                os.pwrite(fd, data, row * width)
+            finally:
+                os.close(fd)
+
+    def rows(self):
+        """Rows fully written to every file"""
+        try:
+            return min(
+                os.path.getsize(self.vectors_path) // (self.dim * 4),
+                os.path.getsize(self.quantized_path) // self.dim,
+                os.path.getsize(self.scales_path) // 4,
+            )
+        except OSError:
+            return 0
+
+    def _map(self, path, dtype, width, rows):
+        import numpy as np
+
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is None or cached.shape[0] != rows:
+                shape = (rows, width) if width > 1 else (rows,)
+                cached = self._maps[path] = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+            return cached
+
+    def vectors(self, rows=None):
+        import numpy as np
+
+        rows = self.rows() if rows is None else rows
+        return self._map(self.vectors_path, np.float32, self.dim, rows) if rows else None
+
+    def search(self, query, k, mode='exact'):
+        """(rows, scores) of the k best matches by cosine similarity, best first"""
+        rows = self.rows()
+        if not rows:
+            return [], []
+        if mode == 'auto':
+            mode = 'ivf' if rows > IVF_MIN_ROWS else 'exact'
+        with metrics.span('history_search', mode=mode):
+            if mode == 'quantized':
+                return self._search_quantized(query, k, rows)
+            if mode == 'ivf':
+                return self._search_ivf(query, k, rows)
+            return self._scan(self.vectors(rows), query, k, lambda start, block: block @ query)
+
+    def _scan(self, matrix, query, k, score_block):
+        import numpy as np
+
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, matrix.shape[0], SCAN_ROWS):
+            scores = score_block(start, matrix[start:start + SCAN_ROWS])
+            top = _top(scores, k)
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            keep = _top(best_scores, k)
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+        return best_rows, best_scores
+
+    def _search_quantized(self, query, k, rows):
+        import numpy as np
+
+        quantized = self._map(self.quantized_path, np.int8, self.dim, rows)
+        scales = self._map(self.scales_path, np.float32, 1, rows)
+
+        # int8 rows are widened a few thousand at a time into one reused buffer that stays in cache
+        buffer = np.empty((min(CONVERT_ROWS, rows), self.dim), dtype=np.float32)
+
+        def score_block(start, block):
+            scores = np.empty(len(block), dtype=np.float32)
+            for offset in range(0, len(block), CONVERT_ROWS):
+                part = block[offset:offset + CONVERT_ROWS]
+                np.copyto(buffer[:len(part)], part)
+                scores[offset:offset + len(part)] = buffer[:len(part)] @ query
+            return scores * scales[start:start + len(block)]
+
+        candidates, _ = self._scan(quantized, query, k * RESCORE_FACTOR, score_block)
+        candidates = np.sort(candidates)
+        scores = self.vectors(rows)[candidates] @ query
+        top = _top(scores, k)
+        return candidates[top], scores[top]
+
+    def _load_lists(self):
+        import numpy as np
+
+        try:
+            mtime = os.path.getmtime(self.lists_path)
+        except OSError:
+            return None
+        with self._lock:
+            if mtime != self._lists_mtime:
+                with np.load(self.lists_path) as data:
+                    self._lists = {name: data[name] for name in data.files}
+                self._lists_mtime = mtime
+            return self._lists
+
+    def build_lists(self, rows=None, seed=0):
+        """Spherical k-means over a sample of rows, then every row assigned to its nearest list"""
+        import numpy as np
+
+        rows = self.rows() if rows is None else rows
+        matrix = self.vectors(rows)
+        rng = np.random.default_rng(seed)
+        count = int(min(4096, max(16, math.sqrt(rows)), rows))
+        with metrics.span('history_build', mode='ivf'):
+            sample = matrix[np.sort(rng.choice(rows, min(rows, IVF_TRAIN_ROWS), replace=False))]
+            centroids = sample[rng.choice(len(sample), count, replace=False)].copy()
+            for _ in range(IVF_ITERATIONS):
+                assigned = np.argmax(sample @ centroids.T, axis=1)
+                by_list = np.argsort(assigned, kind='stable')
+                ordered = assigned[by_list]
+                starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+                sums = np.zeros_like(centroids)
+                sums[ordered[starts]] = np.add.reduceat(sample[by_list], starts, axis=0)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # Lists that lost every member keep their old centroid
+                centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+            assigned = np.concatenate([
+                np.argmax(matrix[start:start + SCAN_ROWS] @ centroids.T, axis=1)
+                for start in range(0, rows, SCAN_ROWS)
+            ])
+            order = np.argsort(assigned, kind='stable')
+            offsets = np.searchsorted(assigned[order], np.arange(count + 1))
+            # Unique per build, so concurrent builds in other threads or processes never share a file
+            temporary = f"{self.lists_path}.{uuid.uuid4().hex}.tmp.npz"
+            np.savez(temporary, centroids=centroids, order=order, offsets=offsets, rows=np.int64(rows))
+            os.replace(temporary, self.lists_path)
+
+    @staticmethod
+    def _stale(lists, rows):
+        return lists is None or rows - int(lists['rows']) > IVF_REBUILD_SHARE * int(lists['rows'])
+
+    def _search_ivf(self, query, k, rows):
+        import numpy as np
+
+        lists = self._load_lists()
+        if self._stale(lists, rows):
+            # One rebuild at a time; searches that waited find the lists it just wrote
+            with self._build_lock:
+                lists = self._load_lists()
+                if self._stale(lists, rows):
+                    self.build_lists(rows)
+                    lists = self._load_lists()
+        order, offsets = lists['order'], lists['offsets']
+        probes = _top(lists['centroids'] @ query, IVF_PROBES)
+        candidates = np.sort(np.concatenate(
+            [order[offsets[probe]:offsets[probe + 1]] for probe in probes]
+            # Rows written since the lists were built are always scanned
+            + [np.arange(int(lists['rows']), rows)]
+        ))
+        # Lists built over more rows than this search covers may name rows past its end
+        candidates = candidates[candidates < rows]
+        if not len(candidates):
+            return [], []
+        scores = self.vectors(rows)[candidates] @ query
+        top = _top(scores, k)
+        return candidates[top], scores[top]
+
+
+class History:
+    """Summaries with their content in SQLite and their embeddings in a VectorIndex, shared between processes"""
+
+    def __init__(self, directory=HISTORY_DIR, embedder=EMBEDDER):
+        # Embeddings from different models can't be compared, so each embedder keeps its own history
+        self.directory = os.path.join(directory, embedder)
+        self.embedder = embedder
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, 'history.sqlite3')
+        self._local = threading.local()
+        self._index = None
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def index(self, dim=None):
+        """The vector index, or None before the first summary sets its width"""
+        if self._index is None:
+            row = self._connect().execute("SELECT value FROM history_meta WHERE name = 'dim'").fetchone()
+            if row is None and dim is None:
+                return None
+            self._index = VectorIndex(self.directory, int(row[0]) if row else dim)
+        return self._index
+
+    def record(self, url, canonical, options, result, content, api_key=None):
+        """Store one summary and its embedding; returns its row"""
+        with metrics.span('history_record', embedder=self.embedder):
+            vector = embed(f"{result.get('title') or ''}\n{result['summary']}", self.embedder, api_key)
+            options = json.dumps(options)
+            with self._transaction() as conn:
+                stored = conn.execute("SELECT value FROM history_meta WHERE name = 'dim'").fetchone()
+                if stored is None:
+                    conn.execute("INSERT INTO history_meta (name, value) VALUES ('dim', ?)", (str(len(vector)),))
+                elif int(stored[0]) != len(vector):
+                    raise ValueError(f"Embedding has {len(vector)} dimensions, the history expects {stored[0]}")
+                row = conn.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM history').fetchone()[0]
+                self.index(len(vector)).write(row, vector)
+                conn.execute('UPDATE history SET current = 0 WHERE canonical = ? AND options = ?', (canonical, options))
+                conn.execute(
+                    'INSERT INTO history (row, url, canonical, options, title, summary, method, content_type, content, '
+                    'document_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (row, url, canonical, options, result.get('title'), result['summary'], result.get('method'),
+                     result.get('content_type'), zlib.compress(content.encode('utf-8')), result.get('document_id'),
+                     time.time())
+                )
+            return row
+
+    def find(self, canonical, options, max_age=REUSE_SECONDS):
+        """The latest summary of a page with these options if it is at most max_age seconds old"""
+        row = self._connect().execute(
+            f"SELECT {', '.join(RESULT_FIELDS)} FROM history WHERE canonical = ? AND options = ? AND current = 1 "
+            'AND created_at >= ? ORDER BY row DESC LIMIT 1',
+            (canonical, json.dumps(options), time.time() - max_age)
+        ).fetchone()
+        return dict(zip(RESULT_FIELDS, row)) if row else None
+
+    def document(self, document_id):
+        """{'title', 'content', 'content_type'} of a stored document, or None"""
+        row = self._connect().execute(
+            'SELECT title, content, content_type FROM history WHERE document_id = ? ORDER BY row DESC LIMIT 1',
+            (document_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'title': row[0], 'content': zlib.decompress(row[1]).decode('utf-8'), 'content_type': row[2]}
+
+    def search(self, query, k=10, mode=SEARCH_MODE, api_key=None):
+        """Past summaries most similar to the query, best first, each with its score"""
+        index = self.index()
+        if index is None or not query.strip():
+            return []
+        rows, scores = index.search(embed(query, self.embedder, api_key), k * 2, mode)
+        if not len(rows):
+            return []
+        placeholders = ', '.join('?' * len(rows))
+        found = {
+            record[0]: dict(zip(RESULT_FIELDS, record)) for record in self._connect().execute(
+                f"SELECT {', '.join(RESULT_FIELDS)} FROM history WHERE row IN ({placeholders}) AND current = 1",
+                [int(row) for row in rows]
+            )
+        }
+        # Older summaries of a page that was summarized again are left out
+        results = [dict(found[int(row)], score=round(float(score), 4)) for row, score in zip(rows, scores)
+                   if int(row) in found]
+        return results[:k]
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM history WHERE current = 1').fetchone()[0]
+
+
+_history = None
+_history_lock = threading.Lock()
+_recorder = None
+
+
+def get_history():
+    """Process-wide history instance"""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = History()
+    return _history
+
+
+def record_async(url, canonical, options, result, content, api_key=None):
+    """Record a summary on a background thread, so embedding it doesn't delay the response
+
+    Failures (e.g. the embedding API being unavailable) only cost the history
+    entry; they are logged and counted in litenote_history_records_total.
+    """
+    global _recorder
+    if not HISTORY_ENABLED:
+        return None
+    with _history_lock:
+        if _recorder is None:
+            _recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+    future = _recorder.submit(get_history().record, url, canonical, options, result, content, api_key)
+    future.add_done_callback(partial(_log_failure, url))
+    return future
+
+
+def _log_failure(url, future):
+    error = future.exception()
+    metrics.increment('litenote_history_records_total', result='error' if error else 'ok')
+    if error is not None:
+        logger.error("Could not add %s to the summary history", url, exc_info=error)
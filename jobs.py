@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from pipeline import summarize_url
+
+
+JOB_WORKERS = int(os.getenv('LITENOTE_JOB_WORKERS', 4))
+# Finished jobs are kept this long so clients can fetch results and exports
+JOB_TTL = int(os.getenv('LITENOTE_JOB_TTL', 3600))
+
+JOB_FIELDS = ('job_id', 'status', 'url', 'options', 'error', 'created_at', 'started_at', 'finished_at')
+
+
+class JobQueue:
+    """In-memory job store backed by a worker thread pool"""
+
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL, runner=summarize_url):
+        self.ttl = ttl
+        self.runner = runner
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+    def submit(self, url, lang_choice, summary_level, summary_style):
+        self._expire()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'queued',
+            'url': url,
+            'options': {
+                'lang_choice': lang_choice,
+                'summary_level': summary_level,
+                'summary_style': summary_style,
+            },
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'partial': [],
+            'progress': None,
+            'result': None,
+        }
+        with self._lock:
+            self._jobs[job['job_id']] = job
+        self._executor.submit(self._run, job)
+        return self.status(job['job_id'])
+
+    def _run(self, job):
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        try:
+            job['result'] = self.runner(
+                job['url'], on_chunk=job['partial'].append, on_progress=partial(job.__setitem__, 'progress'),
+                **job['options']
+            )
+            job['status'] = 'done'
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = 'error'
+        job['finished_at'] = time.time()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items() if (job['finished_at'] or time.time()) < cutoff]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Public view of a job, including any summary text streamed so far and playlist progress"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        view = {field: job[field] for field in JOB_FIELDS}
+        if job['status'] == 'running':
+            view['partial'] = ''.join(job['partial'])
+            view['progress'] = job['progress']
+        return view
+
+    def queue_depth(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] == 'queued')
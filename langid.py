@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+import metrics
+
+
+# Windows sampled across the document; each one votes for its most likely language
+WINDOWS = 5
+WINDOW_CHARS = 400
+# Windows with fewer letters than this (numbers, markup leftovers) don't vote
+MIN_LETTERS = 40
+# Fixed so the same text always gets the same answer, and so the same prompt and cache key
+SEED = 0
+CACHE_SIZE = 4096
+
+_factory = None
+_factory_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def preload():
+    """Load the language profiles once per process; later calls are free"""
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                from langdetect.detector_factory import PROFILES_DIRECTORY, DetectorFactory
+                factory = DetectorFactory()
+                factory.load_profile(PROFILES_DIRECTORY)
+                factory.set_seed(SEED)
+                _factory = factory
+    return _factory
+
+
+def sample_windows(text, windows=WINDOWS, size=WINDOW_CHARS):
+    """Up to `windows` slices of about `size` characters spread evenly over the text"""
+    if len(text) <= size * windows:
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    step = (len(text) - size) / (windows - 1)
+    samples = []
+    for n in range(windows):
+        start = int(n * step)
+        # Start on a word boundary so the first n-grams are real words
+        if start:
+            space = text.find(' ', start, start + 40)
+            start = space + 1 if space != -1 else start
+        samples.append(text[start:start + size])
+    return samples
+
+
+def _classify(window):
+    detector = preload().create()
+    detector.append(window)
+    best = detector.get_probabilities()[0]
+    return best.lang, best.prob
+
+
+def identify(text):
+    """{'language', 'confidence', 'votes'} from a weighted vote over sampled windows"""
+    votes = Counter()
+    windows = sample_windows(text)
+    # Middle outwards, so the first few votes already span most of the document
+    order = sorted(range(len(windows)), key=lambda i: (abs(2 * i - (len(windows) - 1)), i))
+    for counted, index in enumerate(order, 1):
+        window = windows[index]
+        if sum(ch.isalpha() for ch in window) >= MIN_LETTERS:
+            try:
+                language, probability = _classify(window)
+                votes[language] += probability
+            except Exception:
+                pass
+        # Stop once the remaining windows could not change the winner
+        leader, runner_up = (votes.most_common(2) + [(None, 0.0)] * 2)[:2]
+        if leader[1] - runner_up[1] > len(windows) - counted:
+            break
+    if not votes:
+        return {'language': 'unknown', 'confidence': 0.0, 'votes': {}}
+    # Ties go to the alphabetically first language so the result never depends on order
+    language = min(votes, key=lambda lang: (-votes[lang], lang))
+    return {
+        'language': language,
+        'confidence': votes[language] / sum(votes.values()),
+        'votes': dict(votes),
+    }
+
+
+def detect_language(text):
+    """Language code of the text (e.g. 'en', 'hi'), or 'unknown'; cached by content hash"""
+    text = text or ''
+    key = hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    with metrics.span('langdetect') as span:
+        with _cache_lock:
+            language = _cache.get(key)
+            if language is not None:
+                _cache.move_to_end(key)
+        span['cache_hit'] = language is not None
+        if language is None:
+            result = identify(text)
+            language = result['language']
+            span['chars'] = min(len(text), WINDOWS * WINDOW_CHARS)
+            if language == 'unknown':
+                span['outcome'] = 'error'
+            with _cache_lock:
+                _cache[key] = language
+                while len(_cache) > CACHE_SIZE:
+                    _cache.popitem(last=False)
+        return language
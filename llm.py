@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+import metrics
+import scheduler
+
+
+DEFAULT_MODEL = "gemini-2.0-flash-exp"
+EMBEDDING_MODEL = "text-embedding-004"
+# Longest text embedded; the embedding model reads about 2048 tokens
+EMBED_MAX_CHARS = 8000
+
+# Base URL of a Gemini-compatible REST endpoint, e.g. the load-test mock in bench/
+LLM_ENDPOINT = os.getenv('LITENOTE_LLM_ENDPOINT')
+
+# API keys with live clients; the least recently used key is dropped beyond this
+CLIENT_POOL_SIZE = int(os.getenv('LITENOTE_CLIENT_POOL_SIZE', 32))
+
+# api key -> {'generative': client, 'model': client, 'models': {model name: GenerativeModel}}
+_clients = OrderedDict()
+_pool_lock = threading.Lock()
+_default_key = None
+
+
+def configure(api_key):
+    """Set the key used by calls that don't pass their own
+
+    Unlike genai.configure this changes nothing process-wide: every key gets
+    its own clients, so sessions with different keys can run side by side.
+    """
+    global _default_key
+    _default_key = api_key
+
+
+def _make_clients(api_key):
+    import google.ai.generativelanguage as glm
+    from google.api_core.client_options import ClientOptions
+
+    options = ClientOptions(api_key=api_key, api_endpoint=LLM_ENDPOINT)
+    transport = 'rest' if LLM_ENDPOINT else None
+    return {
+        'generative': glm.GenerativeServiceClient(client_options=options, transport=transport),
+        'model': glm.ModelServiceClient(client_options=options, transport=transport),
+        'models': {},
+    }
+
+
+def _resolve_key(api_key=None):
+    api_key = api_key or _default_key or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("No Gemini API key configured")
+    return api_key
+
+
+def key_fingerprint(api_key=None):
+    """Short hash identifying the key a call would use, or '' when none is configured"""
+    api_key = api_key or _default_key or os.getenv("GOOGLE_API_KEY")
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16] if api_key else ''
+
+
+def _pooled_clients(api_key=None):
+    api_key = _resolve_key(api_key)
+    with _pool_lock:
+        clients = _clients.get(api_key)
+        if clients is None:
+            clients = _clients[api_key] = _make_clients(api_key)
+            while len(_clients) > CLIENT_POOL_SIZE:
+                # Dropped, not closed: a call still streaming on the evicted key keeps its client,
+                # whose connections close when it is garbage collected
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(api_key)
+        return clients
+
+
+def _bind_client(model, client):
+    """Point a GenerativeModel at a key's own client instead of the one genai.configure sets up
+
+    google-generativeai has no public way to do this, so it sets the private
+    _client attribute. This is the only place that relies on it, and the
+    package version is pinned in requirements.txt.
+    """
+    if not hasattr(model, '_client'):
+        raise RuntimeError("Unsupported google-generativeai version: GenerativeModel has no _client")
+    model._client = client
+    return model
+
+
+def get_model(model_name=DEFAULT_MODEL, api_key=None):
+    """Shared GenerativeModel for a key and model, backed by that key's pooled client"""
+    import google.generativeai as genai
+
+    clients = _pooled_clients(api_key)
+    with _pool_lock:
+        model = clients['models'].get(model_name)
+        if model is None:
+            model = _bind_client(genai.GenerativeModel(model_name), clients['generative'])
+            clients['models'][model_name] = model
+        return model
+
+
+def validate_key(api_key, model_name=DEFAULT_MODEL):
+    """Check a key with a model metadata lookup (no generation); raises if it is rejected"""
+    try:
+        return _pooled_clients(api_key)['model'].get_model(name=f"models/{model_name}")
+    except Exception:
+        with _pool_lock:
+            _clients.pop(api_key, None)
+        raise
+
+
+def generate_text(prompt, model_name=DEFAULT_MODEL, on_chunk=None, api_key=None, deadline=scheduler.DEADLINE,
+                  usage=None):
+    """Send one prompt to Gemini and return the response text
+
+    With on_chunk, the response is streamed and each piece of text is passed
+    to on_chunk as it arrives; the full text is still returned at the end.
+    Calls are rate limited, retried and bounded by `deadline` seconds as
+    described in scheduler. A usage dict, when given, receives the reported
+    tokens_in and tokens_out.
+    """
+    api_key = _resolve_key(api_key)
+    model = get_model(model_name, api_key)
+    mode = 'single' if on_chunk is None else 'stream'
+    with metrics.span('llm', model=model_name, mode=mode) as span:
+        attempt = partial(_generate_once, model, model_name, prompt)
+        text, response = scheduler.call(attempt, api_key, model_name, mode, on_chunk, deadline)
+        _record_usage(span, response)
+        if usage is not None:
+            usage.update((name, span[name]) for name in ('tokens_in', 'tokens_out') if name in span)
+        return text
+
+
+def embed_text(text, model_name=EMBEDDING_MODEL, api_key=None, deadline=scheduler.DEADLINE):
+    """Embedding vector of the text (a list of floats), under the same limits and retries as generation"""
+    import google.ai.generativelanguage as glm
+
+    api_key = _resolve_key(api_key)
+    client = _pooled_clients(api_key)['generative']
+    request = glm.EmbedContentRequest(
+        model=f"models/{model_name}", content=glm.Content(parts=[glm.Part(text=text[:EMBED_MAX_CHARS])])
+    )
+
+    def attempt(on_chunk, timeout):
+        response = client.embed_content(request=request, timeout=timeout, retry=None)
+        return list(response.embedding.values), response
+
+    with metrics.span('embed', model=model_name) as span:
+        span['chars'] = min(len(text), EMBED_MAX_CHARS)
+        values, _ = scheduler.call(attempt, api_key, model_name, 'single', None, deadline)
+        return values
+
+
+def _generate_once(model, model_name, prompt, on_chunk, timeout):
+    """One request; returns (text, last response) so usage can be recorded for the winning attempt"""
+    # Retries are the scheduler's job, not the client library's
+    request_options = {'timeout': timeout, 'retry': None}
+    if on_chunk is None:
+        response = model.generate_content(prompt, request_options=request_options)
+        return response.text, response
+
+    started = time.perf_counter()
+    parts = []
+    chunk = None
+    for chunk in model.generate_content(prompt, stream=True, request_options=request_options):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. only a finish reason)
+            continue
+        if text:
+            if not parts:
+                metrics.observe('llm_first_token', time.perf_counter() - started, model=model_name)
+            parts.append(text)
+            on_chunk(text)
+    # The last streamed chunk carries the usage totals
+    return ''.join(parts), chunk
+
+
+def _record_usage(span, response):
+    usage = getattr(response, 'usage_metadata', None)
+    if usage:
+        span['tokens_in'] = getattr(usage, 'prompt_token_count', 0)
+        span['tokens_out'] = getattr(usage, 'candidates_token_count', 0)
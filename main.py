@@ -1,20 +1,18 @@
+import os
 import streamlit as st
-import google.generativeai as genai
-from youtube_transcript_api import YouTubeTranscriptApi
-import trafilatura
-import requests
-from newspaper import Article
-from bs4 import BeautifulSoup
-from langdetect import detect
-from fpdf import FPDF
-from docx import Document
-from pptx import Presentation
 from streamlit_extras.colored_header import colored_header
 from streamlit_extras.add_vertical_space import add_vertical_space
 import time
-from urllib.parse import urlparse
-import re
-import tempfile
+from functools import partial
+import api_client
+import history
+import metrics
+import pipeline
+import qa
+from exports import EXPORT_FORMATS, render_export
+import llm
+from pipeline import is_valid_url
+from summarizer import CANONICAL_OPTIONS
 
 
 # Page Config
@@ -25,419 +23,177 @@ st.set_page_config(
 )
 
 
-# Custom CSS - Using the modern design from the second project
-st.markdown("""
-<style>
-body {
-    background-color: #f8fafc; 
-    font-family: 'Inter', 'Segoe UI', sans-serif;
-}
-.title {
-    text-align: center; 
-    font-size: 2.5rem; 
-    font-weight: bold; 
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    -webkit-background-clip: text; 
-    -webkit-text-fill-color: transparent;
-    margin-bottom: 1rem;
-}
-.subtitle {
-    text-align: center;
-    color: #64748b;
-    font-size: 1.1rem;
-    margin-bottom: 2rem;
-}
-.content-box {
-    padding: 1.5rem; 
-    border-radius: 12px; 
-    box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-    font-size: 1rem; 
-    line-height: 1.7;
-    border: 1px solid #e2e8f0;
-}
-@media (prefers-color-scheme: light) {
-    .content-box {
-        background: #ffffff; 
-        color: #1a1a1a;
-    }
-}
-@media (prefers-color-scheme: dark) {
-    .content-box {
-        background: #1e293b; 
-        color: #f1f5f9;
-    }
-}
-.stButton>button {
-    border-radius: 8px; 
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-    color: white; 
-    font-weight: 600; 
-    padding: 0.75rem 1.5rem;
-    border: none;
-    transition: all 0.3s ease;
-}
-.stButton>button:hover {
-    background: linear-gradient(135deg, #5a67d8 0%, #6b46c1 100%); 
-    transform: translateY(-2px);
-    box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-}
-.extraction-method {
-    background: #f0f9ff;
-    border: 1px solid #0ea5e9;
-    border-radius: 6px;
-    padding: 0.5rem;
-    font-size: 0.9rem;
-    color: #0369a1;
-    margin: 0.5rem 0;
-}
-.api-key-info {
-    background: #fef3c7;
-    border: 1px solid #f59e0b;
-    border-radius: 6px;
-    padding: 0.75rem;
-    font-size: 0.9rem;
-    color: #92400e;
-    margin: 1rem 0;
-}
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS - read once per process, not on every rerun
+STYLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+
+@st.cache_resource(show_spinner=False)
+def load_css():
+    with open(STYLE_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+
+# Prometheus endpoint on LITENOTE_METRICS_PORT, started once per process
+metrics.serve()
 
 
 # Session state initialization
 if 'api_key_set' not in st.session_state:
     st.session_state.api_key_set = False
+    st.session_state.api_key = None
 
 
-def is_valid_url(url):
-    """Validate URL format"""
-    try:
-        result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except:
-        return False
+SUMMARY_MODEL = "gemini-2.0-flash-exp"
+API_POLL_INTERVAL = 1
 
 
-def is_youtube_url(url):
-    """Check if URL is a YouTube video"""
-    youtube_domains = ['youtube.com', 'youtu.be', 'www.youtube.com', 'm.youtube.com']
-    try:
-        parsed = urlparse(url)
-        return any(domain in parsed.netloc for domain in youtube_domains) and ('v=' in url or 'youtu.be/' in url)
-    except:
-        return False
+def show_token_usage(report):
+    if report.get('history'):
+        st.caption("🕘 Summarized recently; served from the summary history")
+    elif report.get('cached'):
+        st.caption("⚡ Served from the summary cache")
+    elif report.get('tokens_before'):
+        st.caption(f"🔢 Input tokens: {report['tokens_before']:,} → {report['tokens_after']:,} after compaction")
+    elif report.get('derived'):
+        st.caption("⚡ Rewritten from the detailed summary already generated for this page")
+    if report.get('sections_reused'):
+        st.caption(f"♻️ {report['sections_reused']} of {report['sections']} sections unchanged since the last summary")
 
 
-def clean_text(text):
-    """Clean extracted text"""
-    if not text:
-        return ""
-    text = re.sub(r'\n+', '\n', text)
-    text = re.sub(r' +', ' ', text)
-    return text.strip()
+def show_skipped_videos(videos):
+    skipped = [v for v in videos if v['status'] == 'skipped']
+    if skipped:
+        with st.expander(f"⚠️ {len(skipped)} videos skipped"):
+            for video in skipped:
+                st.markdown(f"- [{video['title'] or video['video_id']}](https://youtu.be/{video['video_id']}): "
+                            f"{video.get('error') or 'unknown error'}")
 
 
-language_fallbacks = [
-    'en', 'hi', 'es', 'fr', 'de', 'ja', 'as', 'bn', 'gu', 'kn', 'ml', 'mr', 'or', 'pa', 'ta', 'te', 'ur'
-]
+def progress_text(progress):
+    stage = "Loading transcripts" if progress['stage'] == 'transcript' else "Summarizing videos"
+    return f"{stage}: {progress['done']} of {progress['total']}"
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
-def extract_youtube_transcript(youtube_video_url):
-    try:
-        if 'youtu.be/' in youtube_video_url:
-            video_id = youtube_video_url.split('youtu.be/')[1].split('?')[0]
+def show_downloads(summary, title, job_id=None):
+    """Download buttons; files are rendered only when their button is clicked"""
+    st.markdown("### 📥 Download Summary")
+    for column, (fmt, spec) in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS.items()):
+        if fmt == 'txt':
+            data = summary
+        elif job_id:
+            data = partial(api_client.get_export, job_id, fmt)
         else:
-            video_id = youtube_video_url.split("v=")[1].split("&")[0]
-
-        yt_api = YouTubeTranscriptApi()
-        transcript_list = yt_api.fetch(video_id, languages=language_fallbacks)
-        transcript = " ".join([entry.text for entry in transcript_list])
-
-        return {
-            'content': clean_text(transcript),
-            'video_id': video_id,
-            'title': f"YouTube Video ({video_id})",
-            'method': 'YouTube Transcript API'
-        }
-    except Exception as e:
-        raise Exception(f"Failed to extract YouTube transcript: {str(e)}")
-
-
-@st.cache_data(show_spinner=False, ttl=3600)
-def extract_content_trafilatura(url):
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-
-        session = requests.Session()
-        session.headers.update(headers)
-        response = session.get(url, timeout=10)
-        html_content = response.text
-
-        extracted = trafilatura.extract(
-            html_content,
-            include_comments=False,
-            include_tables=True,
-            include_images=False,
-            with_metadata=True,
-            output_format='xml'
+            data = partial(render_export, summary, title, fmt)
+        with column:
+            st.download_button(spec['label'], data, f"summary.{fmt}", spec['mime'], on_click="ignore")
+
+
+def show_answer_usage(report):
+    if report.get('cached'):
+        st.caption(f"⚡ Answered from the cache in {report['seconds']}s")
+    else:
+        st.caption(
+            f"⏱️ {report['seconds']}s · 🔢 {report['tokens_in']:,} tokens in ({report['passages']} passages of a "
+            f"{report['document_tokens']:,}-token document), {report['tokens_out']:,} out"
         )
 
-        if extracted:
-            from xml.etree import ElementTree as ET
-            try:
-                root = ET.fromstring(extracted)
-                title = root.find('.//title')
-                title = title.text if title is not None else "Unknown Title"
-
-                author = root.find('.//author')
-                author = author.text if author is not None else "Unknown Author"
-
-                date = root.find('.//date')
-                date = date.text if date is not None else "Unknown Date"
-
-                main_text = trafilatura.extract(html_content, include_comments=False)
-
-                return {
-                    'content': clean_text(main_text),
-                    'title': title,
-                    'author': author,
-                    'date': date,
-                    'method': 'Trafilatura'
-                }
-            except:
-                main_text = trafilatura.extract(html_content, include_comments=False)
-                return {
-                    'content': clean_text(main_text),
-                    'title': 'Unknown Title',
-                    'author': 'Unknown Author',
-                    'date': 'Unknown Date',
-                    'method': 'Trafilatura'
-                }
-    except Exception:
-        return None
-
-
-@st.cache_data(show_spinner=False, ttl=3600)
-def extract_content_newspaper(url):
-    try:
-        article = Article(url)
-        article.download()
-        article.parse()
-
-        if article.text:
-            return {
-                'content': clean_text(article.text),
-                'title': article.title,
-                'author': ', '.join(article.authors),
-                'date': str(article.publish_date),
-                'method': 'Newspaper3k'
-            }
-    except Exception:
-        return None
-
-
-@st.cache_data(show_spinner=False, ttl=3600)
-def extract_content_beautifulsoup(url):
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        title = soup.find('title')
-        title = title.get_text().strip() if title else "Unknown Title"
-
-        content_selectors = [
-            'article', 'main', '[role="main"]',
-            '.content', '.post-content', '.entry-content',
-            '.article-body', '.post-body'
-        ]
-
-        content = ""
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                content = ' '.join([elem.get_text() for elem in elements])
-                break
-
-        if not content:
-            paragraphs = soup.find_all('p')
-            content = ' '.join([p.get_text() for p in paragraphs])
-
-        if content:
-            return {
-                'content': clean_text(content),
-                'title': title,
-                'author': "Unknown Author",
-                'date': "Unknown Date",
-                'method': 'Beautiful Soup'
-            }
-    except Exception:
-        return None
-
-
-def extract_website_content(url):
-    methods = [
-        extract_content_trafilatura,
-        extract_content_newspaper,
-        extract_content_beautifulsoup
-    ]
-
-    for method in methods:
-        result = method(url)
-        if result and result['content']:
-            return result
-    return None
-
-
-def generate_gemini_summary(content_data, lang_choice, summary_level, summary_style, content_type):
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash-exp")
 
-        content = content_data['content']
-        title = content_data.get('title', 'Unknown Title')
+def show_chat(document_key, ask):
+    """Follow-up questions; ask(question, history, on_chunk=...) sends only the matching passages"""
+    st.markdown("### 💬 Ask About This Content")
+    history = st.session_state.setdefault('qa_history', {}).setdefault(document_key, [])
+    for turn in history:
+        with st.chat_message("user"):
+            st.markdown(turn['question'])
+        with st.chat_message("assistant"):
+            st.markdown(turn['answer'])
+            show_answer_usage(turn['report'])
+
+    question = st.chat_input("Ask a question about this content...")
+    if not question:
+        return
+    with st.chat_message("user"):
+        st.markdown(question)
+    with st.chat_message("assistant"):
+        answer_box = st.empty()
+        streamed = []
+
+        def render_chunk(text):
+            streamed.append(text)
+            answer_box.markdown(''.join(streamed))
 
         try:
-            detected_lang = detect(content[:500])
-        except:
-            detected_lang = "unknown"
-
-        if lang_choice == "Auto (Content Language)":
-            lang_instruction = f"The content is in **{detected_lang}**. Summarize in the same language."
-        else:
-            lang_instruction = f"Translate and summarize into **{lang_choice}**."
-
-        length_instructions = {
-            "Brief": "Summarize concisely in 3-5 bullet points per section.",
-            "Medium": "Summarize in 6-10 bullet points or short paragraphs per section.",
-            "Detailed": "Provide detailed paragraphs with comprehensive explanations, examples, and context for each section."
-        }
-
-        style_instruction = "Use bullet points." if summary_style == "Bullets" else "Use paragraph format."
-
-        if content_type == "youtube":
-            type_instruction = """
-            You are summarizing a YouTube video transcript. Focus on:
-            - Main topics and key messages from the video
-            - Important tips, insights, or tutorials mentioned
-            - Sequential flow of information as presented in the video
-            """
-            source_info = f"""
-            **Source Information:**
-            - Video Title: {title}
-            - Content Type: YouTube Video Transcript
-            - Original Language: {detected_lang}
-            """
+            answer = ask(question, [{'question': t['question'], 'answer': t['answer']} for t in history],
+                         on_chunk=render_chunk)
+        except (ValueError, api_client.ApiError) as e:
+            st.error(f"❌ {str(e)}")
+            return
+        answer_box.markdown(answer['answer'])
+        show_answer_usage(answer['report'])
+    history.append({'question': question, 'answer': answer['answer'], 'report': answer['report']})
+
+
+def show_history_search():
+    """Search every earlier summary by meaning, locally or through the API"""
+    st.markdown("### 🔎 Search Past Summaries")
+    query = st.text_input("Search past summaries:", placeholder="What was that article about...",
+                          label_visibility="collapsed")
+    if not query:
+        return
+    try:
+        if api_client.API_URL:
+            results = api_client.search_history(query)
         else:
-            type_instruction = """
-            You are summarizing web content from an article or blog. Focus on:
-            - Main arguments and key points
-            - Supporting evidence and data
-            - Conclusions and recommendations
-            """
-            author = content_data.get('author', 'Unknown Author')
-            source_info = f"""
-            **Source Information:**
-            - Title: {title}
-            - Author: {author}
-            - Content Type: Website/Blog Article
-            - Original Language: {detected_lang}
-            """
-
-        prompt = f"""
-        You are a highly skilled multilingual content summarizer and analyst.
-
-        {lang_instruction}
-        {length_instructions[summary_level]}
-        {style_instruction}
-        {type_instruction}
-
-        Your task is to create a **structured, comprehensive, and actionable summary** of the provided content.
-
-        {source_info}
-
-        **Instructions:**
-
-        1. **Document Header**
-           - Include the source information above
-           - Summary Language: {lang_choice}
-
-        2. **Executive Summary**
-           - Provide a 2-3 sentence overview of the main topic and key findings
-
-        3. **Main Content Analysis**
-           - Identify and organize content into logical sections
-           - Use descriptive headings for each section
-           - Extract key insights, arguments, and supporting evidence
-           - Highlight important data, statistics, or quotes (if present)
-
-        4. **Key Takeaways Table**
-           Create a markdown table:
-           | Section | Key Insight |
-           |---------|-------------|
-           | Section Name | One-sentence takeaway |
-
-        5. **Actionable Insights**
-           - List 3-5 practical insights or recommendations
-           - Make them specific and directly applicable
-
-        6. **Content Assessment**
-           - Brief note on content quality, credibility, and usefulness
-
-        **Formatting Requirements:**
-        - Use clear Markdown formatting
-        - Maintain logical flow and readability
-        - Avoid repetition and filler content
-        - Focus on value-driven insights
-
-        **Content to Summarize:**
-        {content[:8000]}
-        """
-
-        response = model.generate_content(prompt)
-        return response.text
+            results = history.get_history().search(query, api_key=st.session_state.api_key)
     except Exception as e:
-        st.error(f"Summary generation failed: {str(e)}")
-        return None
-
-
-def create_download_files(summary, title):
+        st.error(f"❌ Search failed: {str(e)}")
+        return
+    if not results:
+        st.info("No past summaries match yet.")
+    for result in results:
+        created = time.strftime('%Y-%m-%d %H:%M', time.localtime(result['created_at']))
+        with st.expander(f"{result['title'] or result['url']} · {result['score']:.2f}"):
+            st.caption(f"🔗 {result['url']} · 🕘 {created}")
+            st.markdown(result['summary'])
+
+
+def show_api_job(job_id):
+    """Poll a job on the summarizer API, showing partial text while it runs"""
+    colored_header("📄 Summary", color_name="blue-70")
+    progress_box = st.empty()
+    summary_box = st.empty()
     try:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=11)
-        summary_text = summary.encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 8, summary_text)
-        pdf_output = pdf.output(dest='S').encode('latin-1')
-
-        doc = Document()
-        doc.add_heading('Content Summary', 0)
-        doc.add_heading(f'Title: {title}', level=2)
-        doc.add_paragraph(summary)
-
-        prs = Presentation()
-        slide = prs.slides.add_slide(prs.slide_layouts[1])
-        slide.shapes.title.text = "Content Summary"
-        slide.placeholders[1].text = summary[:500] + "..." if len(summary) > 500 else summary
-
-        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp_docx:
-            doc.save(tmp_docx.name)
-            with open(tmp_docx.name, 'rb') as f:
-                docx_bytes = f.read()
-
-        with tempfile.NamedTemporaryFile(suffix='.pptx', delete=False) as tmp_pptx:
-            prs.save(tmp_pptx.name)
-            with open(tmp_pptx.name, 'rb') as f:
-                pptx_bytes = f.read()
-
-        return pdf_output, docx_bytes, pptx_bytes
-    except Exception as e:
-        st.warning(f"Some download formats may not be available: {str(e)}")
-        return None, None, None
+        with st.spinner("Extracting content and generating summary..."):
+            job = api_client.get_job(job_id)
+            while job['status'] in ('queued', 'running'):
+                progress = job.get('progress')
+                if progress and not job.get('partial'):
+                    progress_box.progress(progress['done'] / progress['total'], text=progress_text(progress))
+                else:
+                    progress_box.empty()
+                if job.get('partial'):
+                    summary_box.markdown(f"<div class='content-box'>{job['partial']}</div>", unsafe_allow_html=True)
+                time.sleep(API_POLL_INTERVAL)
+                job = api_client.get_job(job_id)
+
+        if job['status'] == 'error':
+            st.error(f"❌ {job['error']}")
+            return
+        result = api_client.get_result(job_id)
+    except api_client.ApiError as e:
+        st.error(f"❌ Error during processing: {str(e)}")
+        return
+
+    progress_box.empty()
+    st.markdown(f"<div class='extraction-method'>✅ Content extracted using: <strong>{result['method']}</strong></div>", unsafe_allow_html=True)
+    summary_box.markdown(f"<div class='content-box'>{result['summary']}</div>", unsafe_allow_html=True)
+    show_token_usage(result.get('report', {}))
+    show_skipped_videos(result.get('videos', []))
+    show_downloads(result['summary'], result['title'], job_id=job_id)
+    show_chat(job_id, lambda question, history, on_chunk=None: api_client.ask(job_id, question, history))
 
 
 # Sidebar - API Key input and info
@@ -451,9 +207,8 @@ with st.sidebar:
     if st.button("🚀 Set API Key"):
         if api_key:
             try:
-                genai.configure(api_key=api_key)
-                model = genai.GenerativeModel("gemini-2.0-flash-exp")
-                test_response = model.generate_content("Hello")
+                llm.validate_key(api_key, SUMMARY_MODEL)
+                st.session_state.api_key = api_key
                 st.session_state.api_key_set = True
                 st.success("✅ API Key configured successfully!")
                 st.rerun()
@@ -477,13 +232,14 @@ st.markdown("<h1 class='title'>LiteNote - AI Content Summarizer</h1>", unsafe_al
 st.markdown("<p class='subtitle'>Transform YouTube videos and web content into structured, actionable insights</p>", unsafe_allow_html=True)
 
 
-if not st.session_state.api_key_set:
+# With LITENOTE_API_URL set, the API server holds the Gemini key
+if not st.session_state.api_key_set and not api_client.API_URL:
     st.warning("🔐 Please enter and set your Google Gemini API key in the sidebar to use this app.")
     st.stop()
 
 
 # Single input box for both YouTube and Website/Blog URLs
-input_url = st.text_input("Enter YouTube video or Website/Blog URL:", placeholder="Paste your link here...")
+input_url = st.text_input("Enter YouTube video, playlist, channel or Website/Blog URL:", placeholder="Paste your link here...")
 
 if input_url:
     if not is_valid_url(input_url):
@@ -495,56 +251,80 @@ if input_url:
         lang_choice = st.selectbox("Summary Language",
                                   ["Auto (Content Language)", "English", "Hindi", "Spanish", "French", "German"])
     with col2:
-        summary_level = st.selectbox("Summary Length", ["Brief", "Medium", "Detailed"])
+        # Detailed is what every page is summarized into first, so it streams from the first token;
+        # the other lengths are rewritten from it once it is done
+        summary_level = st.selectbox("Summary Length", ["Brief", "Medium", "Detailed"], index=2)
     summary_style = st.radio("Summary Style", ["Bullets", "Paragraphs"], horizontal=True)
 
-    if st.button("✨ Generate Summary"):
-        with st.spinner("Extracting content and generating summary..."):
-            try:
-                if is_youtube_url(input_url):
-                    extracted_data = extract_youtube_transcript(input_url)
-                    content_type = "youtube"
-                else:
-                    extracted_data = extract_website_content(input_url)
-                    content_type = "website"
+    generate_clicked = st.button("✨ Generate Summary")
 
-                if not extracted_data or not extracted_data.get('content'):
-                    st.error("❌ Failed to extract content. Please check the URL and try again.")
-                    st.stop()
+    if generate_clicked and api_client.API_URL:
+        try:
+            job = api_client.submit_job(input_url, lang_choice, summary_level, summary_style)
+            st.query_params['job'] = job['job_id']
+        except api_client.ApiError as e:
+            st.error(f"❌ Error during processing: {str(e)}")
 
-                summary = generate_gemini_summary(
-                    extracted_data, lang_choice, summary_level, summary_style, content_type
+    elif generate_clicked:
+        try:
+            colored_header("📄 Summary", color_name="blue-70")
+            method_box = st.empty()
+            progress_box = st.empty()
+            summary_box = st.empty()
+            streamed = []
+
+            def render_progress(progress):
+                progress_box.progress(progress['done'] / progress['total'], text=progress_text(progress))
+
+            def render_chunk(text):
+                progress_box.empty()
+                streamed.append(text)
+                summary_box.markdown(f"<div class='content-box'>{''.join(streamed)}</div>", unsafe_allow_html=True)
+
+            # Sessions asking for the same page at the same time share one extraction and generation
+            if (lang_choice, summary_level, summary_style) == CANONICAL_OPTIONS:
+                spinner_text = "Extracting content and generating summary..."
+            else:
+                spinner_text = (f"Extracting content and reading it in full; the {summary_level.lower()} version "
+                                "streams once the detailed summary is ready...")
+            with st.spinner(spinner_text):
+                result = pipeline.summarize_url(
+                    input_url, lang_choice, summary_level, summary_style, model_name=SUMMARY_MODEL,
+                    on_chunk=render_chunk, api_key=st.session_state.api_key, on_progress=render_progress
                 )
 
-                if not summary:
-                    st.error("❌ Failed to generate summary. Please try again.")
-                    st.stop()
-
-                colored_header("📄 Summary", color_name="blue-70")
-                st.markdown(f"<div class='extraction-method'>✅ Content extracted using: <strong>{extracted_data.get('method', 'Unknown')}</strong></div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='content-box'>{summary}</div>", unsafe_allow_html=True)
-
-                # Download options
-                st.markdown("### 📥 Download Summary")
-                pdf_data, docx_data, pptx_data = create_download_files(summary, extracted_data.get('title', 'Summary'))
-
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.download_button("📄 TXT", summary, "summary.txt", "text/plain")
-                if pdf_data:
-                    with col2:
-                        st.download_button("📕 PDF", pdf_data, "summary.pdf", "application/pdf")
-                if docx_data:
-                    with col3:
-                        st.download_button("📘 Word", docx_data, "summary.docx",
-                                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
-                if pptx_data:
-                    with col4:
-                        st.download_button("📊 PowerPoint", pptx_data, "summary.pptx",
-                                            "application/vnd.openxmlformats-officedocument.presentationml.presentation")
-
-            except Exception as e:
-                st.error(f"❌ Error during processing: {str(e)}")
+            method_box.markdown(f"<div class='extraction-method'>✅ Content extracted using: <strong>{result['method']}</strong></div>", unsafe_allow_html=True)
+            summary_box.markdown(f"<div class='content-box'>{result['summary']}</div>", unsafe_allow_html=True)
+            show_token_usage(result['report'])
+            show_skipped_videos(result.get('videos', []))
+            show_downloads(result['summary'], result['title'])
+            # Kept so the summary stays on screen while follow-up questions rerun the script
+            st.session_state.summary_result = dict(result, url=input_url)
+
+        except Exception as e:
+            st.error(f"❌ Error during processing: {str(e)}")
+
+    elif st.session_state.get('summary_result', {}).get('url') == input_url:
+        result = st.session_state.summary_result
+        colored_header("📄 Summary", color_name="blue-70")
+        st.markdown(f"<div class='extraction-method'>✅ Content extracted using: <strong>{result['method']}</strong></div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='content-box'>{result['summary']}</div>", unsafe_allow_html=True)
+        show_token_usage(result['report'])
+        show_skipped_videos(result.get('videos', []))
+        show_downloads(result['summary'], result['title'])
+
+    if not api_client.API_URL and st.session_state.get('summary_result', {}).get('url') == input_url:
+        document_id = st.session_state.summary_result['document_id']
+        show_chat(document_id, partial(
+            qa.answer_question, document_id, model_name=SUMMARY_MODEL, api_key=st.session_state.api_key
+        ))
+
+# Jobs are tracked in the URL so a browser refresh picks the same job back up
+if api_client.API_URL and 'job' in st.query_params:
+    show_api_job(st.query_params['job'])
+
+if history.HISTORY_ENABLED:
+    show_history_search()
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,229 @@
+"""Timing spans for pipeline stages, exported as Prometheus metrics.
+
+    with metrics.span('fetch') as span:
+        ...
+        span['bytes'] = len(body)
+
+Every span records its duration in the ``litenote_stage_seconds`` histogram,
+labelled with the stage, any keyword labels and the outcome (ok or error).
+Numeric attributes set on the span (bytes, chars, tokens_in, tokens_out) add
+to ``litenote_stage_<name>_total`` counters, and ``cache_hit`` counts towards
+``litenote_stage_cache_total``. With LITENOTE_SPAN_LOG=1 each span is also
+written to stderr as one JSON line.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+SPAN_LOG = os.getenv('LITENOTE_SPAN_LOG', '0') == '1'
+METRICS_PORT = int(os.getenv('LITENOTE_METRICS_PORT', 0))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNTED_ATTRIBUTES = ('bytes', 'chars', 'tokens_in', 'tokens_out')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# (metric name, sorted label pairs) -> [bucket counts..., sum, count] or a counter/gauge value
+_histograms = {}
+_counters = {}
+_gauges = {}
+_lock = threading.Lock()
+_server = None
+
+logger = logging.getLogger('litenote.spans')
+if SPAN_LOG and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(stage, seconds, outcome='ok', **labels):
+    """Record one duration for a stage without a span, e.g. time to first token"""
+    key = _key('litenote_stage_seconds', dict(labels, stage=stage, outcome=outcome))
+    with _lock:
+        values = _histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+
+def increment(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def gauge(name, amount, **labels):
+    """Move a gauge up or down, e.g. +1/-1 around a wait"""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time a block; the yielded dict takes byte/token counts and a cache_hit flag"""
+    attributes = {}
+    outcome = 'ok'
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        outcome = attributes.pop('outcome', outcome)
+        observe(stage, elapsed, outcome, **labels)
+        for name in COUNTED_ATTRIBUTES:
+            if attributes.get(name):
+                increment(f'litenote_stage_{name}_total', attributes[name], stage=stage, **labels)
+        if 'cache_hit' in attributes:
+            increment('litenote_stage_cache_total', stage=stage,
+                      result='hit' if attributes['cache_hit'] else 'miss', **labels)
+        if SPAN_LOG:
+            logger.info(json.dumps(dict(
+                attributes, ts=round(time.time(), 3), stage=stage, duration_ms=round(elapsed * 1000, 2),
+                outcome=outcome, **labels
+            ), default=str))
+
+
+def _quantile(buckets, count, q):
+    """Latency at quantile q, interpolated inside the histogram bucket it falls in"""
+    rank = q * count
+    lower, below = 0.0, 0
+    for bound, cumulative in zip(BUCKETS, buckets):
+        if cumulative >= rank:
+            inside = cumulative - below
+            return lower + (bound - lower) * ((rank - below) / inside if inside else 1.0)
+        lower, below = bound, cumulative
+    return BUCKETS[-1]
+
+
+def stage_quantile(stage, q, min_count=1, **labels):
+    """Quantile of a stage's successful durations with the given labels; None below min_count samples"""
+    wanted = set(_key('', dict(labels, stage=stage, outcome='ok'))[1])
+    total = [0] * (len(BUCKETS) + 2)
+    with _lock:
+        for (name, pairs), values in _histograms.items():
+            if name == 'litenote_stage_seconds' and wanted <= set(pairs):
+                for i, value in enumerate(values):
+                    total[i] += value
+    if total[-1] < min_count:
+        return None
+    return _quantile(total, total[-1], q)
+
+
+def stage_summary():
+    """Per stage: count, mean and p50/p95/p99 seconds, merged across labels"""
+    merged = {}
+    with _lock:
+        for (_, labels), values in _histograms.items():
+            stage = dict(labels)['stage']
+            total = merged.setdefault(stage, [0] * (len(BUCKETS) + 2))
+            for i, value in enumerate(values):
+                total[i] += value
+
+    summary = {}
+    for stage, values in sorted(merged.items()):
+        count = values[-1]
+        summary[stage] = {
+            'count': count,
+            'mean': values[-2] / count if count else 0.0,
+            'p50': _quantile(values, count, 0.5),
+            'p95': _quantile(values, count, 0.95),
+            'p99': _quantile(values, count, 0.99),
+        }
+    return summary
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines = [
+        '# HELP litenote_stage_seconds Time spent in each pipeline stage',
+        '# TYPE litenote_stage_seconds histogram',
+    ]
+    for (name, labels), values in sorted(histograms.items()):
+        for bound, count in zip(BUCKETS, values):
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+        lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {values[-1]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {values[-2]:.6f}')
+        lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in typed:
+            lines.append(f'# TYPE {name} counter')
+            typed.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    for (name, labels), value in sorted(gauges.items()):
+        if name not in typed:
+            lines.append(f'# TYPE {name} gauge')
+            typed.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port=METRICS_PORT):
+    """Serve /metrics on a background thread, once per process; no-op without a port"""
+    global _server
+    if not port or _server is not None:
+        return _server
+    # http.server pulls in the email package; only pay for it when serving
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(('', port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,169 @@
+from functools import partial
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import fetcher
+import history
+from extraction import StreamingExtractor, extract_from_html
+from llm import DEFAULT_MODEL, generate_text, key_fingerprint
+from playlists import collection_notes, is_collection_url, summarize_collection
+from qa import store_document
+from singleflight import get_flights
+from summarizer import PROMPT_VERSION, summarize_content
+from summary_cache import make_key
+from transcripts import extract_youtube_transcript, get_video_id
+
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid'}
+
+
+def is_valid_url(url):
+    """Validate URL format"""
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except:
+        return False
+
+
+def is_youtube_url(url):
+    """Check if URL is a YouTube video"""
+    youtube_domains = ['youtube.com', 'youtu.be', 'www.youtube.com', 'm.youtube.com']
+    try:
+        parsed = urlparse(url)
+        return any(domain in parsed.netloc for domain in youtube_domains) and ('v=' in url or 'youtu.be/' in url)
+    except:
+        return False
+
+
+def canonical_url(url):
+    """One spelling per page: lowercase host, no fragment or tracking parameters, sorted query"""
+    if is_youtube_url(url):
+        return f"youtube:{get_video_id(url)}"
+    parsed = urlparse(url.strip())
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not name.startswith('utm_') and name not in TRACKING_PARAMS
+    )
+    netloc = parsed.netloc.lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    return urlunparse((parsed.scheme.lower(), netloc, parsed.path.rstrip('/') or '/', '', urlencode(query), ''))
+
+
+def request_key(url, lang_choice, summary_level, summary_style, model_name=DEFAULT_MODEL, api_key=None):
+    """Identical requests for the same page share this key
+
+    Only callers using the same Gemini key share a flight, so nobody gets
+    another key's quota or auth error, or is billed for someone else.
+    """
+    return make_key(
+        canonical_url(url), stage='request', lang_choice=lang_choice, summary_level=summary_level,
+        summary_style=summary_style, model=model_name, prompt_version=PROMPT_VERSION,
+        api_key=key_fingerprint(api_key)
+    )
+
+
+def extract_website_content(url):
+    # Very large pages are parsed while they download instead of being held whole
+    streaming = StreamingExtractor(url)
+    try:
+        fetched = fetcher.fetch_url(url, stream_parser=streaming)
+    except fetcher.FetchError:
+        return None
+    if fetched['streamed']:
+        return streaming.result()
+
+    # Every strategy works on the same downloaded bytes and parsed tree
+    return extract_from_html(fetched['final_url'], fetched['content'], fetcher.decode_body(fetched))
+
+
+def extract_content(url):
+    """Extracted content and its type ("youtube" or "website") for any supported URL"""
+    if is_youtube_url(url):
+        return extract_youtube_transcript(url), "youtube"
+    return extract_website_content(url), "website"
+
+
+def summarize_url(url, lang_choice, summary_level, summary_style, model_name=DEFAULT_MODEL, on_chunk=None,
+                  api_key=None, on_progress=None):
+    """Extract and summarize one URL; raises ValueError when either step produces nothing
+
+    Concurrent identical requests with the same API key, in this process or
+    another one sharing the cache database, wait for a single extraction and
+    generation and get its result or its error. Playlist, channel and video
+    list URLs get a digest of their videos, with per-video progress sent to
+    on_progress. The result's document_id is what qa.answer_question takes
+    for follow-up questions.
+    A summary of the same page with the same options from the history is
+    reused for history.REUSE_SECONDS.
+    """
+    if not is_valid_url(url):
+        raise ValueError("Please enter a valid URL starting with http:// or https://")
+
+    options = [lang_choice, summary_level, summary_style, model_name]
+    if history.HISTORY_ENABLED and history.REUSE_SECONDS:
+        # A recent summary of the same page is returned without fetching it again
+        past = history.get_history().find(canonical_url(url), options)
+        if past is not None:
+            if on_chunk:
+                on_chunk(past['summary'])
+            return {
+                'summary': past['summary'],
+                'title': past['title'],
+                'method': past['method'],
+                'content_type': past['content_type'],
+                'report': {'cached': True, 'history': True},
+                'document_id': past['document_id'],
+            }
+
+    key = request_key(url, lang_choice, summary_level, summary_style, model_name, api_key)
+    run = partial(_summarize_url, url, lang_choice, summary_level, summary_style, model_name, api_key, on_progress)
+    return get_flights().do(key, run, on_chunk=on_chunk)
+
+
+def _summarize_url(url, lang_choice, summary_level, summary_style, model_name, api_key, on_progress=None,
+                   on_chunk=None):
+    generate = partial(generate_text, model_name=model_name, api_key=api_key)
+    if is_collection_url(url):
+        result = summarize_collection(
+            url, lang_choice, summary_level, summary_style, generate, model_name,
+            on_chunk=on_chunk, on_progress=on_progress
+        )
+        notes = collection_notes(result)
+        result['document_id'] = store_document(result['title'], notes, 'collection')
+        _record(url, lang_choice, summary_level, summary_style, model_name, result, notes, api_key)
+        return result
+
+    extracted_data, content_type = extract_content(url)
+    if not extracted_data or not extracted_data.get('content'):
+        raise ValueError("Failed to extract content. Please check the URL and try again.")
+
+    report = {}
+    summary = summarize_content(
+        extracted_data, lang_choice, summary_level, summary_style, content_type,
+        generate=generate,
+        model_name=model_name,
+        on_chunk=on_chunk,
+        report=report
+    )
+    if not summary:
+        raise ValueError("Failed to generate summary. Please try again.")
+
+    result = {
+        'summary': summary,
+        'title': extracted_data.get('title', 'Summary'),
+        'method': extracted_data.get('method', 'Unknown'),
+        'content_type': content_type,
+        'report': report,
+        'document_id': store_document(extracted_data.get('title'), extracted_data['content'], content_type),
+    }
+    _record(url, lang_choice, summary_level, summary_style, model_name, result, extracted_data['content'], api_key)
+    return result
+
+
+def _record(url, lang_choice, summary_level, summary_style, model_name, result, content, api_key):
+    """Add a finished summary to the searchable history, in the background"""
+    history.record_async(
+        url, canonical_url(url), [lang_choice, summary_level, summary_style, model_name], result, content, api_key
+    )
@@ -0,0 +1,333 @@
+"""Digests of whole YouTube playlists, channels and ad-hoc lists of videos.
+
+A collection is expanded to its video IDs, transcripts are loaded on a
+bounded pool (reusing cached videos), each video gets its own summary as
+soon as its transcript arrives, and the per-video summaries are condensed
+in sections and then merged into one digest. Videos that fail (no captions,
+a Gemini or network error) are reported with their error and skipped rather
+than failing the digest.
+"""
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import parse_qs, urlparse
+
+import fetcher
+import metrics
+from compaction import estimate_tokens
+from summarizer import CHUNK_TOKENS, PROMPT_VERSION, canonical_summary, length_instructions
+from summary_cache import get_cache, make_key
+from transcripts import load_video
+
+
+YOUTUBE_URL = 'https://www.youtube.com'
+# Largest collection summarized; longer playlists are cut to their first videos
+MAX_VIDEOS = int(os.getenv('LITENOTE_MAX_COLLECTION_VIDEOS', 200))
+TRANSCRIPT_WORKERS = int(os.getenv('LITENOTE_TRANSCRIPT_WORKERS', 8))
+SUMMARY_WORKERS = 4
+MAX_CONTINUATIONS = 20
+
+_video_id_re = re.compile(r'^[\w-]{11}$')
+_channel_path_re = re.compile(r'^/(@[\w.-]+|channel/UC[\w-]{22}|c/[\w.-]+|user/[\w.-]+)')
+_initial_data_re = re.compile(r'(?:var ytInitialData|window\["ytInitialData"\])\s*=\s*')
+_channel_id_re = re.compile(r'"(?:externalId|channelId)":\s*"(UC[\w-]{22})"')
+_channel_title_re = re.compile(r'<meta property="og:title" content="([^"]*)"')
+
+VIDEO_SECTION_PROMPT = """
+You are condensing the summaries of videos {first} to {last} of a {total}-video YouTube {kind}.
+For each video keep its heading line exactly as given, then its most important points in a few bullets.
+After the videos, add a short "Themes" list of ideas that recur across them.
+Keep the original language of the summaries. Do not add an introduction or a conclusion.
+
+**Video Summaries:**
+{summaries}
+"""
+
+DIGEST_PROMPT = """
+You are writing a digest of the YouTube {kind} "{title}" ({count} videos).
+{lang_instruction}
+{length_instruction}
+{style_instruction}
+
+Structure the digest as:
+1. **Overview** - 2-3 sentences on what the {kind} covers and who it is for
+2. **Learning Path** - the main stages of the {kind} in order, naming the videos that cover each
+3. **Key Ideas** - the most important concepts, with the videos they come from as links
+4. **Video Guide** - a markdown table: | # | Video | One-line takeaway |
+5. **Gaps and Prerequisites** - what a viewer should know beforehand and what the {kind} leaves out
+
+Keep the video links from the notes. Use clear Markdown formatting.
+
+**Notes on the videos, in order:**
+{notes}
+"""
+
+
+def parse_collection(url):
+    """('playlist', id), ('channel', path), ('videos', [ids]) or None for anything else"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    if not any(domain in parsed.netloc for domain in ('youtube.com', 'youtu.be')):
+        return None
+    query = parse_qs(parsed.query)
+    if parsed.path == '/watch_videos' and query.get('video_ids'):
+        ids = [v for v in query['video_ids'][0].split(',') if _video_id_re.match(v)]
+        return ('videos', ids) if ids else None
+    if parsed.path == '/playlist' and query.get('list'):
+        return 'playlist', query['list'][0]
+    match = _channel_path_re.match(parsed.path)
+    if match:
+        return 'channel', match.group(1)
+    return None
+
+
+def is_collection_url(url):
+    return parse_collection(url) is not None
+
+
+def _initial_data(page):
+    """The ytInitialData object embedded in a YouTube page, or None"""
+    match = _initial_data_re.search(page)
+    if not match:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(page, match.end())
+    except ValueError:
+        return None
+    return data
+
+
+def _find_all(node, name):
+    """Every value stored under the key name, anywhere in a parsed JSON tree, in document order"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == name:
+                yield value
+            else:
+                yield from _find_all(value, name)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _find_all(value, name)
+
+
+def _text(value):
+    """Plain text of a {"runs": [...]} or {"simpleText": ...} field"""
+    if not isinstance(value, dict):
+        return None
+    if 'simpleText' in value:
+        return value['simpleText']
+    return ''.join(run.get('text', '') for run in value.get('runs', [])) or None
+
+
+def _playlist_page(data):
+    """([{'video_id', 'title'}], continuation token or None) from one parsed page or browse response"""
+    videos = [
+        {'video_id': renderer['videoId'], 'title': _text(renderer.get('title'))}
+        for renderer in _find_all(data, 'playlistVideoRenderer')
+        if isinstance(renderer, dict) and _video_id_re.match(renderer.get('videoId', ''))
+    ]
+    command = next(_find_all(data, 'continuationCommand'), None)
+    token = command.get('token') if isinstance(command, dict) else None
+    return videos, token
+
+
+def _browse(page, token):
+    """Next page of a playlist (parsed JSON, or None) through the same internal API the web player uses"""
+    api_key = re.search(r'"INNERTUBE_API_KEY":\s*"([^"]+)"', page)
+    version = re.search(r'"INNERTUBE_CONTEXT_CLIENT_VERSION":\s*"([^"]+)"', page)
+    if not api_key or not version:
+        return None
+    try:
+        response = fetcher.get_session().post(
+            f"{YOUTUBE_URL}/youtubei/v1/browse?key={api_key.group(1)}",
+            json={'context': {'client': {'clientName': 'WEB', 'clientVersion': version.group(1)}},
+                  'continuation': token},
+            timeout=fetcher.FETCH_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
+
+
+def expand_playlist(playlist_id, max_videos=MAX_VIDEOS):
+    """Title and [{'video_id', 'title'}] of a playlist, following its continuation pages"""
+    with metrics.span('playlist_expand'):
+        try:
+            page = fetcher.decode_body(fetcher.fetch_url(f"{YOUTUBE_URL}/playlist?list={playlist_id}"))
+        except fetcher.FetchError as e:
+            raise ValueError(f"Could not load the playlist: {str(e)}")
+        data = _initial_data(page)
+        if data is None:
+            raise ValueError("Could not read the playlist page")
+        metadata = next(_find_all(data, 'playlistMetadataRenderer'), None) or {}
+        title = metadata.get('title') or f"YouTube Playlist ({playlist_id})"
+
+        # Each renderer is read as a whole, so a video's ID and title always come from the same entry
+        videos, seen = [], set()
+        for _ in range(MAX_CONTINUATIONS + 1):
+            found, token = _playlist_page(data)
+            for video in found:
+                if video['video_id'] not in seen:
+                    seen.add(video['video_id'])
+                    videos.append(video)
+            if len(videos) >= max_videos or not token:
+                break
+            data = _browse(page, token)
+            if data is None:
+                break
+        return title, videos[:max_videos]
+
+
+def expand_channel(path, max_videos=MAX_VIDEOS):
+    """A channel's uploads, newest first, through its uploads playlist"""
+    try:
+        page = fetcher.decode_body(fetcher.fetch_url(f"{YOUTUBE_URL}/{path}"))
+    except fetcher.FetchError as e:
+        raise ValueError(f"Could not load the channel: {str(e)}")
+    match = _channel_id_re.search(page)
+    if not match:
+        raise ValueError("Could not find the channel's uploads")
+    title_match = _channel_title_re.search(page)
+    _, videos = expand_playlist('UU' + match.group(1)[2:], max_videos)
+    return (title_match.group(1) if title_match else path), videos
+
+
+def expand_collection(url, max_videos=MAX_VIDEOS):
+    """(kind, title, [{'video_id', 'title'}]) for a playlist, channel or video list URL"""
+    collection = parse_collection(url)
+    if collection is None:
+        raise ValueError("Not a YouTube playlist, channel or video list")
+    kind, value = collection
+    if kind == 'playlist':
+        return ('playlist',) + expand_playlist(value, max_videos)
+    if kind == 'channel':
+        return ('channel',) + expand_channel(value, max_videos)
+    ids = list(dict.fromkeys(value))[:max_videos]
+    return 'video list', f"{len(ids)} YouTube videos", [{'video_id': v, 'title': None} for v in ids]
+
+
+def _video_heading(number, video):
+    return f"#### {number}. [{video['title']}](https://youtu.be/{video['video_id']})"
+
+
+def _digest(kind, title, done, lang_choice, summary_level, summary_style, generate, model_name, on_chunk):
+    """Sections of per-video summaries condensed first when they don't fit one prompt, then merged"""
+    cache = get_cache()
+    entries = [f"{_video_heading(number, video)}\n{video['summary']}" for number, video in done]
+    sections = []
+    current = []
+    for entry in entries:
+        if current and estimate_tokens('\n\n'.join(current + [entry])) > CHUNK_TOKENS:
+            sections.append(current)
+            current = []
+        current.append(entry)
+    sections.append(current)
+
+    if len(sections) == 1:
+        notes = '\n\n'.join(sections[0])
+    else:
+        def condense(index):
+            section = sections[index]
+            first = sum(len(s) for s in sections[:index]) + 1
+            prompt = VIDEO_SECTION_PROMPT.format(
+                first=first, last=first + len(section) - 1, total=len(entries), kind=kind,
+                summaries='\n\n'.join(section)
+            )
+            key = make_key(prompt, stage='collection-section', model=model_name, prompt_version=PROMPT_VERSION)
+            return cache.get_or_compute(key, lambda: generate(prompt))
+
+        with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix='summarize') as executor:
+            notes = '\n\n'.join(executor.map(condense, range(len(sections))))
+
+    if lang_choice == "Auto (Content Language)":
+        lang_instruction = "Write in the language most of the videos are in."
+    else:
+        lang_instruction = f"Write in **{lang_choice}**."
+    prompt = DIGEST_PROMPT.format(
+        kind=kind, title=title, count=len(entries), lang_instruction=lang_instruction,
+        length_instruction=length_instructions[summary_level],
+        style_instruction="Use bullet points." if summary_style == "Bullets" else "Use paragraph format.",
+        notes=notes
+    )
+    key = make_key(prompt, stage='collection-digest', model=model_name, prompt_version=PROMPT_VERSION)
+    cached = cache.get(key)
+    if cached is not None:
+        if on_chunk:
+            on_chunk(cached)
+        return cached
+    digest = generate(prompt, on_chunk=on_chunk)
+    if digest:
+        cache.put(key, digest)
+    return digest
+
+
+def collection_notes(result):
+    """Per-video summaries of a summarized collection, which questions about it are answered from"""
+    return '\n'.join(f"{v['title']}\n{v['summary']}" for v in result['videos'] if v['status'] == 'ok')
+
+
+def summarize_collection(url, lang_choice, summary_level, summary_style, generate, model_name,
+                         on_chunk=None, on_progress=None):
+    """Digest of every captioned video in a playlist, channel or video list
+
+    on_progress gets {'stage', 'done', 'total', 'video_id', 'status'} after
+    each transcript and each video summary, on the calling thread. Only the
+    final digest is streamed to on_chunk.
+    """
+    kind, title, videos = expand_collection(url)
+    if not videos:
+        raise ValueError("The collection has no videos")
+    total = len(videos)
+    progress = {'transcript': 0, 'summary': 0}
+
+    def report(stage, video, status):
+        progress[stage] += 1
+        if on_progress:
+            on_progress({'stage': stage, 'done': progress[stage], 'total': total,
+                         'video_id': video['video_id'], 'status': status})
+
+    # Each video gets its canonical summary, which single-video requests for it reuse later
+    def summarize_video(data):
+        return canonical_summary(data, "youtube", generate, model_name)
+
+    with ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS, thread_name_prefix='transcript') as fetch_pool, \
+            ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix='collection') as summary_pool:
+        pending = {fetch_pool.submit(load_video, video['video_id']): ('transcript', video) for video in videos}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, video = pending.pop(future)
+                error = future.exception()
+                if error is not None:
+                    video['status'], video['error'] = 'skipped', str(error)
+                elif stage == 'transcript':
+                    data = future.result()
+                    video['title'] = video['title'] or data['title']
+                    pending[summary_pool.submit(summarize_video, data)] = ('summary', video)
+                else:
+                    video['status'], video['summary'] = 'ok', future.result()
+                report(stage, video, video.get('status', 'ok'))
+
+    done = [(number, video) for number, video in enumerate(videos, 1) if video.get('status') == 'ok']
+    skipped = [{'video_id': v['video_id'], 'title': v['title'], 'error': v['error']}
+               for v in videos if v.get('status') == 'skipped']
+    if not done:
+        reason = skipped[0]['error'] if skipped else "no videos"
+        raise ValueError(f"None of the videos in the collection could be summarized (first error: {reason})")
+
+    digest = _digest(kind, title, done, lang_choice, summary_level, summary_style, generate, model_name, on_chunk)
+    if not digest:
+        raise ValueError("Failed to generate summary. Please try again.")
+    return {
+        'summary': digest,
+        'title': title,
+        'method': f"YouTube {kind} ({len(done)} of {total} videos summarized)",
+        'content_type': 'collection',
+        'report': {'videos': total, 'summarized': len(done), 'skipped': len(skipped)},
+        'videos': [{'video_id': v['video_id'], 'title': v['title'], 'summary': v.get('summary'),
+                    'status': v['status'], 'error': v.get('error')} for v in videos],
+    }
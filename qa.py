@@ -0,0 +1,171 @@
+"""Follow-up questions about a summarized document.
+
+The extracted content is kept in the summary cache under a document ID and
+split into short passages indexed with BM25. A question is sent to Gemini
+with only the passages that best match it (and the last few turns of the
+conversation), not the whole document.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import metrics
+from compaction import estimate_tokens
+from history import HISTORY_ENABLED, get_history
+from llm import DEFAULT_MODEL, generate_text
+from summarizer import PROMPT_VERSION, split_into_chunks
+from summary_cache import get_cache, make_key
+
+
+PASSAGE_TOKENS = 250
+# Passages sent with each question
+TOP_PASSAGES = int(os.getenv('LITENOTE_QA_PASSAGES', 6))
+HISTORY_TURNS = 3
+# Parsed indexes kept in memory; others are rebuilt from the cache on the next question
+INDEX_CACHE_SIZE = 32
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_word_re = re.compile(r'\w+')
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+QA_PROMPT = """
+You are answering a question about the {kind} "{title}" using only the numbered excerpts below.
+Answer in the language of the question, concisely, in Markdown. Cite the excerpts you used like [2].
+If the excerpts do not contain the answer, say that the {kind} does not seem to cover it.
+
+**Excerpts (in document order):**
+{excerpts}
+{history}
+**Question:** {question}
+"""
+
+
+def _terms(text):
+    return [word.lower() for word in _word_re.findall(text)]
+
+
+class PassageIndex:
+    """BM25 over the passages of one document"""
+
+    def __init__(self, passages):
+        self.passages = passages
+        self.term_counts = [Counter(_terms(passage)) for passage in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / max(1, len(self.lengths))
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        total = len(passages)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def search(self, query, k=TOP_PASSAGES):
+        """Indexes of the k best-matching passages, in document order"""
+        terms = [term for term in set(_terms(query)) if term in self.idf]
+        scores = []
+        for index, counts in enumerate(self.term_counts):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[index] / self.average_length)
+            score = sum(
+                self.idf[term] * counts[term] * (BM25_K1 + 1) / (counts[term] + norm)
+                for term in terms if term in counts
+            )
+            if score > 0:
+                scores.append((score, index))
+        best = [index for _, index in sorted(scores, key=lambda pair: (-pair[0], pair[1]))[:k]]
+        # Nothing matched (e.g. "what is this about?"): the opening passages are the best guess
+        return sorted(best) if best else list(range(min(k, len(self.passages))))
+
+
+def store_document(title, content, content_type):
+    """Keep extracted content for follow-up questions; returns its document ID"""
+    document_id = make_key(content, stage='document', content_type=content_type)
+    cache = get_cache()
+    if cache.get(document_id) is None:
+        cache.put(document_id, json.dumps({'title': title, 'content': content, 'content_type': content_type}))
+    return document_id
+
+
+def load_document(document_id):
+    """(document, passage index), or (None, None) once the document has left the cache and the history"""
+    with _indexes_lock:
+        entry = _indexes.get(document_id)
+        if entry is not None:
+            _indexes.move_to_end(document_id)
+            return entry
+    stored = get_cache().get(document_id)
+    if stored is not None:
+        document = json.loads(stored)
+    else:
+        # Summaries found through the history keep their content there
+        document = get_history().document(document_id) if HISTORY_ENABLED else None
+        if document is None:
+            return None, None
+    entry = document, PassageIndex(split_into_chunks(document['content'], PASSAGE_TOKENS))
+    with _indexes_lock:
+        _indexes[document_id] = entry
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return entry
+
+
+def answer_question(document_id, question, history=(), model_name=DEFAULT_MODEL, on_chunk=None, api_key=None):
+    """Answer a question from the document's best-matching passages
+
+    history is a list of earlier {'question', 'answer'} turns. Returns
+    {'answer', 'passages', 'report'}; the report has the seconds taken, the
+    tokens sent and received and the size of the whole document for
+    comparison. Raises ValueError when the document is no longer cached.
+    """
+    started = time.perf_counter()
+    question = question.strip()
+    if not question:
+        raise ValueError("Please enter a question")
+    document, index = load_document(document_id)
+    if document is None:
+        raise ValueError("This document is no longer available; summarize it again to ask questions")
+
+    history = list(history)[-HISTORY_TURNS:]
+    with metrics.span('qa_retrieve') as span:
+        # The previous question helps resolve follow-ups like "and how much does it cost?"
+        query = ' '.join([question] + [turn['question'] for turn in history[-1:]])
+        selected = index.search(query)
+        excerpts = '\n\n'.join(f"[{number}] {index.passages[i]}" for number, i in enumerate(selected, 1))
+        span['chars'] = len(excerpts)
+
+    if history:
+        turns = '\n\n'.join(f"Q: {turn['question']}\nA: {turn['answer']}" for turn in history)
+        history_text = f"\n**Earlier in this conversation:**\n{turns}\n"
+    else:
+        history_text = ''
+    kind = {'youtube': "video", 'collection': "set of videos"}.get(document['content_type'], "article")
+    prompt = QA_PROMPT.format(
+        kind=kind, title=document['title'], excerpts=excerpts, history=history_text, question=question
+    )
+
+    report = {'passages': len(selected), 'document_tokens': estimate_tokens(document['content'])}
+    cache = get_cache()
+    key = make_key(prompt, stage='answer', model=model_name, prompt_version=PROMPT_VERSION)
+    answer = cache.get(key)
+    report['cached'] = answer is not None
+    if answer is None:
+        usage = {}
+        answer = generate_text(prompt, model_name=model_name, on_chunk=on_chunk, api_key=api_key, usage=usage)
+        if answer:
+            cache.put(key, answer)
+        report['tokens_in'] = usage.get('tokens_in') or estimate_tokens(prompt)
+        report['tokens_out'] = usage.get('tokens_out') or estimate_tokens(answer or '')
+    elif on_chunk:
+        on_chunk(answer)
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    return {
+        'answer': answer,
+        'passages': [index.passages[i] for i in selected],
+        'report': report,
+    }
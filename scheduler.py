@@ -0,0 +1,306 @@
+"""Admission, retries and hedging for Gemini calls.
+
+Every generate call passes through ``call``:
+
+* token buckets per API key and per key and model keep requests under the
+  configured per-minute quotas, and a 429 pauses the bucket for as long as
+  the API asks (its RetryInfo delay) so other callers back off too;
+* 429s, 5xx responses and connection errors are retried with jittered
+  exponential backoff, as long as no streamed text has reached the caller;
+* each call has a deadline covering queueing, attempts and backoff;
+* with LITENOTE_LLM_HEDGE=1, a call that runs well past the p95 latency seen
+  for its model (time to first token when streaming) gets a duplicate
+  request, and whichever answers first is used.
+
+Queue depth, in-flight attempts, retries and hedges are exported through
+metrics as ``litenote_llm_*`` gauges and counters.
+"""
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+import metrics
+
+
+# Requests per minute allowed per API key, and per key for each model; 0 for no limit
+KEY_RPM = float(os.getenv('LITENOTE_LLM_KEY_RPM', 0))
+MODEL_RPM = float(os.getenv('LITENOTE_LLM_MODEL_RPM', 0))
+# Seconds one generate call may take, including queueing and retries
+DEADLINE = float(os.getenv('LITENOTE_LLM_DEADLINE', 120))
+MAX_ATTEMPTS = int(os.getenv('LITENOTE_LLM_MAX_ATTEMPTS', 4))
+HEDGE = os.getenv('LITENOTE_LLM_HEDGE', '0') == '1'
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Hedge once a call is this far past the p95, and only with enough samples to trust it
+HEDGE_FACTOR = 1.5
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 1.0
+
+_retry_delay_re = re.compile(r'^([\d.]+)s$')
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class TokenBucket:
+    """Blocking token bucket refilled at `rate` tokens per second; rate 0 never blocks
+
+    clock returns monotonic seconds; tests pass a fake one.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now):
+        """Seconds until a token is available, 0 if one is available now; nothing is taken"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if not self.rate:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def _take(self):
+        if self.rate:
+            self.tokens -= 1
+
+    def acquire(self, deadline=None):
+        """Take one token; False if none is available before the monotonic deadline"""
+        return acquire_all([self], deadline)
+
+    def try_acquire(self):
+        return try_acquire_all([self])
+
+    def pause(self, seconds):
+        """Hand out nothing for a while, e.g. after the API reports the quota is exhausted"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self.tokens = 0.0
+
+
+def _take_all(ordered):
+    """Seconds until every bucket has a token; when that is 0 the tokens are taken"""
+    # Locked in one global order, so two callers can't each hold a lock the other needs
+    for bucket in ordered:
+        bucket._lock.acquire()
+    try:
+        wait = max((bucket._wait_time(bucket.clock()) for bucket in ordered), default=0.0)
+        if not wait:
+            for bucket in ordered:
+                bucket._take()
+        return wait
+    finally:
+        for bucket in reversed(ordered):
+            bucket._lock.release()
+
+
+def try_acquire_all(buckets):
+    """Take a token from every bucket if each has one free right now, otherwise take none"""
+    return not _take_all(sorted(set(buckets), key=id))
+
+
+def acquire_all(buckets, deadline=None):
+    """Take a token from every bucket at once; False if they aren't all free before the monotonic deadline
+
+    Nothing is held while waiting for the slowest bucket, so other callers can
+    still use the tokens of the rest.
+    """
+    ordered = sorted(set(buckets), key=id)
+    while True:
+        wait = _take_all(ordered)
+        if not wait:
+            return True
+        if deadline is not None and ordered[0].clock() + wait > deadline:
+            return False
+        time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket(key, rate):
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(rate / 60, burst=rate / 60 * 5)
+        return bucket
+
+
+def buckets_for(api_key, model_name):
+    return [_bucket(('key', api_key), KEY_RPM), _bucket(('model', api_key, model_name), MODEL_RPM)]
+
+
+def status_code(error):
+    """HTTP status of an API error (google.api_core exceptions carry it as .code)"""
+    code = getattr(error, 'code', None)
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    # OSError covers socket errors and the requests exceptions raised by the REST transport
+    return status_code(error) in RETRY_STATUS or isinstance(error, OSError)
+
+
+def retry_delay(error):
+    """Delay requested by a quota error's RetryInfo detail, in seconds"""
+    for detail in getattr(error, 'details', None) or ():
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+        if isinstance(detail, dict) and 'retryDelay' in detail:
+            match = _retry_delay_re.match(detail['retryDelay'])
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _hedge_after(model_name, mode):
+    if not HEDGE:
+        return None
+    if mode == 'stream':
+        p95 = metrics.stage_quantile('llm_first_token', 0.95, HEDGE_MIN_SAMPLES, model=model_name)
+    else:
+        p95 = metrics.stage_quantile('llm_attempt', 0.95, HEDGE_MIN_SAMPLES, model=model_name, mode=mode)
+    return None if p95 is None else max(HEDGE_MIN_DELAY, p95 * HEDGE_FACTOR)
+
+
+def _admit(buckets, model_name, deadline):
+    started = time.monotonic()
+    metrics.gauge('litenote_llm_queue_depth', 1, model=model_name)
+    try:
+        if not acquire_all(buckets, deadline):
+            metrics.increment('litenote_llm_deadline_exceeded_total', model=model_name, where='queue')
+            raise LLMDeadlineExceeded("Timed out waiting for Gemini quota")
+    finally:
+        metrics.gauge('litenote_llm_queue_depth', -1, model=model_name)
+    metrics.observe('llm_queue', time.monotonic() - started, model=model_name)
+
+
+def call(attempt, api_key, model_name, mode='single', on_chunk=None, deadline=DEADLINE):
+    """Run attempt(on_chunk, timeout) under the rate limits, retrying and hedging as configured"""
+    deadline_at = time.monotonic() + deadline
+    buckets = buckets_for(api_key, model_name)
+    streamed = []
+
+    def forward(text):
+        streamed.append(True)
+        on_chunk(text)
+
+    for number in range(MAX_ATTEMPTS):
+        _admit(buckets, model_name, deadline_at)
+        try:
+            return _attempt(attempt, buckets, model_name, mode, forward if on_chunk else None, deadline_at)
+        except Exception as e:
+            if time.monotonic() >= deadline_at and not isinstance(e, LLMDeadlineExceeded):
+                metrics.increment('litenote_llm_deadline_exceeded_total', model=model_name, where='attempt')
+                raise LLMDeadlineExceeded("Gemini did not answer before the deadline") from e
+            # Text already shown can't be taken back, so a broken stream is not retried
+            if streamed or not is_retryable(e) or number == MAX_ATTEMPTS - 1:
+                raise
+            requested = retry_delay(e)
+            if status_code(e) == 429:
+                for bucket in buckets:
+                    bucket.pause(requested or backoff(number))
+            delay = requested or backoff(number)
+            if time.monotonic() + delay >= deadline_at:
+                metrics.increment('litenote_llm_deadline_exceeded_total', model=model_name, where='backoff')
+                raise
+            metrics.increment('litenote_llm_retries_total', model=model_name, reason=status_code(e) or type(e).__name__)
+            time.sleep(delay)
+
+
+def _timed(attempt, model_name, mode, on_chunk, timeout):
+    started = time.perf_counter()
+    metrics.gauge('litenote_llm_in_flight', 1, model=model_name)
+    outcome = 'error'
+    try:
+        result = attempt(on_chunk, timeout)
+        outcome = 'ok'
+        return result
+    finally:
+        metrics.gauge('litenote_llm_in_flight', -1, model=model_name)
+        metrics.observe('llm_attempt', time.perf_counter() - started, outcome, model=model_name, mode=mode)
+
+
+def _attempt(attempt, buckets, model_name, mode, on_chunk, deadline_at):
+    hedge_after = _hedge_after(model_name, mode)
+    timeout = deadline_at - time.monotonic()
+    if hedge_after is None or hedge_after >= timeout:
+        return _timed(attempt, model_name, mode, on_chunk, timeout)
+
+    # Attempts run on their own threads and report here; text is passed on from the caller's thread
+    events = queue.Queue()
+
+    def run(number):
+        def report_chunk(text):
+            events.put((number, 'chunk', text))
+        try:
+            result = _timed(attempt, model_name, mode, report_chunk if on_chunk else None,
+                            deadline_at - time.monotonic())
+            events.put((number, 'done', result))
+        except Exception as e:
+            events.put((number, 'error', e))
+
+    threading.Thread(target=run, args=(0,), daemon=True).start()
+    hedge_at = time.monotonic() + hedge_after
+    launched, failed, winner = 1, 0, None
+    while True:
+        now = time.monotonic()
+        waiting_to_hedge = launched == 1 and winner is None
+        wait = (hedge_at if waiting_to_hedge else deadline_at) - now
+        try:
+            number, kind, value = events.get(timeout=max(0.0, wait))
+        except queue.Empty:
+            if not waiting_to_hedge or now >= deadline_at:
+                metrics.increment('litenote_llm_deadline_exceeded_total', model=model_name, where='attempt')
+                raise LLMDeadlineExceeded("Gemini did not answer before the deadline")
+            # A hedge spends quota too, so only send one if a token is free right now
+            if try_acquire_all(buckets):
+                threading.Thread(target=run, args=(1,), daemon=True).start()
+                metrics.increment('litenote_llm_hedges_total', model=model_name, result='sent')
+                launched = 2
+            else:
+                metrics.increment('litenote_llm_hedges_total', model=model_name, result='no_quota')
+                hedge_at = deadline_at
+            continue
+
+        if kind == 'error':
+            failed += 1
+            # Keep waiting while the other request can still answer
+            if number == winner or winner is None and failed == launched:
+                raise value
+            continue
+        if winner is None:
+            winner = number
+            if number == 1:
+                metrics.increment('litenote_llm_hedges_total', model=model_name, result='won')
+        if number != winner:
+            continue
+        if kind == 'chunk':
+            on_chunk(value)
+        else:
+            return value
@@ -0,0 +1,241 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import metrics
+from summary_cache import CACHE_PATH
+
+
+# Optional cap on how long a caller waits for someone else's identical request. By default
+# it waits as long as the leader is running: in this process until it finishes, in another
+# one while its lease keeps being renewed (a lapsed lease is taken over instead)
+FLIGHT_TIMEOUT = float(os.getenv('LITENOTE_FLIGHT_TIMEOUT', 0)) or None
+# Coordinate through the cache database so separate processes share one flight per key
+SHARED_FLIGHTS = os.getenv('LITENOTE_SHARED_FLIGHTS', '1') != '0'
+LEASE_SECONDS = 30
+RESULT_TTL = 120
+POLL_INTERVAL = 0.2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flight_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS flight_results (
+    key TEXT PRIMARY KEY,
+    result TEXT,
+    error TEXT,
+    finished_at REAL NOT NULL
+);
+"""
+
+
+class CoalesceTimeout(TimeoutError):
+    pass
+
+
+class CoalescedError(Exception):
+    """The request another process was running for us failed with this message"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.chunks = []
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time; concurrent callers share its outcome
+
+    Callers in the same process wait on the running call and receive the
+    streamed text as it is produced. With a shared path, one process holds a
+    lease row per key and the others poll for the published result.
+    """
+
+    def __init__(self, path=CACHE_PATH, shared=SHARED_FLIGHTS, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.shared = shared
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if shared:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connect().executescript(SCHEMA)
+
+    def do(self, key, fn, timeout=FLIGHT_TIMEOUT, on_chunk=None):
+        """fn(on_chunk=...) once per key; identical concurrent calls get the same result or error
+
+        timeout (seconds, or None for no cap) bounds how long a caller waits
+        for a leader; CoalesceTimeout is raised when it runs out.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.increment('litenote_singleflight_total', result='coalesced')
+            return self._follow(call, timeout, on_chunk)
+
+        def fan_out(text):
+            call.chunks.append(text)
+            if on_chunk:
+                on_chunk(text)
+
+        try:
+            if self.shared:
+                call.result = self._run_shared(key, fn, fan_out, timeout)
+            else:
+                metrics.increment('litenote_singleflight_total', result='leader')
+                call.result = fn(on_chunk=fan_out)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _follow(self, call, timeout, on_chunk):
+        """Wait in the caller's own thread, replaying the leader's streamed text"""
+        deadline = time.monotonic() + timeout if timeout else None
+        seen = 0
+        while True:
+            if on_chunk:
+                wait = POLL_INTERVAL
+            else:
+                wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            finished = call.done.wait(wait)
+            if on_chunk:
+                chunks = call.chunks[seen:]
+                seen += len(chunks)
+                for text in chunks:
+                    on_chunk(text)
+            if finished:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise CoalesceTimeout("Timed out waiting for an identical request already in progress")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    # Cross-process coordination
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _acquire(self, key):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT owner, expires_at FROM flight_leases WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO flight_leases (key, owner, expires_at) VALUES (?, ?, ?)',
+                (key, self.owner, now + self.lease_seconds)
+            )
+            # A result left by an earlier flight must not be mistaken for this one's
+            conn.execute('DELETE FROM flight_results WHERE key = ? OR finished_at < ?', (key, now - RESULT_TTL))
+            return True
+
+    def _renew(self, key, stop):
+        while not stop.wait(self.lease_seconds / 3):
+            with self._transaction() as conn:
+                conn.execute(
+                    'UPDATE flight_leases SET expires_at = ? WHERE key = ? AND owner = ?',
+                    (time.time() + self.lease_seconds, key, self.owner)
+                )
+
+    def _finish(self, key, result=None, error=None):
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO flight_results (key, result, error, finished_at) VALUES (?, ?, ?, ?)',
+                (key, None if error else json.dumps(result, default=str), error, time.time())
+            )
+            conn.execute('DELETE FROM flight_leases WHERE key = ? AND owner = ?', (key, self.owner))
+
+    def _poll(self, key):
+        """('done', result), ('error', message), ('running', None) or ('abandoned', None)"""
+        conn = self._connect()
+        row = conn.execute('SELECT result, error FROM flight_results WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            return ('error', row[1]) if row[1] is not None else ('done', json.loads(row[0]))
+        lease = conn.execute('SELECT expires_at FROM flight_leases WHERE key = ?', (key,)).fetchone()
+        if lease is None or lease[0] <= time.time():
+            return 'abandoned', None
+        return 'running', None
+
+    def _run_shared(self, key, fn, on_chunk, timeout):
+        deadline = time.monotonic() + timeout if timeout else None
+        while not self._acquire(key):
+            metrics.increment('litenote_singleflight_total', result='coalesced_remote')
+            # Another process is computing this key; wait for its published outcome
+            while True:
+                state, value = self._poll(key)
+                if state == 'done':
+                    return value
+                if state == 'error':
+                    raise CoalescedError(value)
+                if state == 'abandoned':
+                    # The leader stopped renewing its lease; whoever acquires it next runs fn
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise CoalesceTimeout("Timed out waiting for an identical request already in progress")
+                time.sleep(POLL_INTERVAL)
+
+        metrics.increment('litenote_singleflight_total', result='leader')
+        stop = threading.Event()
+        threading.Thread(target=self._renew, args=(key, stop), daemon=True).start()
+        try:
+            result = fn(on_chunk=on_chunk)
+        except Exception as e:
+            self._finish(key, error=str(e) or type(e).__name__)
+            raise
+        finally:
+            stop.set()
+        self._finish(key, result=result)
+        return result
+
+
+_flights = None
+_flights_lock = threading.Lock()
+
+
+def get_flights():
+    """Process-wide SingleFlight sharing leases through the cache database"""
+    global _flights
+    if _flights is None:
+        with _flights_lock:
+            if _flights is None:
+                _flights = SingleFlight()
+    return _flights
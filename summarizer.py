@@ -0,0 +1,499 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from compaction import compact_content, estimate_tokens
+from dedup import DEDUP_ENABLED, get_index
+from langid import detect_language
+from summary_cache import get_cache, make_key
+from transcripts import format_timestamp, timestamp_link
+
+
+CHUNK_TOKENS = 6000
+REDUCE_TOKENS = 12000
+MAX_CONCURRENCY = 4
+# Long articles are summarized as content-defined sections whose notes are cached,
+# so a page fetched again only sends its new or edited sections to Gemini
+INCREMENTAL = os.getenv('LITENOTE_INCREMENTAL', '1') != '0'
+INCREMENTAL_MIN_TOKENS = int(os.getenv('LITENOTE_INCREMENTAL_MIN_TOKENS', 4000))
+SECTION_TOKENS = 2500
+
+# Bump whenever a prompt changes so cached summaries are not reused
+PROMPT_VERSION = "v1"
+
+_sentence_re = re.compile(r'(?<=[.!?।。！？])\s+')
+
+CHUNK_PROMPT = """
+You are condensing part {index} of {total} of a longer {kind}.
+Write dense Markdown notes that keep every key point, fact, number, name, example and quote from this part.
+Keep the original language of the text. Do not add an introduction or a conclusion.
+
+**Part Content:**
+{chunk}
+"""
+
+SECTION_PROMPT = """
+You are condensing one section of a longer {kind}.
+Write dense Markdown notes that keep every key point, fact, number, name, example and quote from this section.
+Keep the original language of the text. Do not add an introduction or a conclusion.
+
+**Section Content:**
+{section}
+"""
+
+VARIANT_PROMPT = """
+You are rewriting a detailed structured summary of a {kind} for a different reader preference.
+{lang_instruction}
+{length_instruction}
+{style_instruction}
+
+Keep the same overall structure: header, executive summary, sections with their headings, key takeaways table
+and actionable insights. Copy links (including timestamp links), names and numbers exactly as written.
+Do not add information that is not in the summary.
+
+**Detailed Summary:**
+{summary}
+"""
+
+NOTES_HEADER = "(The content below is a set of notes covering consecutive parts of the full source, in order.)\n\n"
+
+CHAPTER_PROMPT = """
+You are condensing one section of a YouTube video transcript.
+Begin with this heading line, completing it with {title_hint}:
+### [{timestamp}]({link})
+Then write dense Markdown notes that keep every key point, fact, number, name, example and quote from this section.
+Keep the original language of the text. Do not add an introduction or a conclusion.
+
+**Section Transcript:**
+{text}
+"""
+
+CHAPTERS_HEADER = (
+    "(The content below is a set of notes for consecutive sections of the video, in order. "
+    "Each section heading starts with a timestamp link; keep that link at the start of the "
+    "matching section heading in your summary.)\n\n"
+)
+
+
+def _split_long(unit, max_tokens):
+    """Split an oversized paragraph on sentences, then on words"""
+    pieces = []
+    for sentence in _sentence_re.split(unit):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = sentence.split(' ')
+        step = max(1, max_tokens * 4 // 6)
+        for i in range(0, len(words), step):
+            pieces.append(' '.join(words[i:i + step]))
+    return pieces
+
+
+def _split_units(text, max_tokens):
+    """Paragraphs, with oversized ones split on sentences"""
+    units = []
+    for paragraph in text.split('\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > max_tokens:
+            units.extend(_split_long(paragraph, max_tokens))
+        else:
+            units.append(paragraph)
+    return units
+
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """Pack paragraphs and sentences into chunks within a token budget"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in _split_units(text, max_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def split_into_sections(text, target_tokens=SECTION_TOKENS, max_tokens=SECTION_TOKENS * 4):
+    """Content-defined sections of about target_tokens each
+
+    Whether a section ends after a paragraph depends only on that paragraph's
+    hash, so editing, adding or removing a paragraph changes the section it is
+    in and leaves the boundaries of every other section where they were.
+    """
+    sections = []
+    current = []
+    current_tokens = 0
+    for paragraph in _split_units(text, target_tokens // 2):
+        tokens = estimate_tokens(paragraph)
+        if current and current_tokens + tokens > max_tokens:
+            sections.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(paragraph)
+        current_tokens += tokens
+        # Ends here with probability tokens / target_tokens, decided by the text alone
+        digest = int.from_bytes(hashlib.sha1(paragraph.encode('utf-8')).digest()[:4], 'big')
+        if current_tokens >= target_tokens // 4 and digest < (1 << 32) * tokens / target_tokens:
+            sections.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+    if current:
+        sections.append('\n'.join(current))
+    return sections
+
+
+def summarize_chunks(chunks, generate, model_name, kind="document"):
+    """Summarize chunks in parallel with bounded concurrency; notes are cached per chunk"""
+    cache = get_cache()
+
+    def summarize_one(index):
+        chunk = chunks[index]
+        key = make_key(chunk, stage='chunk-notes', model=model_name, prompt_version=PROMPT_VERSION)
+        prompt = CHUNK_PROMPT.format(index=index + 1, total=len(chunks), kind=kind, chunk=chunk)
+        return cache.get_or_compute(key, lambda: generate(prompt))
+
+    workers = min(MAX_CONCURRENCY, len(chunks))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarize') as executor:
+        return list(executor.map(summarize_one, range(len(chunks))))
+
+
+def map_reduce(content, build_prompt, generate, model_name, kind="document",
+               chunk_tokens=CHUNK_TOKENS, reduce_tokens=REDUCE_TOKENS, on_chunk=None):
+    """Summarize content of any length: per-chunk notes, then one merging pass
+
+    Only the final call is streamed to on_chunk; chunk notes are intermediate.
+    """
+    chunks = split_into_chunks(content, chunk_tokens)
+    if len(chunks) <= 1:
+        return generate(build_prompt(content), on_chunk=on_chunk)
+
+    notes = summarize_chunks(chunks, generate, model_name, kind)
+    return merge_notes(notes, build_prompt, generate, model_name, chunk_tokens, reduce_tokens, on_chunk)
+
+
+def merge_notes(notes, build_prompt, generate, model_name, chunk_tokens=CHUNK_TOKENS, reduce_tokens=REDUCE_TOKENS,
+                on_chunk=None):
+    """Final summary from notes on consecutive parts, condensing the notes first if they are too long"""
+    merged = '\n\n'.join(f"### Part {i + 1}\n{n}" for i, n in enumerate(notes))
+
+    # Very long sources can produce more notes than one prompt should hold
+    while estimate_tokens(merged) > reduce_tokens:
+        chunks = split_into_chunks(merged, chunk_tokens)
+        if len(chunks) <= 1:
+            break
+        notes = summarize_chunks(chunks, generate, model_name, "set of notes")
+        merged = '\n\n'.join(f"### Part {i + 1}\n{n}" for i, n in enumerate(notes))
+
+    return generate(build_prompt(NOTES_HEADER + merged), on_chunk=on_chunk)
+
+
+def summarize_sections(content, build_prompt, generate, model_name, kind="document", on_chunk=None, report=None):
+    """Summary merged from cached per-section notes; only new or edited sections are sent to Gemini
+
+    When a report dict is given it receives the number of sections and how
+    many of them reused stored notes.
+    """
+    cache = get_cache()
+    sections = split_into_sections(content)
+    reused = [False] * len(sections)
+
+    def summarize_one(index):
+        section = sections[index]
+        key = make_key(section, stage='section-notes', kind=kind, model=model_name, prompt_version=PROMPT_VERSION)
+        notes = cache.get(key)
+        if notes is not None:
+            reused[index] = True
+            return notes
+        notes = generate(SECTION_PROMPT.format(kind=kind, section=section))
+        if notes:
+            cache.put(key, notes)
+        return notes
+
+    workers = min(MAX_CONCURRENCY, len(sections))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarize') as executor:
+        notes = list(executor.map(summarize_one, range(len(sections))))
+
+    metrics.increment('litenote_sections_total', sum(reused), result='reused')
+    metrics.increment('litenote_sections_total', len(sections) - sum(reused), result='generated')
+    if report is not None:
+        report['sections'] = len(sections)
+        report['sections_reused'] = sum(reused)
+    return merge_notes(notes, build_prompt, generate, model_name, on_chunk=on_chunk)
+
+
+def summarize_chapters(chapters, video_id, build_prompt, generate, model_name, on_chunk=None):
+    """Summarize video chapters in parallel, then merge notes that link back to each timestamp"""
+    cache = get_cache()
+
+    def summarize_one(chapter):
+        text = chapter['text']
+        if estimate_tokens(text) > CHUNK_TOKENS:
+            # Condense an unusually long chapter before giving it a heading
+            text = '\n\n'.join(summarize_chunks(split_into_chunks(text), generate, model_name, "video section"))
+        if chapter['title']:
+            title_hint = f'the chapter title "{chapter["title"]}"'
+        else:
+            title_hint = "a short descriptive title for the section"
+        prompt = CHAPTER_PROMPT.format(
+            title_hint=title_hint, timestamp=format_timestamp(chapter['start']),
+            link=timestamp_link(video_id, chapter['start']), text=text
+        )
+        key = make_key(text, stage='chapter-notes', model=model_name, video_id=video_id, start=int(chapter['start']),
+                       title=chapter['title'], prompt_version=PROMPT_VERSION)
+        return cache.get_or_compute(key, lambda: generate(prompt))
+
+    workers = min(MAX_CONCURRENCY, len(chapters))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarize') as executor:
+        notes = list(executor.map(summarize_one, chapters))
+
+    merged = '\n\n'.join(notes)
+    if estimate_tokens(merged) > REDUCE_TOKENS:
+        return map_reduce(merged, build_prompt, generate, model_name, "set of timestamped notes", on_chunk=on_chunk)
+    return generate(build_prompt(CHAPTERS_HEADER + merged), on_chunk=on_chunk)
+
+
+# Language, length and style of the canonical summary every variant is derived from
+CANONICAL_OPTIONS = ("Auto (Content Language)", "Detailed", "Bullets")
+
+length_instructions = {
+    "Brief": "Summarize concisely in 3-5 bullet points per section.",
+    "Medium": "Summarize in 6-10 bullet points or short paragraphs per section.",
+    "Detailed": "Provide detailed paragraphs with comprehensive explanations, examples, and context for each section."
+}
+
+
+def build_summary_prompt(content_data, content, detected_lang, lang_choice, summary_level, summary_style, content_type):
+    title = content_data.get('title', 'Unknown Title')
+
+    if lang_choice == "Auto (Content Language)":
+        lang_instruction = f"The content is in **{detected_lang}**. Summarize in the same language."
+    else:
+        lang_instruction = f"Translate and summarize into **{lang_choice}**."
+
+    style_instruction = "Use bullet points." if summary_style == "Bullets" else "Use paragraph format."
+
+    if content_type == "youtube":
+        type_instruction = """
+        You are summarizing a YouTube video transcript. Focus on:
+        - Main topics and key messages from the video
+        - Important tips, insights, or tutorials mentioned
+        - Sequential flow of information as presented in the video
+        """
+        source_info = f"""
+        **Source Information:**
+        - Video Title: {title}
+        - Content Type: YouTube Video Transcript
+        - Original Language: {detected_lang}
+        """
+    else:
+        type_instruction = """
+        You are summarizing web content from an article or blog. Focus on:
+        - Main arguments and key points
+        - Supporting evidence and data
+        - Conclusions and recommendations
+        """
+        author = content_data.get('author', 'Unknown Author')
+        source_info = f"""
+        **Source Information:**
+        - Title: {title}
+        - Author: {author}
+        - Content Type: Website/Blog Article
+        - Original Language: {detected_lang}
+        """
+
+    return f"""
+    You are a highly skilled multilingual content summarizer and analyst.
+
+    {lang_instruction}
+    {length_instructions[summary_level]}
+    {style_instruction}
+    {type_instruction}
+
+    Your task is to create a **structured, comprehensive, and actionable summary** of the provided content.
+
+    {source_info}
+
+    **Instructions:**
+
+    1. **Document Header**
+       - Include the source information above
+       - Summary Language: {lang_choice}
+
+    2. **Executive Summary**
+       - Provide a 2-3 sentence overview of the main topic and key findings
+
+    3. **Main Content Analysis**
+       - Identify and organize content into logical sections
+       - Use descriptive headings for each section
+       - Extract key insights, arguments, and supporting evidence
+       - Highlight important data, statistics, or quotes (if present)
+
+    4. **Key Takeaways Table**
+       Create a markdown table:
+       | Section | Key Insight |
+       |---------|-------------|
+       | Section Name | One-sentence takeaway |
+
+    5. **Actionable Insights**
+       - List 3-5 practical insights or recommendations
+       - Make them specific and directly applicable
+
+    6. **Content Assessment**
+       - Brief note on content quality, credibility, and usefulness
+
+    **Formatting Requirements:**
+    - Use clear Markdown formatting
+    - Maintain logical flow and readability
+    - Avoid repetition and filler content
+    - Focus on value-driven insights
+
+    **Content to Summarize:**
+    {content}
+    """
+
+
+def _link_options(content_data, content_type):
+    """Summaries of chaptered videos link to their timestamps, so they are only reused for the same video"""
+    if content_type == "youtube" and len(content_data.get('chapters') or []) > 1:
+        return {'video_id': content_data['video_id']}
+    return {}
+
+
+def _lookup(content, options, summary):
+    """(key, options key, cached summary or None), matching near-identical documents too"""
+    cache = get_cache()
+    key = make_key(content, **options)
+    options_key = make_key('', **options)
+    with metrics.span('summary_cache', summary=summary) as span:
+        cached = cache.get(key)
+        if cached is None and DEDUP_ENABLED:
+            # Syndicated copies and re-uploads reuse the summary of a near-identical document
+            # Closest first; a candidate whose summary has just been evicted is skipped
+            for near_key in get_index().find(content, options_key):
+                cached = cache.get(near_key)
+                if cached is not None:
+                    break
+        span['cache_hit'] = cached is not None
+    return key, options_key, cached
+
+
+def _store(content, key, options_key, summary):
+    get_cache().put(key, summary)
+    if DEDUP_ENABLED:
+        get_index().add(content, options_key, key)
+
+
+def canonical_summary(content_data, content_type, generate, model_name, on_chunk=None, report=None):
+    """Detailed structured summary in the content's own language; every other variant is derived from it
+
+    When a report dict is given it receives the token counts before and after
+    compaction, whether the summary came from the cache and, for long
+    articles, how many sections could reuse their stored notes.
+    """
+    if report is None:
+        report = {}
+    content = content_data['content']
+    options = dict(stage='canonical', model=model_name, content_type=content_type, prompt_version=PROMPT_VERSION,
+                   **_link_options(content_data, content_type))
+    key, options_key, cached = _lookup(content, options, 'canonical')
+    report['cached'] = cached is not None
+    if cached is not None:
+        return cached
+
+    with metrics.span('compact', content_type=content_type) as span:
+        compacted = compact_content(content, content_type, model_name=model_name)
+        span['tokens_in'] = compacted['tokens_before']
+        span['tokens_out'] = compacted['tokens_after']
+    report['tokens_before'] = compacted['tokens_before']
+    report['tokens_after'] = compacted['tokens_after']
+
+    detected_lang = detect_language(content)
+    kind = "YouTube video transcript" if content_type == "youtube" else "web article"
+    lang_choice, summary_level, summary_style = CANONICAL_OPTIONS
+
+    def build_prompt(text):
+        with metrics.span('prompt_build') as span:
+            prompt = build_summary_prompt(
+                content_data, text, detected_lang, lang_choice, summary_level, summary_style, content_type
+            )
+            span['tokens_in'] = estimate_tokens(prompt)
+            return prompt
+
+    chapters = content_data.get('chapters') or []
+    if content_type == "youtube" and len(chapters) > 1:
+        chapters = [dict(c, text=compact_content(c['text'], content_type)['content']) for c in chapters]
+        summary = summarize_chapters(chapters, content_data['video_id'], build_prompt, generate, model_name, on_chunk)
+    elif content_type != "youtube" and INCREMENTAL and compacted['tokens_after'] > INCREMENTAL_MIN_TOKENS:
+        summary = summarize_sections(
+            compacted['content'], build_prompt, generate, model_name, kind, on_chunk=on_chunk, report=report
+        )
+    else:
+        summary = map_reduce(compacted['content'], build_prompt, generate, model_name, kind, on_chunk=on_chunk)
+    if summary:
+        _store(content, key, options_key, summary)
+    return summary
+
+
+def derive_variant(canonical, kind, detected_lang, lang_choice, summary_level, summary_style, generate,
+                   on_chunk=None):
+    """Shorter, restyled or translated version of a canonical summary, without the source content"""
+    if lang_choice.startswith("Auto"):
+        lang_instruction = f"Keep the summary in its original language ({detected_lang})."
+    else:
+        lang_instruction = f"Translate the summary into **{lang_choice}**."
+    style_instruction = "Use bullet points." if summary_style == "Bullets" else "Use paragraph format."
+    prompt = VARIANT_PROMPT.format(
+        kind=kind, lang_instruction=lang_instruction, length_instruction=length_instructions[summary_level],
+        style_instruction=style_instruction, summary=canonical
+    )
+    with metrics.span('prompt_build') as span:
+        span['tokens_in'] = estimate_tokens(prompt)
+    return generate(prompt, on_chunk=on_chunk)
+
+
+def summarize_content(content_data, lang_choice, summary_level, summary_style, content_type, generate, model_name,
+                      on_chunk=None, report=None):
+    """Structured summary of extracted content in the requested language, length and style
+
+    The source is summarized once into the canonical summary; other variants
+    are rewritten from it and cached separately. The report dict also gets
+    'derived' when the summary was rewritten from the canonical one.
+    """
+    if report is None:
+        report = {}
+    if (lang_choice, summary_level, summary_style) == CANONICAL_OPTIONS:
+        return canonical_summary(content_data, content_type, generate, model_name, on_chunk, report)
+
+    content = content_data['content']
+    options = dict(
+        stage='summary', model=model_name, language=lang_choice, summary_level=summary_level,
+        summary_style=summary_style, content_type=content_type, prompt_version=PROMPT_VERSION,
+        **_link_options(content_data, content_type)
+    )
+    key, options_key, cached = _lookup(content, options, 'variant')
+    if cached is not None:
+        report['cached'] = True
+        return cached
+
+    canonical = canonical_summary(content_data, content_type, generate, model_name, report=report)
+    if not canonical:
+        return canonical
+    report['cached'] = False
+    report['derived'] = True
+    kind = "YouTube video" if content_type == "youtube" else "web article"
+    summary = derive_variant(
+        canonical, kind, detect_language(content), lang_choice, summary_level, summary_style, generate, on_chunk
+    )
+    if summary:
+        _store(content, key, options_key, summary)
+    return summary
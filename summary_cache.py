@@ -0,0 +1,166 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+
+
+CACHE_PATH = os.getenv('LITENOTE_CACHE_PATH', os.path.join('.litenote_cache', 'summaries.sqlite3'))
+CACHE_MAX_BYTES = int(os.getenv('LITENOTE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+CACHE_TTL = int(os.getenv('LITENOTE_CACHE_TTL', 30 * 24 * 3600))
+
+EVICT_BATCH = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at);
+CREATE INDEX IF NOT EXISTS summaries_created ON summaries (created_at);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (name, value) VALUES ('hits', 0), ('misses', 0), ('bytes', 0), ('evictions', 0);
+CREATE TRIGGER IF NOT EXISTS summaries_insert AFTER INSERT ON summaries BEGIN
+    UPDATE cache_stats SET value = value + new.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS summaries_update AFTER UPDATE OF size ON summaries BEGIN
+    UPDATE cache_stats SET value = value + new.size - old.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS summaries_delete AFTER DELETE ON summaries BEGIN
+    UPDATE cache_stats SET value = value - old.size WHERE name = 'bytes';
+END;
+"""
+
+
+def normalize_content(text):
+    """Unicode-normalize and collapse whitespace so trivial differences share a key"""
+    text = unicodedata.normalize('NFC', text or '')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def make_key(content, **options):
+    """Content-addressed key: normalized content plus every option that changes the output"""
+    digest = hashlib.sha256()
+    digest.update(normalize_content(content).encode('utf-8'))
+    for name in sorted(options):
+        digest.update(f"\0{name}={options[name]}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """SQLite-backed LRU with TTL, safe to share between processes"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _count(self, conn, name, amount=1):
+        conn.execute('UPDATE cache_stats SET value = value + ? WHERE name = ?', (amount, name))
+
+    def get(self, key):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT value, created_at FROM summaries WHERE key = ?', (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                conn.execute('DELETE FROM summaries WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                self._count(conn, 'misses')
+                return None
+            conn.execute('UPDATE summaries SET accessed_at = ? WHERE key = ?', (now, key))
+            self._count(conn, 'hits')
+            return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO summaries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, '
+                'created_at = excluded.created_at, accessed_at = excluded.accessed_at',
+                (key, value, size, now, now)
+            )
+            conn.execute('DELETE FROM summaries WHERE created_at < ?', (now - self.ttl,))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the store fits in max_bytes"""
+        excess = conn.execute("SELECT value FROM cache_stats WHERE name = 'bytes'").fetchone()[0] - self.max_bytes
+        while excess > 0:
+            rows = conn.execute(
+                'SELECT key, size FROM summaries ORDER BY accessed_at LIMIT ?', (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                return
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany('DELETE FROM summaries WHERE key = ?', victims)
+            self._count(conn, 'evictions', len(victims))
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value:
+                self.put(key, value)
+        return value
+
+    def stats(self):
+        conn = self._connect()
+        stats = dict(conn.execute('SELECT name, value FROM cache_stats').fetchall())
+        stats['entries'] = conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache instance pointing at the shared database"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SummaryCache()
+    return _cache
@@ -0,0 +1,48 @@
+"""Batch processing of single URLs with the extraction and summarization stages stubbed"""
+import argparse
+import asyncio
+
+import batch
+
+
+PLAYLIST = 'https://www.youtube.com/playlist?list=PL0123456789'
+
+
+def run_one(url):
+    args = argparse.Namespace(lang='Auto (Content Language)', length='Detailed', style='Bullets', model='model',
+                              export_dir=None)
+    written = []
+
+    async def main():
+        stages = {name: batch.Stage(1, 0) for name in ('extract', 'summarize', 'export')}
+
+        async def writer(record):
+            written.append(record)
+
+        return await batch.process_url(url, args, stages, writer)
+
+    return asyncio.run(main()), written
+
+
+def test_collection_urls_are_summarized_as_collections(monkeypatch):
+    stored = []
+    monkeypatch.setattr(batch, 'extract_content', lambda url: (_ for _ in ()).throw(AssertionError(url)))
+    monkeypatch.setattr(batch, 'summarize_collection', lambda url, *args, **kwargs: {
+        'summary': 'Digest', 'title': 'A playlist', 'method': 'YouTube playlist (1 of 2 videos summarized)',
+        'content_type': 'collection', 'report': {'videos': 2, 'summarized': 1, 'skipped': 1},
+        'videos': [
+            {'video_id': 'aaaaaaaaaaa', 'title': 'One', 'summary': 'First notes', 'status': 'ok', 'error': None},
+            {'video_id': 'bbbbbbbbbbb', 'title': 'Two', 'summary': None, 'status': 'skipped',
+             'error': 'No captions'},
+        ],
+    })
+    monkeypatch.setattr(batch, 'store_document', lambda *args: stored.append(args) or 'doc')
+    monkeypatch.setattr(batch.history, 'record_async', lambda *args, **kwargs: None)
+
+    record, written = run_one(PLAYLIST)
+    assert written == [record]
+    assert record['status'] == 'ok', record.get('error')
+    assert record['summary'] == 'Digest'
+    assert record['content_type'] == 'collection'
+    assert record['skipped_videos'] == [{'video_id': 'bbbbbbbbbbb', 'error': 'No captions'}]
+    assert stored == [('A playlist', 'One\nFirst notes', 'collection')]
@@ -0,0 +1,30 @@
+"""Compaction keeps within the token budget, including text with no sentence punctuation"""
+import random
+
+from compaction import compact_content
+
+
+def _unpunctuated(words):
+    rng = random.Random(0)
+    vocab = ['word%d' % i for i in range(3000)]
+    return ' '.join(rng.choice(vocab) for _ in range(words))
+
+
+def test_unpunctuated_transcript_compacts_to_the_budget():
+    result = compact_content(_unpunctuated(40000), 'youtube', budget=5000)
+    assert result['content']
+    assert result['tokens_after'] <= 5000
+    assert result['tokens_after'] < result['tokens_before']
+
+
+def test_budget_below_one_sentence_keeps_the_opening_words():
+    text = _unpunctuated(500)
+    result = compact_content(text, 'youtube', budget=20)
+    assert result['content']
+    assert text.startswith(result['content'])
+    assert result['tokens_after'] <= 20
+
+
+def test_content_within_budget_is_left_intact():
+    text = 'The first point. The second point.\nA new paragraph.'
+    assert compact_content(text, 'website')['content'] == text
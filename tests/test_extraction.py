@@ -0,0 +1,26 @@
+"""Streaming extraction of pages fed in pieces"""
+from extraction import StreamingExtractor
+
+
+PAGE = ('<html><head><title>Caf\u00e9 notes</title></head><body><article>'
+        + '<p>%s</p>' % ('A paragraph about the caf\u00e9 and its long history in the town. ' * 20)
+        + '</article></body></html>')
+
+
+def stream(page, encoding, piece=64):
+    extractor = StreamingExtractor('https://example.com/page')
+    extractor.start(encoding)
+    for start in range(0, len(page), piece):
+        extractor.feed(page[start:start + piece])
+    return extractor.result()
+
+
+def test_unknown_charset_falls_back_to_utf8():
+    result = stream(PAGE.encode('utf-8'), 'x-bogus')
+    assert result['title'] == 'Caf\u00e9 notes'
+    assert 'caf\u00e9 and its long history' in result['content']
+
+
+def test_declared_charset_is_used():
+    result = stream(PAGE.encode('iso-8859-1'), 'iso-8859-1')
+    assert 'caf\u00e9 and its long history' in result['content']
@@ -0,0 +1,29 @@
+"""Vector index search modes over a small temporary index"""
+import numpy as np
+
+import history
+
+
+def _index(tmp_path, rows, dim=16):
+    rng = np.random.default_rng(0)
+    block = rng.standard_normal((rows, dim)).astype(np.float32)
+    block /= np.linalg.norm(block, axis=1, keepdims=True)
+    index = history.VectorIndex(str(tmp_path), dim)
+    index.write(0, block)
+    return index, block
+
+
+def test_ivf_search_ignores_rows_past_the_searched_range(tmp_path):
+    index, block = _index(tmp_path, 1200)
+    index.build_lists(1200)
+    rows, _ = index._search_ivf(block[0], 5, 1000)
+    assert len(rows) == 5
+    assert max(rows) < 1000
+    assert rows[0] == 0
+
+
+def test_modes_agree_on_the_nearest_row(tmp_path):
+    index, block = _index(tmp_path, 500)
+    for mode in ('exact', 'quantized', 'ivf'):
+        rows, _ = index.search(block[42], 3, mode)
+        assert rows[0] == 42
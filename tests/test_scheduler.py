@@ -0,0 +1,164 @@
+"""Token bucket, admission and hedge behaviour, with a fake clock for the buckets"""
+import threading
+import time
+
+import pytest
+
+import scheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def bucket(clock, rate=1.0, burst=1, tokens=None):
+    result = scheduler.TokenBucket(rate, burst=burst, clock=clock)
+    if tokens is not None:
+        result.tokens = tokens
+    return result
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_bucket_refills_at_its_rate():
+    clock = FakeClock()
+    b = bucket(clock, rate=2.0)
+    assert b.try_acquire()
+    assert not b.try_acquire()
+    clock.advance(0.25)
+    assert not b.try_acquire()
+    clock.advance(0.25)
+    assert b.try_acquire()
+
+
+def test_bucket_without_rate_never_blocks():
+    clock = FakeClock()
+    b = bucket(clock, rate=0)
+    assert all(b.try_acquire() for _ in range(100))
+
+
+def test_acquire_gives_up_when_no_token_comes_before_the_deadline():
+    clock = FakeClock()
+    b = bucket(clock, rate=1.0, tokens=0.0)
+    started = time.monotonic()
+    assert not b.acquire(deadline=clock() + 0.5)
+    # Decided from the refill time, without sleeping until the deadline
+    assert time.monotonic() - started < 0.1
+
+
+def test_pause_hands_out_nothing_until_it_ends():
+    clock = FakeClock()
+    b = bucket(clock, rate=10.0, burst=5)
+    b.pause(3)
+    clock.advance(2.9)
+    assert not b.try_acquire()
+    clock.advance(0.2)
+    assert b.try_acquire()
+
+
+def test_try_acquire_all_takes_nothing_when_one_bucket_is_empty():
+    clock = FakeClock()
+    full, empty = bucket(clock), bucket(clock, tokens=0.0)
+    assert not scheduler.try_acquire_all([full, empty])
+    assert full.tokens == 1.0
+    clock.advance(1.0)
+    assert scheduler.try_acquire_all([full, empty])
+    assert full.tokens < 1 and empty.tokens < 1
+
+
+def test_admit_takes_no_token_when_another_bucket_misses_the_deadline():
+    clock = FakeClock()
+    full, empty = bucket(clock), bucket(clock, rate=0.1, tokens=0.0)
+    with pytest.raises(scheduler.LLMDeadlineExceeded):
+        scheduler._admit([full, empty], 'test-model', deadline=clock() + 1)
+    assert full.tokens == 1.0
+
+
+def test_admit_leaves_free_tokens_to_others_while_it_waits():
+    key, model = bucket(time.monotonic, rate=5.0), bucket(time.monotonic, rate=5.0, tokens=0.0)
+    admitted = threading.Event()
+    waiter = threading.Thread(
+        target=lambda: scheduler._admit([key, model], 'test-model', time.monotonic() + 5) or admitted.set()
+    )
+    waiter.start()
+    time.sleep(0.05)
+    # Another model on the same key is not held up by the call waiting for its model's quota
+    assert key.try_acquire()
+    waiter.join(2)
+    assert admitted.is_set()
+
+
+def hedged(monkeypatch, buckets, delay=0.3):
+    """Run one attempt that hedges after 50 ms; returns (result, number of attempts sent)"""
+    monkeypatch.setattr(scheduler, '_hedge_after', lambda model_name, mode: 0.05)
+    sent = []
+    lock = threading.Lock()
+
+    def attempt(on_chunk, timeout):
+        with lock:
+            sent.append(True)
+        time.sleep(delay)
+        return 'answer'
+
+    result = scheduler._attempt(attempt, buckets, 'test-model', 'single', None, time.monotonic() + 5)
+    return result, len(sent)
+
+
+def test_hedge_is_sent_when_every_bucket_has_a_token(monkeypatch):
+    clock = FakeClock()
+    key, model = bucket(clock), bucket(clock)
+    assert hedged(monkeypatch, [key, model]) == ('answer', 2)
+    assert key.tokens < 1 and model.tokens < 1
+
+
+def test_hedge_without_quota_keeps_the_tokens_of_the_other_buckets(monkeypatch):
+    clock = FakeClock()
+    key, model = bucket(clock), bucket(clock, tokens=0.0)
+    assert hedged(monkeypatch, [key, model]) == ('answer', 1)
+    assert key.tokens == 1.0
+    # The saved token is still there for the next request
+    assert key.try_acquire()
+
+
+def test_call_retries_server_errors_then_succeeds(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, 'buckets_for', lambda api_key, model_name: [bucket(clock, rate=0)])
+    monkeypatch.setattr(scheduler, 'backoff', lambda attempt: 0.0)
+    monkeypatch.setattr(scheduler, '_hedge_after', lambda model_name, mode: None)
+    failures = [ApiError(503), ApiError(500)]
+
+    def attempt(on_chunk, timeout):
+        if failures:
+            raise failures.pop(0)
+        return 'answer'
+
+    assert scheduler.call(attempt, 'key', 'test-model') == 'answer'
+    assert not failures
+
+
+def test_call_does_not_retry_once_text_was_streamed(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, 'buckets_for', lambda api_key, model_name: [bucket(clock, rate=0)])
+    monkeypatch.setattr(scheduler, 'backoff', lambda attempt: 0.0)
+    monkeypatch.setattr(scheduler, '_hedge_after', lambda model_name, mode: None)
+    calls = []
+
+    def attempt(on_chunk, timeout):
+        calls.append(True)
+        on_chunk('partial ')
+        raise ApiError(503)
+
+    with pytest.raises(ApiError):
+        scheduler.call(attempt, 'key', 'test-model', mode='stream', on_chunk=lambda text: None)
+    assert len(calls) == 1
@@ -0,0 +1,133 @@
+"""Coalescing in one process and across processes sharing the lease database
+
+A second SingleFlight on the same database stands in for another process.
+"""
+import threading
+import time
+
+import pytest
+
+import singleflight
+from singleflight import CoalescedError, CoalesceTimeout, SingleFlight
+
+
+LEASE = 0.3
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(singleflight, 'POLL_INTERVAL', 0.02)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'flights.sqlite3')
+
+
+def slow(result, seconds, calls=None):
+    def fn(on_chunk=None):
+        if calls is not None:
+            calls.append(True)
+        if on_chunk:
+            on_chunk(result)
+        time.sleep(seconds)
+        return result
+    return fn
+
+
+def in_thread(target, *args, **kwargs):
+    """Start target in a thread; returns a dict that gets its 'result' or 'error'"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = target(*args, **kwargs)
+        except Exception as e:
+            outcome['error'] = e
+
+    outcome['thread'] = threading.Thread(target=run)
+    outcome['thread'].start()
+    return outcome
+
+
+def test_concurrent_calls_in_one_process_share_one_run(path):
+    flights = SingleFlight(path, shared=False)
+    calls, chunks = [], []
+    leader = in_thread(flights.do, 'key', slow('summary', 0.2, calls))
+    time.sleep(0.05)
+    assert flights.do('key', slow('other', 0, calls), on_chunk=chunks.append) == 'summary'
+    leader['thread'].join()
+    assert leader['result'] == 'summary'
+    assert len(calls) == 1
+    # The follower also got the text streamed before it joined
+    assert chunks == ['summary']
+
+
+def test_leader_failure_reaches_followers_and_is_not_kept(path):
+    flights = SingleFlight(path, shared=False)
+
+    def failing(on_chunk=None):
+        time.sleep(0.2)
+        raise ValueError("quota exhausted")
+
+    leader = in_thread(flights.do, 'key', failing)
+    time.sleep(0.05)
+    with pytest.raises(ValueError, match="quota exhausted"):
+        flights.do('key', slow('unused', 0))
+    leader['thread'].join()
+    assert isinstance(leader['error'], ValueError)
+    # The next call runs again instead of replaying the error
+    assert flights.do('key', slow('summary', 0)) == 'summary'
+
+
+def test_remote_follower_waits_while_the_lease_is_renewed(path):
+    first = SingleFlight(path, lease_seconds=LEASE)
+    second = SingleFlight(path, lease_seconds=LEASE)
+    calls = []
+    # Runs for several lease periods; only renewal keeps the lease alive
+    leader = in_thread(first.do, 'key', slow('summary', LEASE * 4, calls))
+    time.sleep(0.05)
+    assert second.do('key', slow('other', 0, calls)) == 'summary'
+    leader['thread'].join()
+    assert len(calls) == 1
+
+
+def test_remote_leader_failure_is_reported(path):
+    first = SingleFlight(path, lease_seconds=LEASE)
+    second = SingleFlight(path, lease_seconds=LEASE)
+
+    def failing(on_chunk=None):
+        time.sleep(0.2)
+        raise ValueError("invalid key")
+
+    leader = in_thread(first.do, 'key', failing)
+    time.sleep(0.05)
+    with pytest.raises(CoalescedError, match="invalid key"):
+        second.do('key', slow('unused', 0))
+    leader['thread'].join()
+
+
+def test_expired_lease_is_taken_over(path):
+    dead = SingleFlight(path, lease_seconds=LEASE)
+    # A leader that took the lease and then died: nothing renews or finishes it
+    assert dead._acquire('key')
+    survivor = SingleFlight(path, lease_seconds=LEASE)
+    calls = []
+    started = time.monotonic()
+    assert survivor.do('key', slow('summary', 0, calls)) == 'summary'
+    assert len(calls) == 1
+    assert time.monotonic() - started >= LEASE * 0.8
+
+
+def test_follower_timeout_caps_the_wait(path):
+    first = SingleFlight(path, lease_seconds=LEASE)
+    second = SingleFlight(path, lease_seconds=LEASE)
+    leader = in_thread(first.do, 'key', slow('summary', 1.0))
+    time.sleep(0.05)
+    with pytest.raises(CoalesceTimeout):
+        second.do('key', slow('other', 0), timeout=0.2)
+    # In the leader's own process too
+    with pytest.raises(CoalesceTimeout):
+        first.do('key', slow('other', 0), timeout=0.2)
+    leader['thread'].join()
+    assert leader['result'] == 'summary'
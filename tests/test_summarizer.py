@@ -0,0 +1,57 @@
+"""Summary caching across videos and documents, with a temporary cache and a stand-in model"""
+import pytest
+
+import dedup
+import summary_cache
+import summarizer
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    path = str(tmp_path / 'summaries.sqlite3')
+    monkeypatch.setattr(summary_cache, '_cache', summary_cache.SummaryCache(path))
+    monkeypatch.setattr(dedup, '_index', dedup.FingerprintIndex(path))
+
+
+def echo_links(prompt, on_chunk=None):
+    """Stand-in model that answers with the timestamp links it was given"""
+    return ' '.join(word for word in prompt.split() if 'youtu.be/' in word)
+
+
+def chapters():
+    words = ['word%d' % i for i in range(80)]
+    return [
+        {'title': 'Intro', 'start': 0, 'text': ' '.join(words[:40]) + '.'},
+        {'title': 'Details', 'start': 90, 'text': ' '.join(words[40:]) + '.'},
+    ]
+
+
+def test_chapter_notes_link_to_their_own_video():
+    first = summarizer.summarize_chapters(chapters(), 'aaaaaaaaaaa', lambda text: text, echo_links, 'model')
+    second = summarizer.summarize_chapters(chapters(), 'bbbbbbbbbbb', lambda text: text, echo_links, 'model')
+    assert 'youtu.be/aaaaaaaaaaa' in first
+    assert 'youtu.be/bbbbbbbbbbb' in second
+    assert 'aaaaaaaaaaa' not in second
+
+
+def video(video_id, ending=' word80.'):
+    text = ' '.join(c['text'] for c in chapters())
+    return {'video_id': video_id, 'title': 'A talk', 'content': text + ending, 'chapters': chapters()}
+
+
+def test_near_duplicate_upload_does_not_reuse_another_videos_links():
+    first = summarizer.canonical_summary(video('aaaaaaaaaaa'), 'youtube', echo_links, 'model')
+    report = {}
+    second = summarizer.canonical_summary(video('bbbbbbbbbbb', ending=' word81.'), 'youtube', echo_links, 'model',
+                                          report=report)
+    assert 'youtu.be/aaaaaaaaaaa' in first
+    assert not report['cached']
+    assert 'youtu.be/bbbbbbbbbbb' in second
+    assert 'aaaaaaaaaaa' not in second
+
+
+def test_same_video_still_hits_the_cache():
+    summarizer.canonical_summary(video('aaaaaaaaaaa'), 'youtube', echo_links, 'model')
+    report = {}
+    summarizer.canonical_summary(video('aaaaaaaaaaa'), 'youtube', echo_links, 'model', report=report)
+    assert report['cached']
@@ -0,0 +1,267 @@
+import bisect
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+
+import fetcher
+import metrics
+from extraction import clean_text
+from summary_cache import get_cache, make_key
+
+
+language_fallbacks = [
+    'en', 'hi', 'es', 'fr', 'de', 'ja', 'as', 'bn', 'gu', 'kn', 'ml', 'mr', 'or', 'pa', 'ta', 'te', 'ur'
+]
+
+# Fetch the watch page for the real title and description chapters (one extra request)
+FETCH_VIDEO_DETAILS = os.getenv('LITENOTE_YT_DETAILS', '1') != '0'
+# Keep extracted videos in the summary cache so repeat requests and playlists skip the fetch
+CACHE_VIDEOS = os.getenv('LITENOTE_VIDEO_CACHE', '1') != '0'
+
+PAUSE_SECONDS = 2.0
+BLOCK_SECONDS = 30
+COHESION_WINDOW = 2
+MIN_CHAPTER_SECONDS = 120
+TARGET_CHAPTER_SECONDS = 300
+MAX_CHAPTERS = 12
+
+_word_re = re.compile(r'\w{3,}', re.UNICODE)
+_description_chapter_re = re.compile(r'^\W*\(?((?:\d{1,2}:)?\d{1,2}:\d{2})\)?\s*[-–—:|]?\s*(.+?)\s*$')
+_json_string = r'"((?:[^"\\]|\\.)*)"'
+
+
+class TimedTranscript:
+    """Caption text with start times and durations kept in compact parallel arrays"""
+
+    __slots__ = ('video_id', 'language_code', 'is_generated', 'starts', 'durations', 'texts')
+
+    def __init__(self, video_id, language_code, is_generated, snippets):
+        self.video_id = video_id
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.starts = array('d')
+        self.durations = array('d')
+        self.texts = []
+
+        previous = None
+        for snippet in snippets:
+            text = snippet.text.replace('\n', ' ').strip()
+            # Rolling auto-captions often repeat the previous line verbatim
+            if not text or text == previous:
+                continue
+            previous = text
+            self.starts.append(snippet.start)
+            self.durations.append(snippet.duration)
+            self.texts.append(text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def duration(self):
+        if not self.texts:
+            return 0.0
+        return self.starts[-1] + self.durations[-1]
+
+    def index_at(self, seconds):
+        """Index of the segment playing at `seconds`"""
+        return max(0, bisect.bisect_right(self.starts, seconds) - 1)
+
+    def text(self, start=0, end=None):
+        return ' '.join(self.texts[start:end])
+
+    def gap_before(self, index):
+        """Silence between the end of the previous segment and this one"""
+        if index == 0:
+            return 0.0
+        return self.starts[index] - (self.starts[index - 1] + self.durations[index - 1])
+
+
+def get_video_id(youtube_video_url):
+    if 'youtu.be/' in youtube_video_url:
+        return youtube_video_url.split('youtu.be/')[1].split('?')[0]
+    return youtube_video_url.split("v=")[1].split("&")[0]
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def timestamp_link(video_id, seconds):
+    return f"https://youtu.be/{video_id}?t={int(seconds)}"
+
+
+def _parse_timestamp(value):
+    seconds = 0
+    for part in value.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def select_transcript(transcript_list, languages=language_fallbacks):
+    """Best available track: manual before generated, preferred languages first, then anything"""
+    manual = [t for t in transcript_list if not t.is_generated]
+    generated = [t for t in transcript_list if t.is_generated]
+    for group in (manual, generated):
+        by_language = {t.language_code: t for t in group}
+        for code in languages:
+            if code in by_language:
+                return by_language[code]
+    for group in (manual, generated):
+        if group:
+            return group[0]
+    return None
+
+
+def fetch_transcript(video_id, languages=language_fallbacks):
+    """List the video's tracks once, then fetch only the chosen one"""
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    with metrics.span('transcript') as span:
+        transcript_list = YouTubeTranscriptApi().list(video_id)
+        track = select_transcript(transcript_list, languages)
+        if track is None:
+            raise ValueError("No transcripts available for this video")
+        transcript = TimedTranscript(video_id, track.language_code, track.is_generated, track.fetch())
+        span['chars'] = sum(len(text) for text in transcript.texts)
+        return transcript
+
+
+def fetch_video_details(video_id):
+    """Title and description from the watch page; empty values when unavailable"""
+    details = {'title': None, 'description': ''}
+    try:
+        page = fetcher.decode_body(fetcher.fetch_url(f"https://www.youtube.com/watch?v={video_id}"))
+    except fetcher.FetchError:
+        return details
+
+    match = re.search(r'"videoDetails":\{"videoId":"[^"]*","title":' + _json_string, page)
+    if match:
+        details['title'] = json.loads(f'"{match.group(1)}"')
+    match = re.search(r'"shortDescription":' + _json_string, page)
+    if match:
+        details['description'] = json.loads(f'"{match.group(1)}"')
+    return details
+
+
+def parse_description_chapters(description):
+    """Creator chapters ("0:00 Intro" lines) as (seconds, title); YouTube needs 3+ starting at 0:00"""
+    chapters = []
+    for line in description.splitlines():
+        match = _description_chapter_re.match(line)
+        if match:
+            chapters.append((_parse_timestamp(match.group(1)), match.group(2)))
+    chapters.sort()
+    if len(chapters) < 3 or chapters[0][0] != 0:
+        return []
+    return chapters
+
+
+def _blocks(transcript):
+    """Group segments into ~BLOCK_SECONDS blocks: (first index, word counts, pause before)"""
+    blocks = []
+    start = 0
+    for i in range(1, len(transcript) + 1):
+        if i == len(transcript) or transcript.starts[i] - transcript.starts[start] >= BLOCK_SECONDS:
+            words = Counter(w.lower() for w in _word_re.findall(transcript.text(start, i)))
+            blocks.append((start, words, transcript.gap_before(start)))
+            start = i
+    return blocks
+
+
+def _cosine(a, b):
+    dot = sum(count * b.get(word, 0) for word, count in a.items())
+    if not dot:
+        return 0.0
+    return dot / math.sqrt(sum(v * v for v in a.values()) * sum(v * v for v in b.values()))
+
+
+def detect_chapters(transcript):
+    """Segment indexes where new chapters start, from pauses and drops in lexical cohesion"""
+    if transcript.duration < 2 * MIN_CHAPTER_SECONDS:
+        return [0]
+
+    blocks = _blocks(transcript)
+    candidates = []
+    for i in range(1, len(blocks)):
+        left = sum((blocks[j][1] for j in range(max(0, i - COHESION_WINDOW), i)), Counter())
+        right = sum((blocks[j][1] for j in range(i, min(len(blocks), i + COHESION_WINDOW))), Counter())
+        score = 1 - _cosine(left, right)
+        if blocks[i][2] >= PAUSE_SECONDS:
+            score += 0.5
+        candidates.append((score, blocks[i][0]))
+
+    target = min(MAX_CHAPTERS, max(1, round(transcript.duration / TARGET_CHAPTER_SECONDS)))
+    chosen = [0]
+    for score, index in sorted(candidates, reverse=True):
+        if len(chosen) >= target:
+            break
+        start = transcript.starts[index]
+        if transcript.duration - start < MIN_CHAPTER_SECONDS:
+            continue
+        if all(abs(start - transcript.starts[c]) >= MIN_CHAPTER_SECONDS for c in chosen):
+            chosen.append(index)
+    return sorted(chosen)
+
+
+def build_chapters(transcript, description_chapters=None):
+    """Chapters as dicts with start time, optional title and cleaned text"""
+    if description_chapters:
+        starts, titles = [], []
+        for seconds, title in description_chapters:
+            index = transcript.index_at(seconds)
+            if not starts or index > starts[-1]:
+                starts.append(index)
+                titles.append(title)
+    else:
+        starts = detect_chapters(transcript)
+        titles = [None] * len(starts)
+
+    chapters = []
+    for n, start in enumerate(starts):
+        end = starts[n + 1] if n + 1 < len(starts) else len(transcript)
+        text = clean_text(transcript.text(start, end))
+        if text:
+            chapters.append({'start': transcript.starts[start], 'title': titles[n], 'text': text})
+    return chapters
+
+
+def load_video(video_id):
+    """Transcript text, title and chapters of one video; raises when it has no captions"""
+    key = make_key('', stage='video', video_id=video_id, details=FETCH_VIDEO_DETAILS)
+    if CACHE_VIDEOS:
+        with metrics.span('video_cache') as span:
+            cached = get_cache().get(key)
+            span['cache_hit'] = cached is not None
+        if cached is not None:
+            return json.loads(cached)
+
+    transcript = fetch_transcript(video_id)
+    details = fetch_video_details(video_id) if FETCH_VIDEO_DETAILS else {'title': None, 'description': ''}
+    chapters = build_chapters(transcript, parse_description_chapters(details['description']))
+    video = {
+        'content': clean_text(transcript.text()),
+        'video_id': video_id,
+        'title': details['title'] or f"YouTube Video ({video_id})",
+        'language': transcript.language_code,
+        'chapters': chapters,
+        'method': 'YouTube Transcript API'
+    }
+    if CACHE_VIDEOS:
+        get_cache().put(key, json.dumps(video))
+    return video
+
+
+def extract_youtube_transcript(youtube_video_url):
+    try:
+        return load_video(get_video_id(youtube_video_url))
+    except Exception as e:
+        raise Exception(f"Failed to extract YouTube transcript: {str(e)}")